@@ -0,0 +1 @@
+"""Benchmarks for the hot paths of browser-auto, run with ``python -m benchmarks.run``."""
@@ -0,0 +1,605 @@
+import json
+import re
+import time
+import uuid
+from collections import Counter
+from html.parser import HTMLParser
+from typing import List, Optional, Union
+from urllib.parse import urljoin, urlparse
+from urllib.request import urlopen
+
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webelement import WebElement
+
+from browser.extract import EXTRACT_JS
+from browser.scroll import (
+    CLAIM_NEW_ITEMS_JS,
+    KEY_ITEMS_JS,
+    QUERY_KEYED_ITEMS_JS,
+    QUERY_NEW_ITEMS_JS,
+    SCROLL_AND_WAIT_JS,
+)
+
+from .server import render_item
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "wbr"}
+
+
+class FakeElement(WebElement):
+    """Element of a ``FakeDriver`` page, usable wherever a ``WebElement`` is expected."""
+
+    def __init__(self, driver: "FakeDriver", tag: str, attrs: Optional[dict] = None):
+        super().__init__(driver, uuid.uuid4().hex)
+        self._tag = tag
+        self.attrs = dict(attrs or {})
+        self.content: List[Union[str, "FakeElement"]] = []
+        self.parent_element: Optional["FakeElement"] = None
+        self.clicks = 0
+
+    @property
+    def children(self) -> List["FakeElement"]:
+        return [c for c in self.content if isinstance(c, FakeElement)]
+
+    def append(self, child: Union[str, "FakeElement"]):
+        if isinstance(child, FakeElement):
+            child.parent_element = self
+        self.content.append(child)
+
+    def clear_content(self):
+        self.content = []
+
+    def iter_descendants(self):
+        for child in self.children:
+            yield child
+            yield from child.iter_descendants()
+
+    @property
+    def text_content(self) -> str:
+        return "".join(c if isinstance(c, str) else c.text_content for c in self.content)
+
+    @property
+    def tag_name(self) -> str:
+        return self._tag
+
+    @property
+    def text(self) -> str:
+        self._parent._command("getElementText")
+        return " ".join(self.text_content.split())
+
+    def get_attribute(self, name: str) -> Optional[str]:
+        self._parent._command("getElementAttribute")
+        return self.attrs.get(name)
+
+    def get_dom_attribute(self, name: str) -> Optional[str]:
+        return self.get_attribute(name)
+
+    def is_displayed(self) -> bool:
+        self._parent._command("isElementDisplayed")
+        return True
+
+    def is_enabled(self) -> bool:
+        self._parent._command("isElementEnabled")
+        return "disabled" not in self.attrs
+
+    def click(self):
+        self._parent._command("elementClick")
+        self.clicks += 1
+
+    def send_keys(self, *value):
+        self._parent._command("elementSendKeys")
+        self.attrs["value"] = self.attrs.get("value", "") + "".join(str(v) for v in value)
+
+    def clear(self):
+        self._parent._command("elementClear")
+        self.attrs["value"] = ""
+
+    def find_element(self, by=By.ID, value=None) -> "FakeElement":
+        return self._parent._find_element(by, value, scope=self)
+
+    def find_elements(self, by=By.ID, value=None) -> List["FakeElement"]:
+        return self._parent._find_elements(by, value, scope=self)
+
+    def __repr__(self):
+        return f"<FakeElement {self._tag} {self.attrs}>"
+
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self, driver: "FakeDriver", root: FakeElement):
+        super().__init__(convert_charrefs=True)
+        self.driver = driver
+        self.stack = [root]
+        self.skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self.skip += 1
+            return
+        el = FakeElement(self.driver, tag, {k: v if v is not None else "" for k, v in attrs})
+        self.stack[-1].append(el)
+        if tag not in VOID_TAGS:
+            self.stack.append(el)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and tag not in ("script", "style"):
+            self.stack.pop()
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style"):
+            self.skip = max(0, self.skip - 1)
+            return
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].tag_name == tag:
+                del self.stack[i:]
+                break
+
+    def handle_data(self, data):
+        if not self.skip and data:
+            self.stack[-1].append(data)
+
+
+def parse_html(driver: "FakeDriver", markup: str, root: Optional[FakeElement] = None) -> FakeElement:
+    root = root or FakeElement(driver, "#document")
+    builder = _TreeBuilder(driver, root)
+    builder.feed(markup)
+    builder.close()
+    return root
+
+
+# ---- CSS selectors: tag, #id, .class, [attr], [attr=v], [attr~=v], [attr^=v], [attr$=v], [attr*=v],
+# descendant and child combinators, and comma separated lists
+_COMPOUND_RE = re.compile(
+    r"""(?P<tag>\*|[a-zA-Z][\w-]*)?(?P<parts>(?:\#[\w-]+|\.[\w-]+|\[\s*[\w:-]+\s*(?:[~^$*|]?=\s*(?:"[^"]*"|'[^']*'|[^\]\s]+)\s*)?\])*)"""
+)
+_PART_RE = re.compile(
+    r"""\#(?P<id>[\w-]+)|\.(?P<cls>[\w-]+)|\[\s*(?P<attr>[\w:-]+)\s*(?:(?P<op>[~^$*|]?=)\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<bare>[^\]\s]+))\s*)?\]"""
+)
+
+
+def _parse_compound(text: str):
+    m = _COMPOUND_RE.fullmatch(text)
+    if not m or not text:
+        raise ValueError(f"Unsupported selector: {text}")
+    conditions = []
+    for part in _PART_RE.finditer(m.group("parts") or ""):
+        if part.group("id"):
+            conditions.append(("id", "=", part.group("id")))
+        elif part.group("cls"):
+            conditions.append(("class", "~=", part.group("cls")))
+        else:
+            value = next((v for v in part.group("dq", "sq", "bare") if v is not None), None)
+            conditions.append((part.group("attr"), part.group("op"), value))
+    tag = m.group("tag")
+    return (None if tag in (None, "*") else tag.lower(), conditions)
+
+
+def _split_top_level(selector: str, sep: str) -> List[str]:
+    parts, depth, quote, start = [], 0, None, 0
+    for i, ch in enumerate(selector):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+        elif ch == "[":
+            depth += 1
+        elif ch == "]":
+            depth -= 1
+        elif ch == sep and depth == 0:
+            parts.append(selector[start:i])
+            start = i + 1
+    parts.append(selector[start:])
+    return parts
+
+
+def parse_css(selector: str):
+    """Parse a selector into a list of alternatives, each a list of ``(combinator, compound)``."""
+    alternatives = []
+    for alternative in _split_top_level(selector, ","):
+        tokens, depth, quote, current = [], 0, None, ""
+        for ch in alternative.strip():
+            if quote:
+                current += ch
+                if ch == quote:
+                    quote = None
+                continue
+            if ch in "\"'":
+                quote = ch
+            elif ch == "[":
+                depth += 1
+            elif ch == "]":
+                depth -= 1
+            if depth == 0 and (ch.isspace() or ch == ">"):
+                if current:
+                    tokens.append(current)
+                    current = ""
+                if ch == ">":
+                    tokens.append(">")
+                continue
+            current += ch
+        if current:
+            tokens.append(current)
+
+        steps, combinator = [], " "
+        for token in tokens:
+            if token == ">":
+                combinator = ">"
+                continue
+            steps.append((combinator, _parse_compound(token)))
+            combinator = " "
+        alternatives.append(steps)
+    return alternatives
+
+
+def _matches_compound(el: FakeElement, compound) -> bool:
+    tag, conditions = compound
+    if tag and el.tag_name != tag:
+        return False
+    for name, op, value in conditions:
+        actual = el.attrs.get(name)
+        if actual is None:
+            return False
+        if op is None:
+            continue
+        if op == "=" and actual != value:
+            return False
+        if op == "~=" and value not in actual.split():
+            return False
+        if op == "^=" and not actual.startswith(value):
+            return False
+        if op == "$=" and not actual.endswith(value):
+            return False
+        if op == "*=" and value not in actual:
+            return False
+        if op == "|=" and not (actual == value or actual.startswith(value + "-")):
+            return False
+    return True
+
+
+def _matches_steps(el: Optional[FakeElement], steps, index: int) -> bool:
+    combinator, compound = steps[index]
+    if el is None or not _matches_compound(el, compound):
+        return False
+    if index == 0:
+        return True
+    parent = el.parent_element
+    if combinator == ">":
+        return _matches_steps(parent, steps, index - 1)
+    while parent is not None:
+        if _matches_steps(parent, steps, index - 1):
+            return True
+        parent = parent.parent_element
+    return False
+
+
+def select_css(scope: FakeElement, selector: str) -> List[FakeElement]:
+    alternatives = parse_css(selector)
+    return [
+        el
+        for el in scope.iter_descendants()
+        if any(_matches_steps(el, steps, len(steps) - 1) for steps in alternatives)
+    ]
+
+
+# ---- XPath: `//tag[...]` and `/tag[...]` steps with `text()="x"`, `@attr="x"` and `contains(...)` predicates
+_XPATH_STEP_RE = re.compile(r"(//|/)([\w*-]+)((?:\[[^\]]*\])*)")
+_XPATH_PRED_RE = re.compile(
+    r"""\[\s*(?:(?P<func>contains)\(\s*)?(?P<subject>text\(\)|\.|@[\w-]+)\s*(?:,|=)\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)')\s*\)?\s*\]"""
+)
+
+
+def _xpath_predicate(el: FakeElement, pred) -> bool:
+    func, subject, value = pred
+    if subject in ("text()", "."):
+        actual = el.text_content.strip() if subject == "." else "".join(
+            c for c in el.content if isinstance(c, str)
+        ).strip()
+    else:
+        actual = el.attrs.get(subject[1:])
+        if actual is None:
+            return False
+    return value in actual if func else actual == value
+
+
+def select_xpath(root: FakeElement, xpath: str) -> List[FakeElement]:
+    steps = []
+    pos = 0
+    for m in _XPATH_STEP_RE.finditer(xpath):
+        if m.start() != pos:
+            raise ValueError(f"Unsupported xpath: {xpath}")
+        preds = []
+        for p in _XPATH_PRED_RE.finditer(m.group(3)):
+            value = p.group("dq") if p.group("dq") is not None else p.group("sq")
+            preds.append((p.group("func"), p.group("subject"), value))
+        steps.append((m.group(1), m.group(2), preds))
+        pos = m.end()
+    if pos != len(xpath) or not steps:
+        raise ValueError(f"Unsupported xpath: {xpath}")
+
+    current = [root]
+    for axis, tag, preds in steps:
+        found, seen = [], set()
+        for node in current:
+            candidates = node.iter_descendants() if axis == "//" else node.children
+            for el in candidates:
+                if el.id in seen or (tag != "*" and el.tag_name != tag):
+                    continue
+                if all(_xpath_predicate(el, pred) for pred in preds):
+                    seen.add(el.id)
+                    found.append(el)
+        current = found
+    return current
+
+
+class _Timeouts:
+    script = 30
+
+
+class _SwitchTo:
+    def __init__(self, driver: "FakeDriver"):
+        self._driver = driver
+
+    def window(self, handle: str):
+        self._driver._command("switchToWindow")
+        if handle not in self._driver.window_handles:
+            raise NoSuchElementException(f"No window {handle}")
+        self._driver.current_window_handle = handle
+
+
+class FakeDriver:
+    """WebDriver stand-in that loads the fixture pages over HTTP.
+
+    Page scripts are not run; instead the infinite feed (``[data-src]``) and
+    the virtualized list (``[data-src][data-virtual]``) are emulated in
+    Python, as are the scripts ``iter_scroll`` and ``extract_all`` send.
+    Every command sleeps ``latency`` seconds of real time to model the
+    WebDriver round-trip and is counted in ``commands``.
+
+    ``routes`` maps hosts to fixture paths, so that e.g. ``mp.weixin.qq.com``
+    is served by ``/editor.html``.
+    """
+
+    def __init__(self, base_url: str, routes: Optional[dict] = None, latency: float = 0.0):
+        self.base_url = base_url
+        self.routes = routes or {}
+        self.latency = latency
+        self.commands = Counter()
+        self.timeouts = _Timeouts()
+        self.window_handles = [uuid.uuid4().hex.upper()]
+        self.current_window_handle = self.window_handles[0]
+        self.switch_to = _SwitchTo(self)
+        self.current_url = None
+        self.document = FakeElement(self, "#document")
+        self._feed = None
+        self._virtual = None
+        self._scripts = {
+            CLAIM_NEW_ITEMS_JS: self._claim_new_items,
+            QUERY_NEW_ITEMS_JS: self._query_new_items,
+            QUERY_KEYED_ITEMS_JS: self._query_keyed_items,
+            KEY_ITEMS_JS: self._key_items,
+            EXTRACT_JS: self._extract,
+        }
+
+    def _command(self, name: str):
+        self.commands[name] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    @property
+    def command_count(self) -> int:
+        return sum(self.commands.values())
+
+    def _fetch(self, path: str):
+        with urlopen(urljoin(self.base_url, path), timeout=10) as resp:
+            return resp.read().decode("utf-8")
+
+    def get(self, url: str):
+        self._command("get")
+        parsed = urlparse(url)
+        path = self.routes.get(parsed.hostname)
+        if path is None:
+            path = parsed.path + (f"?{parsed.query}" if parsed.query else "")
+        self.current_url = url
+        self.document = parse_html(self, self._fetch(path))
+        self._feed = self._virtual = None
+
+        for el in self.document.iter_descendants():
+            if "data-src" not in el.attrs:
+                continue
+            if "data-virtual" in el.attrs:
+                self._virtual = _VirtualList(self, el)
+            else:
+                self._feed = _Feed(self, el)
+            break
+
+    def find_element(self, by=By.ID, value=None) -> FakeElement:
+        return self._find_element(by, value)
+
+    def find_elements(self, by=By.ID, value=None) -> List[FakeElement]:
+        return self._find_elements(by, value)
+
+    def _find_elements(self, by, value, scope: Optional[FakeElement] = None) -> List[FakeElement]:
+        self._command("findElements")
+        scope = scope or self.document
+        if by == By.ID:
+            return [el for el in scope.iter_descendants() if el.attrs.get("id") == value]
+        if by == By.CSS_SELECTOR:
+            return select_css(scope, value)
+        if by == By.CLASS_NAME:
+            return select_css(scope, f".{value}")
+        if by == By.TAG_NAME:
+            return [el for el in scope.iter_descendants() if el.tag_name == value]
+        if by == By.NAME:
+            return [el for el in scope.iter_descendants() if el.attrs.get("name") == value]
+        if by == By.XPATH:
+            return select_xpath(self.document, value)
+        raise ValueError(f"Unsupported locator: {by}")
+
+    def _find_element(self, by, value, scope: Optional[FakeElement] = None) -> FakeElement:
+        found = self._find_elements(by, value, scope=scope)
+        if not found:
+            raise NoSuchElementException(f"Unable to locate element: {by}={value}")
+        return found[0]
+
+    def execute(self, driver_command: str, params: Optional[dict] = None):
+        """Accept raw commands such as the W3C actions of ``ActionChains``."""
+        self._command(driver_command)
+        return {"value": None}
+
+    def execute_script(self, script: str, *args):
+        self._command("executeScript")
+        handler = self._scripts.get(script)
+        if handler is not None:
+            return handler(*args)
+        if "scrollTo" in script:
+            return None
+        raise NotImplementedError(f"FakeDriver cannot run script: {script[:80]}")
+
+    def execute_async_script(self, script: str, *args):
+        self._command("executeAsyncScript")
+        if script != SCROLL_AND_WAIT_JS:
+            raise NotImplementedError(f"FakeDriver cannot run script: {script[:80]}")
+        selector, _timeout_ms, _settle_ms, step_ratio, _any_mutation = args
+        if selector and not select_css(self.document, selector):
+            return {"error": f"scroll container not found: {selector}"}
+        if self._virtual is not None:
+            return self._virtual.scroll(step_ratio)
+        if self._feed is not None:
+            return self._feed.load_more()
+        return {"added": 0, "height": 0, "atBottom": True}
+
+    def set_script_timeout(self, time_to_wait: float):
+        self.timeouts.script = time_to_wait
+
+    def quit(self):
+        self._command("quit")
+
+    # ---- emulated scripts
+
+    def _claim_new_items(self, items, attr, run_id):
+        new_items = [el for el in items if el.attrs.get(attr) != run_id]
+        for el in new_items:
+            el.attrs[attr] = run_id
+        return new_items
+
+    def _query_new_items(self, selector, attr, run_id):
+        return self._claim_new_items(select_css(self.document, selector), attr, run_id)
+
+    def _query_keyed_items(self, selector, key_attr):
+        return self._key_items(select_css(self.document, selector), key_attr)
+
+    def _key_items(self, items, key_attr):
+        return [[el, el.attrs.get(key_attr) if key_attr else None] for el in items]
+
+    def _extract(self, item_selector, specs, root_selector, stamp_attr, run_id):
+        root = self.document
+        if root_selector:
+            found = select_css(self.document, root_selector)
+            if not found:
+                return []
+            root = found[0]
+
+        def read(el, attr):
+            if el is None:
+                return None
+            if attr == "text":
+                return el.text_content.strip()
+            if attr.startswith("prop:"):
+                return el.attrs.get(attr[5:])
+            return el.attrs.get(attr)
+
+        rows = []
+        for item in select_css(root, item_selector):
+            if stamp_attr:
+                if item.attrs.get(stamp_attr) == run_id:
+                    continue
+                item.attrs[stamp_attr] = run_id
+            row = {}
+            for name, sub, attr, many in specs:
+                if many:
+                    els = select_css(item, sub) if sub else [item]
+                    row[name] = [read(el, attr) for el in els]
+                else:
+                    found = select_css(item, sub) if sub else [item]
+                    row[name] = read(found[0] if found else None, attr)
+            rows.append(row)
+        return rows
+
+
+class _Feed:
+    """Infinite feed: the next page is appended on every scroll to the bottom."""
+
+    def __init__(self, driver: FakeDriver, container: FakeElement):
+        self.driver = driver
+        self.container = container
+        self.page_size = int(container.attrs.get("data-page-size", 20))
+        self.offset = 0
+        self.done = False
+        self.load_more()
+
+    def load_more(self) -> dict:
+        added = 0
+        if not self.done:
+            page = json.loads(
+                self.driver._fetch(
+                    f"{self.container.attrs['data-src']}?offset={self.offset}&limit={self.page_size}"
+                )
+            )
+            parse_html(self.driver, page["html"], root=self.container)
+            added = page["count"]
+            self.offset += added
+            self.done = page["done"]
+        return {"added": added, "height": self.offset * 80, "atBottom": self.done}
+
+
+class _VirtualList:
+    """Virtualized list: a fixed pool of rows is re-rendered on every scroll."""
+
+    def __init__(self, driver: FakeDriver, container: FakeElement):
+        self.driver = driver
+        self.container = container
+        self.rows = int(container.attrs.get("data-viewport-rows", 20))
+        self.row_height = int(container.attrs.get("data-row-height", 40))
+        total = container.attrs.get("data-total", "1000")
+        page = json.loads(
+            driver._fetch(f"{container.attrs['data-src']}?offset=0&limit={total}")
+        )
+        self.items = page["items"]
+        self.first = 0
+        self.pool = []
+        for _ in range(self.rows):
+            row = FakeElement(driver, "div", {"class": "item"})
+            container.append(row)
+            self.pool.append(row)
+        self.render()
+
+    def render(self) -> int:
+        changed = 0
+        for i, row in enumerate(self.pool):
+            index = self.first + i
+            if index >= len(self.items):
+                row.attrs["style"] = "display: none"
+                continue
+            item = self.items[index]
+            if row.attrs.get("data-key") == item["id"]:
+                continue
+            fragment = parse_html(self.driver, render_item(item))
+            rendered = fragment.children[0]
+            row.attrs["data-key"] = item["id"]
+            row.clear_content()
+            for child in rendered.content:
+                row.append(child)
+            changed += 1
+        return changed
+
+    def scroll(self, step_ratio: float) -> dict:
+        last = max(0, len(self.items) - self.rows)
+        step = max(1, int(self.rows * (step_ratio or 1)))
+        self.first = min(last, self.first + step) if step_ratio else last
+        added = self.render()
+        return {
+            "added": added,
+            "height": len(self.items) * self.row_height,
+            "atBottom": self.first >= last,
+        }
@@ -0,0 +1,381 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from browser import Chrome, run_in_browser
+from browser.browser import launch_browser
+from browser.instrument import Recorder, instrument_driver
+from browser.scroll import with_scroll
+from utils import VirtualClock, use_clock
+
+from .fake_driver import FakeDriver
+from .server import FixtureServer
+
+STANDIN_BROWSER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "standin_browser.py")
+
+# 发布流程访问的站点都由 editor.html 提供
+MP_ROUTES = {
+    "mp.weixin.qq.com": "/editor.html",
+    "editor.mdnice.com": "/editor.html",
+}
+
+
+class StandInChrome(Chrome):
+    """``Chrome`` launching ``standin_browser.py`` and attaching a ``FakeDriver``."""
+
+    def __init__(self, base_url: str, user_data_dir: str, latency: float = 0.0):
+        super().__init__(browser_path=STANDIN_BROWSER, user_data_dir=user_data_dir)
+        self.base_url = base_url
+        self.latency = latency
+
+    def _spawn(self, cmd, profile: str, port: int):
+        return super()._spawn([sys.executable, *cmd], profile, port)
+
+    def is_any_running(self) -> bool:
+        return False
+
+    def get_driver(self, port: int, instrument=None):
+        driver = FakeDriver(self.base_url, routes=MP_ROUTES, latency=self.latency)
+        return instrument_driver(driver, instrument)
+
+
+def summarize(samples: List[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "min": ordered[0],
+        "median": statistics.median(ordered),
+        "mean": statistics.fmean(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+        "max": ordered[-1],
+    }
+
+
+def metric(value: float, unit: str, better: str = "lower") -> dict:
+    return {"value": value, "unit": unit, "better": better}
+
+
+@contextmanager
+def temp_dir(prefix: str):
+    path = tempfile.mkdtemp(prefix=prefix)
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+class Bench:
+    def __init__(self, args: argparse.Namespace, server: FixtureServer):
+        self.args = args
+        self.server = server
+
+    def make_browser(self, user_data_dir: str):
+        if self.args.real:
+            return Chrome(user_data_dir=user_data_dir)
+        return StandInChrome(self.server.base_url, user_data_dir, latency=self.args.latency)
+
+    @contextmanager
+    def driver(self):
+        """A fake driver, or a real browser started once for the scroll benchmarks."""
+        if not self.args.real:
+            yield FakeDriver(self.server.base_url, routes=MP_ROUTES, latency=self.args.latency)
+            return
+
+        with temp_dir("bench-chrome-") as user_data_dir:
+            browser = self.make_browser(user_data_dir)
+            driver = launch_browser(browser, "Default", headless=True)
+            try:
+                yield driver
+            finally:
+                driver.quit()
+                browser.close()
+
+    def startup(self) -> dict:
+        """Time the phases of ``launch_browser`` and a whole ``run_in_browser``."""
+        phases = {"spawn": [], "devtools": [], "driver": [], "close": []}
+        totals = []
+        for _ in range(self.args.startup_iterations):
+            with temp_dir("bench-profile-") as user_data_dir:
+                browser = self.make_browser(user_data_dir)
+                t0 = time.perf_counter()
+                browser.start("Default", port=0, headless=True)
+                t1 = time.perf_counter()
+                browser.wait_until_ready()
+                t2 = time.perf_counter()
+                driver = browser.get_driver(browser.port)
+                t3 = time.perf_counter()
+                if self.args.real:
+                    driver.quit()
+                browser.close()
+                t4 = time.perf_counter()
+                for name, value in zip(phases, (t1 - t0, t2 - t1, t3 - t2, t4 - t3)):
+                    phases[name].append(value)
+
+            with temp_dir("bench-profile-") as user_data_dir:
+                browser = self.make_browser(user_data_dir)
+                start = time.perf_counter()
+                run_in_browser(
+                    browser,
+                    "Default",
+                    lambda driver: driver.quit() if self.args.real else None,
+                    headless=True,
+                    kill_browser_after_running=True,
+                )
+                totals.append(time.perf_counter() - start)
+
+        phases = {name: summarize(samples) for name, samples in phases.items()}
+        total = summarize(totals)
+        return {
+            "phases": phases,
+            "run_in_browser": total,
+            "metrics": {
+                **{f"{name}_median": metric(s["median"], "s") for name, s in phases.items()},
+                "run_in_browser_median": metric(total["median"], "s"),
+            },
+        }
+
+    def _scroll(self, page: str, **kwargs) -> dict:
+        target = min(self.args.items, self.server.total_items)
+        samples, commands, collected = [], [], 0
+        for _ in range(self.args.scroll_iterations):
+            with self.driver() as driver:
+                before = getattr(driver, "command_count", 0)
+                start = time.perf_counter()
+                results = with_scroll(
+                    driver,
+                    self.server.url(page),
+                    target,
+                    None,
+                    raise_errors=True,
+                    pacer="off",
+                    content_timeout=self.args.content_timeout,
+                    **kwargs,
+                )
+                samples.append(time.perf_counter() - start)
+                commands.append(getattr(driver, "command_count", 0) - before)
+                collected = len(results)
+
+        seconds = summarize(samples)
+        result = {
+            "items": collected,
+            "seconds": seconds,
+            "metrics": {
+                "items_per_sec": metric(collected / seconds["median"], "items/s", "higher"),
+            },
+        }
+        if not self.args.real:
+            per_item = statistics.median(commands) / max(1, collected)
+            result["metrics"]["commands_per_item"] = metric(per_item, "commands")
+        return result
+
+    def scroll_elements(self) -> dict:
+        """Infinite feed, reading each element with WebDriver calls."""
+        return self._scroll(
+            "feed.html",
+            process_item=lambda el: (el.get_attribute("data-key"), el.text),
+            item_selector=".item",
+        )
+
+    def scroll_fields(self) -> dict:
+        """Infinite feed, extracting all fields of a pass in one script."""
+        return self._scroll(
+            "feed.html",
+            process_item=None,
+            item_selector=".item",
+            fields={"key": "data-key", "title": (".title", "text"), "author": (".author", "text")},
+            key_field="key",
+        )
+
+    def scroll_virtualized(self) -> dict:
+        """Virtualized list with recycled rows."""
+        return self._scroll(
+            "virtual.html",
+            process_item=lambda el: el.text,
+            item_selector=".item",
+            scroll_container="#list",
+            virtualized=True,
+            key_attribute="data-key",
+        )
+
+    def mp_publish(self) -> dict:
+        """``MPPublisher.publish_article`` on the editor fixture, pacing on a virtual clock."""
+        if self.args.real:
+            return {"skipped": "needs a logged in mp.weixin.qq.com account"}
+        try:
+            from mp_publish import Article, MPPublisher, PublishConfig
+        except Exception as e:
+            return {"skipped": f"mp_publish cannot be imported: {e!r}"}
+
+        cwd = os.getcwd()
+        with temp_dir("bench-mp-") as workdir, use_clock(VirtualClock()) as clock:
+            # MPPublisher writes its data dir relative to the working directory
+            os.chdir(workdir)
+            try:
+                recorder = Recorder()
+                driver = instrument_driver(
+                    FakeDriver(self.server.base_url, routes=MP_ROUTES, latency=self.args.latency),
+                    recorder,
+                )
+                config = PublishConfig(
+                    profile="bench",
+                    mp_account="bench",
+                    articles=[],
+                    articles_collected=[],
+                    main_category="bench",
+                )
+                publisher = MPPublisher(driver, config, pacer="human")
+                article = Article(
+                    title="Benchmark article",
+                    content="# Benchmark article\n\n" + "Lorem ipsum dolor sit amet. " * 200,
+                    description="Benchmark",
+                    categories=["bench", "fixture"],
+                )
+
+                samples, commands = [], []
+                for _ in range(self.args.mp_iterations):
+                    before = driver.command_count
+                    start = time.perf_counter()
+                    publisher.publish_article([article])
+                    samples.append(time.perf_counter() - start)
+                    commands.append(driver.command_count - before)
+            finally:
+                os.chdir(cwd)
+
+        seconds = summarize(samples)
+        paced = clock.total_slept / len(samples)
+        # Time per step of publish_article, e.g. "publish_article/set_title"
+        steps = {
+            row["step"]: row["seconds"] / len(samples)
+            for row in recorder.summary()
+            if row["kind"] == "step"
+        }
+        return {
+            "seconds": seconds,
+            "paced_seconds_per_article": paced,
+            "steps": steps,
+            "metrics": {
+                "seconds_per_article": metric(seconds["median"], "s"),
+                "paced_seconds_per_article": metric(paced, "s"),
+                "commands_per_article": metric(statistics.median(commands), "commands"),
+            },
+        }
+
+
+BENCHMARKS: Dict[str, Callable[[Bench], dict]] = {
+    "startup": Bench.startup,
+    "scroll_elements": Bench.scroll_elements,
+    "scroll_fields": Bench.scroll_fields,
+    "scroll_virtualized": Bench.scroll_virtualized,
+    "mp_publish": Bench.mp_publish,
+}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, timeout=5
+        )
+        return output.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """Return a message for each metric that got worse than ``baseline`` by more than ``threshold``."""
+    regressions = []
+    for name, bench in results["benchmarks"].items():
+        old_bench = baseline.get("benchmarks", {}).get(name, {})
+        for key, current in bench.get("metrics", {}).items():
+            old = old_bench.get("metrics", {}).get(key)
+            if not old or not old["value"]:
+                continue
+            change = (current["value"] - old["value"]) / old["value"]
+            if current["better"] == "higher":
+                change = -change
+            if change > threshold:
+                regressions.append(
+                    f"{name}.{key}: {old['value']:.4g} -> {current['value']:.4g} {current['unit']} ({change:+.0%} worse)"
+                )
+    return regressions
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the browser-auto benchmarks")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="Benchmarks to run")
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the JSON results")
+    parser.add_argument("--baseline", help="Previous results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown against the baseline")
+    parser.add_argument("--real", action="store_true", help="Use Chrome and chromedriver instead of the stand-ins")
+    parser.add_argument("--latency", type=float, default=0.001, help="Seconds per fake WebDriver command")
+    parser.add_argument("--items", type=int, default=500, help="Items to collect per scroll run")
+    parser.add_argument("--total-items", type=int, default=1000, help="Items served by the fixture API")
+    parser.add_argument("--api-delay", type=float, default=0.0, help="Seconds before each API response")
+    parser.add_argument("--content-timeout", type=float, default=2, help="content_timeout for with_scroll")
+    parser.add_argument("--startup-iterations", type=int, default=5)
+    parser.add_argument("--scroll-iterations", type=int, default=3)
+    parser.add_argument("--mp-iterations", type=int, default=5)
+    parser.add_argument("--log-level", default="ERROR")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "benchmarks": {},
+    }
+
+    with FixtureServer(total_items=args.total_items, api_delay=args.api_delay) as server:
+        bench = Bench(args, server)
+        for name in args.only or BENCHMARKS:
+            print(f"Running {name}...", flush=True)
+            try:
+                result = BENCHMARKS[name](bench)
+            except Exception as e:
+                result = {"error": repr(e), "traceback": traceback.format_exc()}
+            results["benchmarks"][name] = result
+
+            if "skipped" in result:
+                print(f"  skipped: {result['skipped']}")
+            elif "error" in result:
+                print(f"  failed: {result['error']}")
+            for key, m in result.get("metrics", {}).items():
+                print(f"  {key}: {m['value']:.4g} {m['unit']}")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"Results written to {args.output}")
+
+    failed = [name for name, result in results["benchmarks"].items() if "error" in result]
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            return 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
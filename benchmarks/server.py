@@ -0,0 +1,116 @@
+import html
+import json
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def make_item(index: int) -> dict:
+    return {
+        "id": str(index),
+        "title": f"Item {index}",
+        "url": f"/items/{index}",
+        "author": f"author-{index % 17}",
+    }
+
+
+def render_item(item: dict) -> str:
+    """Markup of one feed item, ``virtual.html`` renders the same in JS."""
+    return (
+        f'<div class="item" data-key="{html.escape(item["id"])}">'
+        f'<a class="title" href="{html.escape(item["url"])}">{html.escape(item["title"])}</a>'
+        f'<span class="author">{html.escape(item["author"])}</span>'
+        "</div>"
+    )
+
+
+def get_items(offset: int, limit: int, total: int) -> List[dict]:
+    return [make_item(i) for i in range(offset, min(total, offset + limit))]
+
+
+class FixtureServer:
+    """Serve the fixture pages and their item API on a local port.
+
+    ``GET /api/items?offset=&limit=`` returns ``{"items", "html", "count", "done"}``
+    for ``total_items`` generated items, after ``api_delay`` seconds.
+    """
+
+    def __init__(self, total_items: int = 1000, api_delay: float = 0, host: str = "127.0.0.1"):
+        self.total_items = total_items
+        self.api_delay = api_delay
+        self.host = host
+        self._server = None
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_port
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def start(self):
+        fixture_server = self
+
+        class Handler(SimpleHTTPRequestHandler):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, directory=FIXTURES_DIR, **kwargs)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path == "/api/items":
+                    self.send_items(parse_qs(parsed.query))
+                    return
+                super().do_GET()
+
+            def send_items(self, query: dict):
+                if fixture_server.api_delay:
+                    time.sleep(fixture_server.api_delay)
+                offset = int(query.get("offset", ["0"])[0])
+                limit = int(query.get("limit", ["20"])[0])
+                items = get_items(offset, limit, fixture_server.total_items)
+                body = json.dumps(
+                    {
+                        "items": items,
+                        "html": "".join(render_item(item) for item in items),
+                        "count": len(items),
+                        "done": offset + len(items) >= fixture_server.total_items,
+                    }
+                ).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fixture-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -0,0 +1,140 @@
+"""Stand-in for a Chromium browser, serving just enough of the DevTools endpoint.
+
+It takes the same ``--remote-debugging-port`` / ``--user-data-dir`` flags,
+writes ``DevToolsActivePort``, answers ``/json/version`` and ``/json/list``
+and exits on CDP ``Browser.close``, so the launch and shutdown paths of
+``Browser`` can be measured on machines without Chrome.
+
+``STANDIN_STARTUP_DELAY`` (seconds) delays binding the port, like the
+browser initialising its profile.
+"""
+import base64
+import hashlib
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def parse_args(argv):
+    args = {}
+    for arg in argv:
+        if arg.startswith("--") and "=" in arg:
+            key, value = arg[2:].split("=", 1)
+            args[key] = value
+    return args
+
+
+def recv_exact(sock: socket.socket, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        data += chunk
+    return data
+
+
+def recv_frame(sock: socket.socket) -> bytes:
+    head = recv_exact(sock, 2)
+    length = head[1] & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", recv_exact(sock, 2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", recv_exact(sock, 8))[0]
+    mask = recv_exact(sock, 4) if head[1] & 0x80 else b"\0\0\0\0"
+    payload = recv_exact(sock, length)
+    return bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+
+def send_frame(sock: socket.socket, payload: bytes):
+    head = bytes([0x81])
+    if len(payload) < 126:
+        head += bytes([len(payload)])
+    elif len(payload) < 1 << 16:
+        head += bytes([126]) + struct.pack("!H", len(payload))
+    else:
+        head += bytes([127]) + struct.pack("!Q", len(payload))
+    sock.sendall(head + payload)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    port = int(args.get("remote-debugging-port", 0))
+    user_data_dir = args["user-data-dir"]
+    browser_id = os.urandom(8).hex()
+
+    delay = float(os.environ.get("STANDIN_STARTUP_DELAY", "0"))
+    if delay:
+        time.sleep(delay)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.headers.get("Upgrade", "").lower() == "websocket":
+                self.handle_websocket()
+                return
+
+            ws_url = f"ws://127.0.0.1:{server.server_port}/devtools/browser/{browser_id}"
+            if self.path.startswith("/json/version"):
+                body = {
+                    "Browser": "StandIn/1.0",
+                    "Protocol-Version": "1.3",
+                    "webSocketDebuggerUrl": ws_url,
+                }
+            elif self.path.startswith("/json"):
+                body = []
+            else:
+                self.send_error(404)
+                return
+
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def handle_websocket(self):
+            accept = base64.b64encode(
+                hashlib.sha1((self.headers["Sec-WebSocket-Key"] + WEBSOCKET_GUID).encode()).digest()
+            ).decode()
+            self.send_response(101)
+            self.send_header("Upgrade", "websocket")
+            self.send_header("Connection", "Upgrade")
+            self.send_header("Sec-WebSocket-Accept", accept)
+            self.end_headers()
+            self.wfile.flush()
+
+            sock = self.connection
+            while True:
+                try:
+                    message = json.loads(recv_frame(sock))
+                except (ConnectionError, ValueError):
+                    return
+                send_frame(sock, json.dumps({"id": message.get("id"), "result": {}}).encode())
+                if message.get("method") == "Browser.close":
+                    os._exit(0)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+
+    os.makedirs(user_data_dir, exist_ok=True)
+    with open(os.path.join(user_data_dir, "DevToolsActivePort"), "w") as f:
+        f.write(f"{server.server_port}\n/devtools/browser/{browser_id}\n")
+    print(f"DevTools listening on ws://127.0.0.1:{server.server_port}/devtools/browser/{browser_id}", flush=True)
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    threading.Event().wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
-import time
 import os
 from browser import Edge, run_in_browser
+from utils import get_clock
 
 from selenium.webdriver.remote.webdriver import WebDriver
 from selenium.webdriver.common.by import By
@@ -13,7 +13,7 @@ def delete_item(driver: WebDriver):
     for operator_button in operator_buttons:
         if operator_button.text == "不合适":
             operator_button.click()
-            time.sleep(1)
+            get_clock().sleep(1)
             operator_button.click()
             break
     
@@ -27,7 +27,7 @@ def process_first_item(driver: WebDriver):
 
     item = items[0]
     item.click()
-    time.sleep(10)
+    get_clock().sleep(10)
 
     try:
         name = WebDriverWait(item, 10).until(
@@ -72,16 +72,16 @@ def process_first_item(driver: WebDriver):
     for operator_button in operator_buttons:
         if operator_button.text == "求简历":
             operator_button.click()
-            time.sleep(10)
+            get_clock().sleep(10)
 
             send_button = driver.find_element(By.CSS_SELECTOR, 'span[class="boss-btn-primary boss-btn"]')
             send_button.click()
-            time.sleep(10)
+            get_clock().sleep(10)
 
             print(f"{name} {job} 求简历 发送成功")
 
             print(f"wait 1m")
-            time.sleep(60)
+            get_clock().sleep(60)
 
             delete_item(driver)
                 
@@ -105,7 +105,7 @@ def main():
                     raise e
 
             print(f"wait 10m")
-            time.sleep(600)
+            get_clock().sleep(600)
         
     run_in_browser(browser, profile, fn, kill_browser_before_running=True)
 
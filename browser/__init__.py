@@ -1,5 +1,40 @@
+from .blocking import BlockRules, block_resources
 from .browser import run_in_browser
+from .capture import CapturedResponse, ResponseCapture, capture_responses
 from .chrome import Chrome
+from .devtools import BrowserStartupError
 from .edge import Edge
+from .options import LaunchOptions
+from .extract import extract_all
+from .fleet import FleetResult, run_in_browsers, run_in_snapshots
+from .instrument import InstrumentedDriver, Recorder
+from .multiprofile import MultiProfileBrowser, run_in_profiles
+from .pool import BrowserPool
+from .snapshot import ProfileSnapshot
+from .tabs import Tab, TabPool, map_in_tabs
 
-__all__ = ["run_in_browser", "Chrome", "Edge"]
+__all__ = [
+    "run_in_browser",
+    "run_in_browsers",
+    "run_in_snapshots",
+    "run_in_profiles",
+    "MultiProfileBrowser",
+    "FleetResult",
+    "BrowserStartupError",
+    "BrowserPool",
+    "ProfileSnapshot",
+    "LaunchOptions",
+    "BlockRules",
+    "block_resources",
+    "capture_responses",
+    "ResponseCapture",
+    "CapturedResponse",
+    "extract_all",
+    "Tab",
+    "TabPool",
+    "map_in_tabs",
+    "InstrumentedDriver",
+    "Recorder",
+    "Chrome",
+    "Edge",
+]
@@ -0,0 +1,737 @@
+"""asyncio API to drive many browsers from a single event loop.
+
+Each browser is reached over its DevTools WebSocket with a small client
+built on asyncio streams, so a session costs a socket and a reader task
+instead of a thread and a chromedriver process. Page helpers and the
+scrolling bookkeeping are shared with ``Tab`` and ``iter_scroll``.
+
+Example::
+
+    async def fn(tab):
+        await tab.navigate("https://example.com")
+        return await tab.evaluate("document.title")
+
+    results = asyncio.run(run_in_browsers(Chrome, profiles, fn, timeout=300))
+"""
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import os
+import time
+import traceback
+import uuid
+from collections import defaultdict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Union
+from urllib.parse import urlparse
+
+from wsproto import ConnectionType, WSConnection
+from wsproto.events import AcceptConnection, CloseConnection, Ping, RejectConnection, Request, TextMessage
+from wsproto.utilities import LocalProtocolError, RemoteProtocolError
+
+from utils import VirtualClock, get_clock
+from .base import Browser
+from .cdp import CDPError
+from .devtools import BrowserStartupError, read_devtools_active_port, read_startup_log
+from .extract import EXTRACT_JS, FieldSpec, normalize_fields
+from .fleet import FleetResult
+from .options import LaunchOptions
+from .pacing import Pacer, get_pacer
+from .scroll import SCROLL_AND_WAIT_JS, SEEN_ATTRIBUTE, ScrollProgress
+from .sinks import ResultSink
+from .tabs import (
+    NodeRef,
+    async_script_expression,
+    evaluate_params,
+    evaluate_value,
+    key_events,
+    quad_center,
+    script_expression,
+)
+
+
+async def sleep(seconds: float, reason: Optional[str] = None):
+    """``asyncio.sleep`` that honours a ``VirtualClock`` installed with ``set_clock``."""
+    clock = get_clock()
+    if isinstance(clock, VirtualClock):
+        clock.sleep(seconds, reason=reason)
+        await asyncio.sleep(0)
+    elif seconds > 0:
+        await asyncio.sleep(seconds)
+
+
+async def get_json(port: int, path: str, host: str = "127.0.0.1", timeout: float = 1) -> Any:
+    """GET a JSON document from the DevTools HTTP endpoint."""
+
+    async def fetch():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            writer.write(
+                f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nConnection: close\r\n\r\n".encode()
+            )
+            await writer.drain()
+            head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+            status = int(head.split(" ", 2)[1])
+            headers = {
+                name.strip().lower(): value.strip()
+                for name, _, value in (line.partition(":") for line in head.split("\r\n")[1:])
+            }
+            if "content-length" in headers:
+                body = await reader.readexactly(int(headers["content-length"]))
+            else:
+                body = await reader.read()
+        finally:
+            writer.close()
+        if status != 200:
+            raise CDPError(f"GET {path} on port {port} returned {status}")
+        return json.loads(body)
+
+    return await asyncio.wait_for(fetch(), timeout)
+
+
+class AsyncCDPSession:
+    """Chrome DevTools Protocol client over a WebSocket, on asyncio streams.
+
+    Use ``await AsyncCDPSession.connect(ws_url)``. The WebSocket protocol
+    is handled by ``wsproto`` (installed with selenium), which only turns
+    bytes into events, so the socket stays on the event loop. Responses and
+    events are read by one task; event handlers run in it, and handlers
+    returning a coroutine are scheduled as tasks so they may ``send`` themselves.
+    """
+
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        ws: WSConnection,
+        ws_url: str,
+        timeout: float = 10,
+    ):
+        self.ws_url = ws_url
+        self.timeout = timeout
+        self._reader = reader
+        self._writer = writer
+        self._ws = ws
+        self._ids = 0
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._handlers: Dict[str, List[Callable[[dict], Any]]] = defaultdict(list)
+        self._waiters: Dict[str, List[asyncio.Future]] = defaultdict(list)
+        self._write_lock = asyncio.Lock()
+        self._closed = False
+        self._read_task = asyncio.ensure_future(self._read_loop())
+
+    @classmethod
+    async def connect(cls, ws_url: str, timeout: float = 10) -> "AsyncCDPSession":
+        url = urlparse(ws_url)
+        host, port = url.hostname, url.port or 80
+        path = url.path + (f"?{url.query}" if url.query else "")
+
+        async def handshake():
+            reader, writer = await asyncio.open_connection(host, port)
+            ws = WSConnection(ConnectionType.CLIENT)
+            # No Origin header, like websocket-client with suppress_origin
+            writer.write(ws.send(Request(host=f"{host}:{port}", target=path)))
+            await writer.drain()
+            while True:
+                # Events after the handshake stay buffered in ws for the read loop
+                for event in ws.events():
+                    if isinstance(event, AcceptConnection):
+                        return reader, writer, ws
+                    if isinstance(event, RejectConnection):
+                        writer.close()
+                        raise CDPError(f"WebSocket handshake with {ws_url} failed: {event.status_code}")
+                data = await reader.read(65536)
+                if not data:
+                    writer.close()
+                    raise CDPError(f"WebSocket handshake with {ws_url} failed: connection closed")
+                ws.receive_data(data)
+
+        reader, writer, ws = await asyncio.wait_for(handshake(), timeout)
+        return cls(reader, writer, ws, ws_url, timeout=timeout)
+
+    @classmethod
+    async def for_target(cls, port: int, target_id: str, host: str = "127.0.0.1", **kwargs):
+        ws_url = f"ws://{host}:{port}/devtools/page/{target_id}"
+        for target in await get_json(port, "/json/list", host=host):
+            if target.get("id") == target_id and target.get("webSocketDebuggerUrl"):
+                ws_url = target["webSocketDebuggerUrl"]
+                break
+        return await cls.connect(ws_url, **kwargs)
+
+    @classmethod
+    async def for_browser(cls, port: int, host: str = "127.0.0.1", **kwargs):
+        info = await get_json(port, "/json/version", host=host)
+        return await cls.connect(info["webSocketDebuggerUrl"], **kwargs)
+
+    async def _send_event(self, event):
+        async with self._write_lock:
+            self._writer.write(self._ws.send(event))
+            await self._writer.drain()
+
+    async def _read_loop(self):
+        error = CDPError("connection closed")
+        chunks = []
+        try:
+            while True:
+                for event in self._ws.events():
+                    if isinstance(event, TextMessage):
+                        chunks.append(event.data)
+                        if event.message_finished:
+                            self._handle(json.loads("".join(chunks)))
+                            chunks = []
+                    elif isinstance(event, Ping):
+                        await self._send_event(event.response())
+                    elif isinstance(event, CloseConnection):
+                        await self._send_event(event.response())
+                        return
+                data = await self._reader.read(65536)
+                if not data:
+                    return
+                self._ws.receive_data(data)
+        except (ConnectionError, LocalProtocolError, RemoteProtocolError) as e:
+            if not self._closed:
+                logging.debug(f"CDP connection {self.ws_url} closed: {e}")
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._closed = True
+            for future in list(self._pending.values()) + [f for fs in self._waiters.values() for f in fs]:
+                if not future.done():
+                    future.set_exception(error)
+            self._pending.clear()
+            self._waiters.clear()
+
+    def _handle(self, msg: dict):
+        if "id" in msg:
+            future = self._pending.pop(msg["id"], None)
+            if future is None or future.done():
+                return
+            if "error" in msg:
+                future.set_exception(CDPError(f"{msg['error'].get('message')}: {msg['error']}"))
+            else:
+                future.set_result(msg.get("result", {}))
+        elif "method" in msg:
+            self._dispatch(msg["method"], msg.get("params", {}))
+
+    def _dispatch(self, method: str, params: dict):
+        waiters = self._waiters.get(method)
+        if waiters:
+            for future in waiters:
+                if not future.done():
+                    future.set_result(params)
+            waiters.clear()
+
+        for handler in list(self._handlers.get(method, [])):
+            try:
+                result = handler(params)
+                if inspect.isawaitable(result):
+                    asyncio.ensure_future(result)
+            except Exception as e:
+                logging.warning(f"CDP handler for {method} failed: {e}")
+
+    async def send(self, method: str, params: Optional[dict] = None, timeout: Optional[float] = None) -> dict:
+        if self._closed:
+            raise CDPError(f"session closed, cannot send {method}")
+
+        self._ids += 1
+        msg_id = self._ids
+        future = asyncio.get_running_loop().create_future()
+        self._pending[msg_id] = future
+        try:
+            message = json.dumps({"id": msg_id, "method": method, "params": params or {}})
+            await self._send_event(TextMessage(data=message))
+            return await asyncio.wait_for(future, timeout or self.timeout)
+        finally:
+            self._pending.pop(msg_id, None)
+
+    def on(self, event: str, handler: Callable[[dict], Any]):
+        self._handlers[event].append(handler)
+
+    def off(self, event: str, handler: Callable[[dict], Any]):
+        if handler in self._handlers.get(event, []):
+            self._handlers[event].remove(handler)
+
+    def expect_event(self, event: str) -> asyncio.Future:
+        """Future resolved with the params of the next ``event``.
+
+        Create it before the command that triggers the event, then await it.
+        """
+        future = asyncio.get_running_loop().create_future()
+        if self._closed:
+            future.set_exception(CDPError("connection closed"))
+        else:
+            self._waiters[event].append(future)
+        return future
+
+    async def wait_for_event(self, event: str, timeout: Optional[float] = None) -> dict:
+        return await asyncio.wait_for(self.expect_event(event), timeout or self.timeout)
+
+    async def close(self):
+        if self._closed and self._read_task.done():
+            return
+        self._closed = True
+        try:
+            await asyncio.wait_for(self._send_event(CloseConnection(code=1000)), 1)
+        except Exception:
+            pass
+        self._read_task.cancel()
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except Exception:
+            pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+class AsyncTab:
+    """Async counterpart of ``Tab``: one page driven over its own CDP session."""
+
+    def __init__(self, session: AsyncCDPSession, target_id: str):
+        self.session = session
+        self.target_id = target_id
+        self.script_timeout = 30
+        self._root_id: Optional[int] = None
+
+    @classmethod
+    async def attach(cls, session: AsyncCDPSession, target_id: str) -> "AsyncTab":
+        tab = cls(session, target_id)
+        await session.send("Page.enable")
+        return tab
+
+    @classmethod
+    async def for_port(cls, port: int, host: str = "127.0.0.1", **kwargs) -> "AsyncTab":
+        """Attach to the first page of the browser on ``port``, opening one if there is none."""
+        pages = [t for t in await get_json(port, "/json/list", host=host) if t.get("type") == "page"]
+        if pages:
+            target_id = pages[0]["id"]
+        else:
+            async with await AsyncCDPSession.for_browser(port, host=host) as browser:
+                target_id = (await browser.send("Target.createTarget", {"url": "about:blank"}))["targetId"]
+        session = await AsyncCDPSession.for_target(port, target_id, host=host, **kwargs)
+        return await cls.attach(session, target_id)
+
+    async def navigate(self, url: str, timeout: float = 30):
+        """Open ``url`` and wait for its load event."""
+        self._root_id = None
+        loaded = self.session.expect_event("Page.loadEventFired")
+        try:
+            result = await self.session.send("Page.navigate", {"url": url}, timeout=timeout)
+            if result.get("errorText"):
+                raise CDPError(f"navigate to {url} failed: {result['errorText']}")
+            try:
+                await asyncio.wait_for(loaded, timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"{url} not loaded after {timeout}s")
+        finally:
+            loaded.cancel()
+
+    get = navigate
+
+    async def evaluate(self, expression: str, timeout: Optional[float] = None) -> Any:
+        """Evaluate a JavaScript expression, awaiting promises, and return its JSON value."""
+        return evaluate_value(
+            await self.session.send("Runtime.evaluate", evaluate_params(expression), timeout=timeout)
+        )
+
+    async def execute_script(self, script: str, *args) -> Any:
+        """Run a Selenium style script body that reads ``arguments``."""
+        return await self.evaluate(script_expression(script, args))
+
+    async def execute_async_script(self, script: str, *args) -> Any:
+        """Run a Selenium style async script, whose last argument is the callback."""
+        return await self.evaluate(async_script_expression(script, args), timeout=self.script_timeout)
+
+    async def current_url(self) -> str:
+        return await self.evaluate("location.href")
+
+    async def wait_for_function(self, expression: str, timeout: float = 10, interval: float = 0.1) -> Any:
+        """Poll ``expression`` until it is truthy and return its value."""
+        deadline = time.monotonic() + timeout
+        while True:
+            value = await self.evaluate(expression)
+            if value:
+                return value
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"{expression} still falsy after {timeout}s")
+            await asyncio.sleep(interval)
+
+    # ---- DOM
+
+    async def _dom(self, method: str, params: Optional[dict] = None) -> dict:
+        for attempt in range(2):
+            if self._root_id is None:
+                self._root_id = (await self.session.send("DOM.getDocument", {"depth": 0}))["root"]["nodeId"]
+            try:
+                return await self.session.send(method, {"nodeId": self._root_id, **(params or {})})
+            except CDPError:
+                if attempt:
+                    raise
+                self._root_id = None
+
+    async def query_selector(self, selector: str) -> Optional[int]:
+        return (await self._dom("DOM.querySelector", {"selector": selector}))["nodeId"] or None
+
+    async def query_selector_all(self, selector: str) -> List[int]:
+        return (await self._dom("DOM.querySelectorAll", {"selector": selector}))["nodeIds"]
+
+    async def wait_for_selector(self, selector: str, timeout: float = 10, interval: float = 0.1) -> int:
+        """Poll until an element matches ``selector`` and return its node id."""
+        deadline = time.monotonic() + timeout
+        while True:
+            node_id = await self.query_selector(selector)
+            if node_id:
+                return node_id
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"{selector} not found after {timeout}s")
+            await asyncio.sleep(interval)
+
+    async def _node(self, node: NodeRef) -> int:
+        if isinstance(node, int):
+            return node
+        node_id = await self.query_selector(node)
+        if not node_id:
+            raise CDPError(f"no element matches {node}")
+        return node_id
+
+    async def focus(self, node: NodeRef):
+        await self.session.send("DOM.focus", {"nodeId": await self._node(node)})
+
+    async def center(self, node: NodeRef):
+        node_id = await self._node(node)
+        await self.session.send("DOM.scrollIntoViewIfNeeded", {"nodeId": node_id})
+        return quad_center((await self.session.send("DOM.getBoxModel", {"nodeId": node_id}))["model"]["content"])
+
+    # ---- Input
+
+    async def _mouse(self, type: str, x: float, y: float, **params):
+        await self.session.send("Input.dispatchMouseEvent", {"type": type, "x": x, "y": y, **params})
+
+    async def click(self, node: NodeRef, button: str = "left", click_count: int = 1):
+        x, y = await self.center(node)
+        await self._mouse("mouseMoved", x, y)
+        await self._mouse("mousePressed", x, y, button=button, clickCount=click_count)
+        await self._mouse("mouseReleased", x, y, button=button, clickCount=click_count)
+
+    async def type(self, node: NodeRef, text: str):
+        await self.focus(node)
+        await self.session.send("Input.insertText", {"text": text})
+
+    async def press(self, key: str, modifiers: int = 0):
+        for params in key_events(key, modifiers):
+            await self.session.send("Input.dispatchKeyEvent", params)
+
+    async def close(self):
+        await self.session.close()
+
+
+async def wait_until_ready(
+    browser: Browser,
+    timeout: float = 30,
+    initial_interval: float = 0.05,
+    max_interval: float = 0.5,
+) -> dict:
+    """Async ``Browser.wait_until_ready``: poll the DevTools endpoint without blocking the loop."""
+    start_time = time.monotonic()
+    deadline = start_time + timeout
+    interval = initial_interval
+    port = browser.port
+    last_error = None
+
+    while True:
+        process = browser.process
+        if process is not None and process.poll() is not None:
+            raise BrowserStartupError(
+                f"browser exited with code {process.returncode} during startup, "
+                f"log {browser.log_file}:\n{read_startup_log(browser.log_file, browser._log_offset)}"
+            )
+
+        if port is None:
+            port = read_devtools_active_port(browser.user_data_dir)
+            if port is None:
+                last_error = "DevToolsActivePort not written yet"
+
+        if port is not None:
+            try:
+                info = await get_json(port, "/json/version", timeout=max(interval, 0.2))
+                logging.info(
+                    f"DevTools on port {port} ready in {time.monotonic() - start_time:.2f}s: "
+                    f"{info.get('Browser')}"
+                )
+                browser._set_port(port)
+                return info
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, CDPError, ValueError) as e:
+                last_error = e
+
+        if time.monotonic() >= deadline:
+            raise BrowserStartupError(
+                f"DevTools on port {port} not ready after {timeout}s: {last_error}, "
+                f"log {browser.log_file}:\n{read_startup_log(browser.log_file, browser._log_offset)}"
+            )
+
+        await asyncio.sleep(min(interval, max(0, deadline - time.monotonic())))
+        interval = min(interval * 2, max_interval)
+
+
+async def _in_thread(fn: Callable, *args, **kwargs):
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(fn, *args, **kwargs))
+
+
+async def launch_browser(
+    browser: Browser,
+    profile: str,
+    headless: bool = False,
+    port: Optional[int] = None,
+    startup_timeout: float = 30,
+    launch_options: Union[str, LaunchOptions, None] = None,
+) -> AsyncTab:
+    """Start ``browser`` for ``profile`` and return an ``AsyncTab`` on its first page."""
+    # Spawning and the process registry touch the disk, keep them off the loop
+    await _in_thread(browser.start, profile, port=port or 0, headless=headless, options=launch_options)
+    await wait_until_ready(browser, timeout=startup_timeout)
+    logging.info(f"browser port: {browser.port}")
+    return await AsyncTab.for_port(browser.port)
+
+
+async def run_in_browser(
+    browser: Browser,
+    profile: str,
+    fn: Callable[[AsyncTab], Awaitable[Any]],
+    headless: bool = False,
+    port: Optional[int] = None,
+    kill_browser_after_running: bool = False,
+    startup_timeout: float = 30,
+    launch_options: Union[str, LaunchOptions, None] = None,
+    timeout: Optional[float] = None,
+) -> Any:
+    """Start ``browser`` for ``profile`` and await ``fn(tab)``, returning its result.
+
+    ``timeout`` bounds ``fn`` and raises ``asyncio.TimeoutError`` when hit.
+    If the task is cancelled or times out, the tab session is closed and,
+    with ``kill_browser_after_running``, the browser is terminated before
+    the error propagates. A browser that failed to start is always
+    terminated.
+    """
+    tab = None
+    started = False
+    try:
+        tab = await launch_browser(
+            browser,
+            profile,
+            headless=headless,
+            port=port,
+            startup_timeout=startup_timeout,
+            launch_options=launch_options,
+        )
+        started = True
+        return await asyncio.wait_for(fn(tab), timeout)
+
+    finally:
+        if tab is not None:
+            await asyncio.shield(tab.close())
+        if kill_browser_after_running or not started:
+            # Shielded so that a second cancellation cannot leave the process behind
+            await asyncio.shield(_in_thread(browser.terminate))
+
+
+async def run_in_browsers(
+    browser_factory: Callable[[], Browser],
+    profiles: List[str],
+    fn: Callable[[AsyncTab], Awaitable[Any]],
+    max_concurrency: int = 16,
+    headless: bool = False,
+    timeout: Optional[float] = None,
+    close_after_running: bool = True,
+    **kwargs,
+) -> Dict[str, FleetResult]:
+    """Async ``run_in_browsers``: run ``fn`` against many profiles on one event loop.
+
+    ``timeout`` applies to each profile's ``fn``; a profile that times out
+    or fails is reported in its ``FleetResult`` and the others keep going.
+    Profiles sharing a user data dir run one after another, as in the
+    threaded ``run_in_browsers``.
+    Cancelling the call cancels every profile and closes their browsers.
+    """
+    if not profiles:
+        return {}
+    if len(set(profiles)) != len(profiles):
+        raise ValueError("profiles must be unique")
+
+    browsers = {profile: browser_factory() for profile in profiles}
+    dirs = [os.path.realpath(browser.user_data_dir) for browser in browsers.values()]
+    if len(set(dirs)) != len(dirs) and not close_after_running:
+        raise ValueError(
+            "profiles sharing a user data dir can only run one after another, "
+            "close_after_running=False would leave the dir locked"
+        )
+    # The browser locks its whole user data dir, profiles of one dir take turns
+    dir_locks = {d: asyncio.Lock() for d in dirs}
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def run_one(profile: str) -> FleetResult:
+        browser = browsers[profile]
+        async with dir_locks[os.path.realpath(browser.user_data_dir)], semaphore:
+            outcome = FleetResult(profile=profile)
+            start_time = time.monotonic()
+            try:
+                outcome.result = await run_in_browser(
+                    browser,
+                    profile,
+                    fn,
+                    headless=headless,
+                    kill_browser_after_running=close_after_running,
+                    timeout=timeout,
+                    **kwargs,
+                )
+            except Exception as e:
+                logging.error(f"Profile {profile} failed: {e!r}")
+                outcome.error = e
+                outcome.traceback = traceback.format_exc()
+            finally:
+                outcome.port = browser.port
+                outcome.elapsed = time.monotonic() - start_time
+            logging.info(f"Profile {profile} finished in {outcome.elapsed:.1f}s, ok: {outcome.ok}")
+            return outcome
+
+    outcomes = await asyncio.gather(*(run_one(profile) for profile in profiles))
+    failed = [o.profile for o in outcomes if not o.ok]
+    logging.info(f"Fleet finished: {len(profiles) - len(failed)} ok, {len(failed)} failed")
+    return {o.profile: o for o in outcomes}
+
+
+async def scroll_and_wait(
+    tab: AsyncTab,
+    scroll_container: Optional[str] = None,
+    timeout: float = 10,
+    settle_time: float = 0.3,
+    step_ratio: Optional[float] = None,
+    any_mutation: bool = False,
+) -> dict:
+    """Async ``scroll_and_wait``, see ``browser.scroll.scroll_and_wait``."""
+    if tab.script_timeout < timeout + 5:
+        tab.script_timeout = timeout + 5
+    result = await tab.execute_async_script(
+        SCROLL_AND_WAIT_JS,
+        scroll_container,
+        int(timeout * 1000),
+        int(settle_time * 1000),
+        step_ratio or 0,
+        any_mutation,
+    )
+    if result.get("error"):
+        raise ValueError(result["error"])
+    return result
+
+
+async def iter_scroll(
+    tab: AsyncTab,
+    url: str,
+    target_count: int,
+    item_selector: str,
+    fields: Dict[str, FieldSpec],
+    key_field: Optional[str] = None,
+    process_item: Optional[Callable[[dict], Any]] = None,
+    sink: Optional[ResultSink] = None,
+    resume: bool = True,
+    scroll_container: Optional[str] = None,
+    content_timeout: float = 10,
+    virtualized: bool = False,
+    viewport_step: float = 0.8,
+    max_seen_keys: Optional[int] = None,
+    max_scroll_attempts: int = 3,
+    pacer: Union[str, Pacer, None] = None,
+) -> AsyncIterator[Any]:
+    """Async ``iter_scroll`` in ``fields`` mode, yielding results as items are read.
+
+    Each pass reads the fields of the new items in one round-trip (see
+    ``extract_all``); ``process_item`` may be a plain or async function of
+    the row and may return ``(key, result)``. Pacing waits use
+    ``asyncio.sleep``, so other sessions keep running meanwhile.
+    """
+    if key_field is not None and key_field not in fields:
+        raise ValueError(f"key_field {key_field} is not one of the fields")
+    if virtualized and key_field is None:
+        raise ValueError("virtualized scrolling needs key_field")
+
+    specs = normalize_fields(fields)
+    stamp = (None, None) if virtualized else (SEEN_ATTRIBUTE, uuid.uuid4().hex)
+    pacer = get_pacer(pacer)
+    domain = urlparse(url).hostname
+    progress = ScrollProgress(
+        target_count,
+        sink=sink,
+        resume=resume,
+        max_seen_keys=max_seen_keys,
+        max_scroll_attempts=max_scroll_attempts,
+        virtualized=virtualized,
+    )
+
+    async def pause(reason: str):
+        await sleep(pacer.reserve(reason=reason, domain=domain), reason=reason)
+
+    try:
+        if progress.done:
+            return
+
+        await tab.navigate(url)
+        await pause(f"Open {url}")
+
+        while progress.keep_scrolling:
+            rows = await tab.execute_script(EXTRACT_JS, item_selector, specs, None, *stamp)
+            logging.info(f"Found {len(rows)} items")
+
+            for row in rows:
+                result_key = row.get(key_field) if key_field else None
+                if progress.seen(result_key):
+                    continue
+
+                result = row
+                if process_item is not None:
+                    try:
+                        result = process_item(row)
+                        if inspect.isawaitable(result):
+                            result = await result
+                    except Exception as e:
+                        logging.warning(f"Process item failed: {str(e)}")
+                        continue
+
+                accepted, result = progress.accept(result_key, result)
+                if not accepted:
+                    continue
+                yield result
+
+                if progress.done:
+                    break
+
+            if progress.done:
+                break
+
+            if virtualized:
+                progress.end_pass()
+                await scroll_and_wait(
+                    tab,
+                    scroll_container,
+                    timeout=content_timeout,
+                    step_ratio=viewport_step,
+                    any_mutation=True,
+                )
+                continue
+
+            loaded = await scroll_and_wait(tab, scroll_container, timeout=content_timeout)
+            progress.end_pass(loaded)
+
+        logging.info(f"Total results: {progress.count}")
+        pacer.report()
+
+    finally:
+        progress.flush()
+
+
+async def with_scroll(tab: AsyncTab, url: str, target_count: int, item_selector: str, fields, **kwargs) -> List[Any]:
+    """Collect the results of the async ``iter_scroll`` into a list."""
+    return [result async for result in iter_scroll(tab, url, target_count, item_selector, fields, **kwargs)]
@@ -1,14 +1,96 @@
 import logging
 import os
-import signal
+import re
+import shutil
 import subprocess
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
-from utils import is_windows
+from utils import is_linux, is_windows
+from .devtools import get_version_info, wait_for_devtools
+from .options import LaunchOptions, get_launch_options
+from .process import ProcessRecord, get_registry, pid_exists, terminate_process_tree
+
+
+# Chrome needs a few hundred MB of shared memory, Docker defaults to 64MB
+MIN_DEV_SHM_BYTES = 512 * 1024 * 1024
+
+
+def find_executable(candidates: Iterable[str]) -> Optional[str]:
+    """Return the first candidate that is an existing path or found on PATH."""
+    for candidate in candidates:
+        if os.path.isabs(candidate):
+            if os.path.exists(candidate):
+                return candidate
+        else:
+            path = shutil.which(candidate)
+            if path:
+                return path
+    return None
+
+
+_versions: Dict[Tuple[str, float], Optional[str]] = {}
+_versions_lock = threading.Lock()
+
+
+def read_major_version(executable: str, pattern: str) -> Optional[str]:
+    """Major version matched by ``pattern`` in ``<executable> --version``.
+
+    Cached per path until the file changes, since each read spawns a process.
+    A command name (e.g. ``google-chrome``) is looked up on PATH; if the
+    file cannot be found the version is read without caching.
+    """
+    key = None
+    found = executable if os.path.dirname(executable) else shutil.which(executable)
+    if found:
+        path = os.path.realpath(found)
+        try:
+            key = (path, os.path.getmtime(path))
+        except OSError:
+            pass
+    if key is not None:
+        with _versions_lock:
+            if key in _versions:
+                return _versions[key]
+
+    result = subprocess.run([executable, "--version"], capture_output=True, text=True)
+    match = re.search(pattern, result.stdout)
+    version = match.group(1) if match else None
+    if key is not None:
+        with _versions_lock:
+            _versions[key] = version
+    return version
+
+
+def has_display() -> bool:
+    """Whether a headed browser can start here, Linux servers often have no display."""
+    if not is_linux():
+        return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def _dev_shm_too_small() -> bool:
+    try:
+        st = os.statvfs("/dev/shm")
+    except OSError:
+        return True
+    return st.f_frsize * st.f_blocks < MIN_DEV_SHM_BYTES
+
+
+def _list_process_names() -> List[str]:
+    output = subprocess.run(["ps", "-A", "-o", "comm="], capture_output=True, text=True)
+    return [os.path.basename(line.strip()) for line in output.stdout.splitlines()]
 
 
 class Browser:
     pid = None
-    
+    port = None
+    pgid = None
+    process = None
+    log_file = None
+    resource_blocker = None
+    _log_offset = 0
+
     def __init__(self, browser_type: str):
         self.browser_type = browser_type
         self.driver = None
@@ -24,10 +106,125 @@ class Browser:
     def start(
         self,
         profile: str,
-        port: int = 9222,
+        port: int = 9777,
         headless: bool = False,
+        options: Union[str, LaunchOptions, None] = None,
+        **overrides,
     ):
-        raise NotImplementedError
+        """Launch the browser for ``profile``.
+
+        Args:
+            profile: Profile directory name, e.g. ``Default``
+            port: Remote debugging port, 0 to let the browser pick one
+            headless: Start in headless mode
+            options: ``LaunchOptions`` or a preset name (``default``, ``fast``, ``low-memory``)
+            **overrides: ``LaunchOptions`` fields overriding the preset for this call
+        """
+        options = get_launch_options(options, **overrides)
+        cmd = [
+            self.browser_path,
+            f"--remote-debugging-port={port}",
+            f"--user-data-dir={self.user_data_dir}",
+            f"--profile-directory={profile}",
+            *options.to_args(),
+        ]
+        cmd.extend(self._headless_args(headless))
+        logging.warning(" ".join(cmd))
+
+        self._spawn(cmd, profile, port)
+
+    def _headless_args(self, headless: bool) -> List[str]:
+        """Headless and Linux server flags shared by Chromium based browsers."""
+        if not headless and not has_display():
+            logging.warning("No display found, starting browser in headless mode")
+            headless = True
+
+        args = []
+        if headless:
+            args.append("--headless=new")
+        return args + self._server_args()
+
+    def _server_args(self) -> List[str]:
+        """Sandbox and shared memory flags needed on Linux servers."""
+        args = []
+        if is_linux():
+            # Chrome refuses to start as root with the sandbox enabled
+            if os.geteuid() == 0 or os.environ.get("BROWSER_NO_SANDBOX") == "1":
+                args.append("--no-sandbox")
+            if _dev_shm_too_small():
+                args.append("--disable-dev-shm-usage")
+        return args
+
+    def _spawn(self, cmd, profile: str, port: int):
+        log_dir = "logs"
+        if not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+
+        log_file = os.path.join(log_dir, f"{self.browser_type}-{profile}-startup.log")
+        self._log_offset = os.path.getsize(log_file) if os.path.exists(log_file) else 0
+
+        registry = get_registry()
+
+        if not port:
+            # Remove a stale file from a previous run so it is not mistaken for ours
+            try:
+                os.remove(os.path.join(self.user_data_dir, "DevToolsActivePort"))
+            except FileNotFoundError:
+                pass
+
+        # Own process group so that closing only reaches this browser's tree
+        if is_windows():
+            popen_kwargs = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            popen_kwargs = {"start_new_session": True}
+
+        with open(log_file, "a") as f:
+            process = subprocess.Popen(cmd, stdout=f, stderr=f, **popen_kwargs)
+
+        logging.info(
+            f"Started {self.browser_type} with PID {process.pid}. Logs are being written to {log_file}"
+        )
+        self.process = process
+        self.log_file = log_file
+        self.pid = process.pid
+        self.pgid = None if is_windows() else process.pid
+        # Port 0 lets the browser pick one, it is read back in wait_until_ready
+        self.port = port or None
+
+        registry.register(
+            ProcessRecord(
+                pid=self.pid,
+                pgid=self.pgid,
+                port=self.port,
+                profile=profile,
+                browser_type=self.browser_type,
+                launch_port=port,
+                user_data_dir=self.user_data_dir,
+            )
+        )
+        return process
+
+    def wait_until_ready(self, timeout: float = 30) -> dict:
+        """Block until the DevTools endpoint of the started browser responds."""
+        port, info = wait_for_devtools(
+            self.port,
+            timeout=timeout,
+            user_data_dir=self.user_data_dir,
+            process=self.process,
+            log_file=self.log_file,
+            log_offset=self._log_offset,
+        )
+        self._set_port(port)
+        return info
+
+    def _set_port(self, port: int):
+        """Record the port the browser actually listens on, e.g. after ``port=0``."""
+        if self.port != port:
+            self.port = port
+            record = get_registry().get(self.pid)
+            if record is not None:
+                record.port = port
+                get_registry().register(record)
 
     def get_user_data_dir(self):
         raise NotImplementedError
@@ -35,22 +232,56 @@ class Browser:
     def get_browser_path(self):
         raise NotImplementedError
 
-    def is_running(self):
+    def is_running(self) -> bool:
+        """Whether the browser launched by this instance is still alive."""
+        if self.process is not None:
+            return self.process.poll() is None
+        return pid_exists(self.pid)
+
+    def is_responsive(self, timeout: float = 1) -> bool:
+        """Whether the DevTools endpoint of this browser answers."""
+        if not self.port or not self.is_running():
+            return False
+        try:
+            get_version_info(self.port, timeout=timeout)
+            return True
+        except Exception:
+            return False
+
+    def is_any_running(self) -> bool:
+        """Whether any browser of this type runs on the machine, not only ours."""
         raise NotImplementedError
 
-    def close(self):
-        if self.pid:
-            try:
-                logging.warning(f"killing chrome with pid: {self.pid}")
-                if is_windows():
-                    subprocess.run(
-                        ["taskkill", "/F", "/PID", str(self.pid)], check=True
-                    )
-                else:
-                    os.kill(self.pid, signal.SIGKILL)
-
-            except Exception as e:
-                logging.error(f"kill chrome with pid: {self.pid} failed: {e}")
+    def kill_all(self):
+        """Kill every browser of this type on the machine, not only ours."""
+        raise NotImplementedError
+
+    def close(self, graceful_timeout: float = 5, term_timeout: float = 5):
+        self.terminate(graceful_timeout=graceful_timeout, term_timeout=term_timeout)
+
+    def terminate(self, graceful_timeout: float = 5, term_timeout: float = 5):
+        """Stop only the browser process tree started by this instance."""
+        if not self.pid:
+            return
+
+        try:
+            logging.info(f"closing {self.browser_type} with pid: {self.pid}")
+            terminate_process_tree(
+                self.pid,
+                pgid=self.pgid,
+                port=self.port,
+                process=self.process,
+                graceful_timeout=graceful_timeout,
+                term_timeout=term_timeout,
+            )
+        except Exception as e:
+            logging.error(f"close {self.browser_type} with pid: {self.pid} failed: {e}")
+            return
+
+        get_registry().unregister(self.pid)
+        self.pid = None
+        self.pgid = None
+        self.process = None
 
     def get_version(self):
         raise NotImplementedError
@@ -0,0 +1,179 @@
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List, Union
+
+from pydantic import BaseModel, ConfigDict, field_validator
+
+from .cdp import CDPSession
+
+# CDP Network.ResourceType values
+RESOURCE_TYPES = (
+    "Document",
+    "Stylesheet",
+    "Image",
+    "Media",
+    "Font",
+    "Script",
+    "XHR",
+    "Fetch",
+    "Ping",
+    "Manifest",
+    "Other",
+)
+
+ANALYTICS_URL_PATTERNS = [
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*hm.baidu.com*",
+    "*cnzz.com*",
+    "*sentry.io*",
+    "*hotjar.com*",
+]
+
+
+class BlockRules(BaseModel):
+    """Requests to block in a tab.
+
+    ``url_patterns`` use the ``Network.setBlockedURLs`` wildcard syntax,
+    ``resource_types`` are CDP resource types such as ``Image`` or ``Font``.
+    """
+
+    model_config = ConfigDict(extra="forbid")
+
+    url_patterns: List[str] = []
+    resource_types: List[str] = []
+
+    @classmethod
+    def preset(cls, name: str, **overrides) -> "BlockRules":
+        if name not in BLOCK_PRESETS:
+            raise ValueError(f"Unknown block preset: {name}, available: {list(BLOCK_PRESETS)}")
+        # Validated like a new instance, model_copy(update=...) would skip it
+        return cls.model_validate({**BLOCK_PRESETS[name].model_dump(), **overrides})
+
+    @field_validator("resource_types")
+    @classmethod
+    def _check_resource_types(cls, value: List[str]) -> List[str]:
+        unknown = set(value) - set(RESOURCE_TYPES)
+        if unknown:
+            raise ValueError(f"Unknown resource types: {sorted(unknown)}")
+        return value
+
+
+BLOCK_PRESETS: Dict[str, BlockRules] = {
+    "media": BlockRules(resource_types=["Image", "Media", "Font"]),
+    "analytics": BlockRules(url_patterns=ANALYTICS_URL_PATTERNS, resource_types=["Ping"]),
+    "text-only": BlockRules(
+        url_patterns=ANALYTICS_URL_PATTERNS,
+        resource_types=["Image", "Media", "Font", "Stylesheet", "Ping"],
+    ),
+}
+
+
+def get_block_rules(rules: Union[str, BlockRules, None]) -> BlockRules:
+    if rules is None:
+        return BlockRules()
+    if isinstance(rules, str):
+        return BlockRules.preset(rules)
+    return rules
+
+
+class ResourceBlocker:
+    """Block requests of one tab through CDP and count what was blocked.
+
+    URL patterns go through ``Network.setBlockedURLs``; resource types are
+    intercepted with ``Fetch.enable`` and failed with ``BlockedByClient``.
+    Blocked requests are never fetched, so their size is unknown;
+    ``bytes_loaded`` counts what the tab actually downloaded instead.
+    Tabs opened later by the page are not covered.
+    """
+
+    def __init__(self, session: CDPSession, rules: BlockRules):
+        self.session = session
+        self.rules = rules
+        self.blocked_requests = 0
+        self.blocked_by_type: Counter = Counter()
+        self.bytes_loaded = 0
+        self._lock = threading.Lock()
+
+    def start(self) -> "ResourceBlocker":
+        self.session.on("Network.loadingFailed", self._on_loading_failed)
+        self.session.on("Network.loadingFinished", self._on_loading_finished)
+        self.session.send("Network.enable")
+
+        if self.rules.url_patterns:
+            self.session.send("Network.setBlockedURLs", {"urls": self.rules.url_patterns})
+
+        if self.rules.resource_types:
+            self.session.on("Fetch.requestPaused", self._on_request_paused)
+            self.session.send(
+                "Fetch.enable",
+                {
+                    "patterns": [
+                        {"urlPattern": "*", "resourceType": t, "requestStage": "Request"}
+                        for t in self.rules.resource_types
+                    ]
+                },
+            )
+
+        logging.info(f"Blocking resources: {self.rules}")
+        return self
+
+    def stop(self):
+        try:
+            if self.rules.resource_types:
+                self.session.send("Fetch.disable")
+            if self.rules.url_patterns:
+                self.session.send("Network.setBlockedURLs", {"urls": []})
+        except Exception as e:
+            logging.debug(f"Disable resource blocking failed: {e}")
+        logging.info(f"Resource blocking stats: {self.stats}")
+
+    def _on_request_paused(self, params: dict):
+        try:
+            self.session.send(
+                "Fetch.failRequest",
+                {"requestId": params["requestId"], "errorReason": "BlockedByClient"},
+            )
+        except Exception as e:
+            logging.debug(f"Fail request {params.get('request', {}).get('url')} failed: {e}")
+            return
+        with self._lock:
+            self.blocked_requests += 1
+            self.blocked_by_type[params.get("resourceType", "Other")] += 1
+
+    def _on_loading_failed(self, params: dict):
+        # Requests blocked by setBlockedURLs; Fetch blocks are counted above
+        if params.get("blockedReason") != "inspector":
+            return
+        with self._lock:
+            self.blocked_requests += 1
+            self.blocked_by_type[params.get("type", "Other")] += 1
+
+    def _on_loading_finished(self, params: dict):
+        with self._lock:
+            self.bytes_loaded += int(params.get("encodedDataLength", 0))
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "blocked_requests": self.blocked_requests,
+                "blocked_by_type": dict(self.blocked_by_type),
+                "bytes_loaded": self.bytes_loaded,
+            }
+
+
+def block_resources(driver, rules: Union[str, BlockRules]) -> ResourceBlocker:
+    """Start blocking ``rules`` in the current tab of a Selenium driver.
+
+    Call ``stop()`` and ``session.close()`` on the result when done, or use
+    the ``block`` argument of ``run_in_browser`` which does both.
+    """
+    session = CDPSession.for_driver(driver)
+    try:
+        return ResourceBlocker(session, get_block_rules(rules)).start()
+    except Exception:
+        session.close()
+        raise
@@ -1,17 +1,72 @@
 import logging
-from pathlib import Path
-import time
-import traceback
-from typing import Any, Callable, List, Optional
-
-from utils import (
-    get_free_port,
-    sleep_random_time,
-)
+import os
+from typing import Callable, Optional, Union
+
 from .base import Browser
+from .blocking import BlockRules, block_resources
+from .instrument import Recorder, get_recorder, instrument_driver
+from .options import LaunchOptions
+from .tabs import Tab
+from .scroll import iter_scroll, with_scroll  # noqa: F401, kept importable from here
+
+
+def launch_browser(
+    browser: Browser,
+    profile: str,
+    headless: bool = False,
+    port: Optional[int] = None,
+    startup_timeout: float = 30,
+    launch_options: Union[str, LaunchOptions, None] = None,
+    instrument: Union[bool, Recorder, None] = None,
+    client: str = "selenium",
+):
+    """Start ``browser`` for ``profile`` and attach a WebDriver to it.
+
+    Without an explicit ``port`` the browser binds a free port itself
+    (``--remote-debugging-port=0``), which cannot race with other launches.
+
+    With ``client="cdp"`` no chromedriver is started, a ``Tab`` connected
+    directly to the first page over the DevTools WebSocket is returned instead.
+
+    With ``instrument`` the driver is an ``InstrumentedDriver`` timing every
+    command; True records to ``logs/trace-<browser>-<profile>.jsonl`` and
+    ``logs/metrics-<browser>-<profile>.prom``.
+    """
+    if client not in ("selenium", "cdp"):
+        raise ValueError(f"Unknown client: {client}, available: ['selenium', 'cdp']")
+
+    browser.start(
+        profile,
+        port=port or 0,
+        headless=headless,
+        options=launch_options,
+    )
+    try:
+        browser.wait_until_ready(timeout=startup_timeout)
+        logging.info(f"browser port: {browser.port}")
+
+        if instrument is True:
+            name = f"{browser.browser_type}-{profile.replace(' ', '_')}"
+            instrument = Recorder(
+                profile=profile,
+                jsonl_path=os.path.join("logs", f"trace-{name}.jsonl"),
+                prometheus_path=os.path.join("logs", f"metrics-{name}.prom"),
+            )
 
-from selenium import webdriver
-from selenium.webdriver.remote.webelement import WebElement
+        if client == "cdp":
+            driver = instrument_driver(Tab.for_port(browser.port), instrument)
+            browser.driver = driver
+            logging.info("cdp client connected")
+            return driver
+
+        driver = browser.get_driver(browser.port, instrument=instrument)
+        browser.driver = driver
+        logging.info("chrome webdriver started")
+        return driver
+    except Exception:
+        # A browser left running keeps the user data dir locked for the next try
+        browser.terminate()
+        raise
 
 
 def run_in_browser(
@@ -22,26 +77,46 @@ def run_in_browser(
     port: Optional[int] = None,
     kill_browser_before_running: bool = False,
     kill_browser_after_running: bool = False,
+    startup_timeout: float = 30,
+    launch_options: Union[str, LaunchOptions, None] = None,
+    block: Union[str, BlockRules, None] = None,
+    instrument: Union[bool, Recorder, None] = None,
+    client: str = "selenium",
 ):
-    if browser.is_running():
-        if kill_browser_before_running:
-            logging.info("Browser is already running, killing it")
-            browser.close()
+    """Start ``browser`` for ``profile`` and run ``fn(driver)`` in it.
+
+    ``block`` takes ``BlockRules`` or a preset name (``media``, ``analytics``,
+    ``text-only``) to block requests in the first tab while ``fn`` runs; the
+    blocker is available as ``browser.resource_blocker`` for its stats.
 
-    port = port or get_free_port()
-    logging.info(f"browser port: {port}")
+    ``instrument`` is passed to ``launch_browser``. A recorder created for
+    ``instrument=True`` is closed, writing its histograms, when ``fn`` returns;
+    a ``Recorder`` passed in is left open for the caller.
+
+    With ``client="cdp"`` ``fn`` receives a ``Tab`` talking to the browser
+    directly instead of a Selenium driver, see ``launch_browser``.
+    """
+    if kill_browser_before_running and browser.is_any_running():
+        # Frees the user data dir held by a manually opened browser, this
+        # kills every browser of the same type on the machine
+        logging.info("Browser is already running, killing it")
+        browser.kill_all()
 
     driver = None
     try:
-        browser.start(
+        driver = launch_browser(
+            browser,
             profile,
-            port=port,
             headless=headless,
+            port=port,
+            startup_timeout=startup_timeout,
+            launch_options=launch_options,
+            instrument=instrument,
+            client=client,
         )
-        sleep_random_time(reason="start browser")
 
-        driver = browser.get_driver(port)
-        logging.info("chrome webdriver started")
+        if block:
+            browser.resource_blocker = block_resources(driver, block)
 
         fn(driver)
 
@@ -49,97 +124,27 @@ def run_in_browser(
         raise e
 
     finally:
+        recorder = get_recorder(driver)
+        if recorder is not None and instrument is True:
+            recorder.close()
+
+        if client == "cdp" and driver is not None:
+            driver.close()
+            browser.driver = None
+
+        blocker = browser.resource_blocker
+        if blocker is not None:
+            browser.resource_blocker = None
+            blocker.stop()
+            blocker.session.close()
+
+        if client == "selenium" and driver is not None:
+            # Ends the session on the shared chromedriver, the browser keeps running
+            try:
+                driver.quit()
+            except Exception as e:
+                logging.warning(f"Quit webdriver session failed: {e}")
+            browser.driver = None
+
         if kill_browser_after_running:
             browser.close()
-
-
-def with_scroll(
-    driver: webdriver.Chrome,
-    url: str,
-    target_count: int,
-    find_items: Callable[[webdriver.Chrome], List[WebElement]],
-    process_item: Callable[[WebElement], Any],
-    process_item_interval: Optional[float] = None,
-) -> List[Any]:
-
-    results = []
-
-    try:
-        driver.get(url)
-        sleep_random_time(reason=f"Open {url}")
-
-        max_scroll_attempts = 3  # 最大滚动尝试次数
-        scroll_count = 0  # 滚动次数
-        previous_height = 0  # 前一次页面高度
-
-        result_keys = []
-
-        while len(results) < target_count and scroll_count < max_scroll_attempts:
-            # 获取当前页面高度
-            current_height = driver.execute_script("return document.body.scrollHeight")
-
-            items: List[WebElement] = find_items(driver)
-
-            for item in items:
-                try:
-                    result = process_item(item)
-                    if isinstance(result, tuple):
-                        result_key, result = result
-                        if result_key in result_keys:
-                            logging.info(
-                                f"Result key {result_key} already exists, skip"
-                            )
-                            continue
-                        result_keys.append(result_key)
-
-                    results.append(result)
-
-                    if len(results) >= target_count:
-                        logging.info(f"Found {len(results)} items, break")
-                        break
-
-                    if process_item_interval is not None:
-                        if process_item_interval > 0:
-                            logging.info(
-                                f"Sleep {process_item_interval} seconds before next item"
-                            )
-                            time.sleep(process_item_interval)
-                    else:
-                        sleep_random_time()
-
-                except Exception as e:
-                    logging.warning(f"Process item failed: {str(e)}")
-                    logging.warning(traceback.format_exc())
-                    continue
-
-            if len(results) >= target_count:
-                break
-
-            logging.info(f"Current results: {len(results)}")
-
-            # 滚动到页面底部
-            logging.info("Scroll to load more posts")
-            driver.execute_script(
-                "window.scrollTo(0, document.body.scrollHeight, {behavior: 'smooth'});"
-            )
-
-            # 等待新内容加载
-            sleep_random_time()
-
-            # 检查是否有新内容加载
-            if current_height == previous_height:
-                scroll_count += 1
-                logging.info(f"Scroll {scroll_count} times but no new content loaded")
-            else:
-                scroll_count = 0  # 重置计数器，因为发现了新内容
-                logging.info("New content loaded, reset scroll count")
-
-            previous_height = current_height
-
-        logging.info(f"Total results: {len(results)}")
-        return results
-
-    except Exception as e:
-        logging.error(f"with_scroll failed: {str(e)}")
-        logging.error(traceback.format_exc())
-        return results
@@ -0,0 +1,184 @@
+import base64
+import fnmatch
+import json
+import logging
+import queue
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Pattern, Union
+
+from .cdp import CDPSession
+
+UrlPattern = Union[str, Pattern]
+
+
+@dataclass
+class CapturedResponse:
+    url: str
+    status: int
+    mime_type: str
+    body: str
+    data: Any = None  # Parsed JSON, None if the body is not JSON
+    timestamp: float = 0.0
+
+
+def _compile(pattern: UrlPattern) -> Callable[[str], Any]:
+    # Globs must match the whole URL, regexes may match anywhere
+    if isinstance(pattern, str):
+        return re.compile(fnmatch.translate(pattern)).match
+    return pattern.search
+
+
+class ResponseCapture:
+    """Receive XHR / fetch responses of a tab as they arrive.
+
+    Subscribe to URL patterns (globs like ``*/api/feed*`` or compiled
+    regexes) and get parsed JSON payloads via callbacks or by iterating,
+    instead of reading the rendered DOM element by element.
+
+    Example::
+
+        with capture_responses(driver, ["*/wapi/zprelation/friend/*"]) as capture:
+            driver.get("https://www.zhipin.com/web/chat/index")
+            for response in capture.iter(timeout=10):
+                print(response.data)
+    """
+
+    def __init__(
+        self,
+        session: CDPSession,
+        patterns: List[UrlPattern],
+        json_only: bool = True,
+        max_buffered: int = 1000,
+        owns_session: bool = False,
+    ):
+        self.session = session
+        self.patterns = patterns
+        self._matchers = [_compile(p) for p in patterns]
+        self.json_only = json_only
+        self.owns_session = owns_session
+        self.dropped = 0
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_buffered)
+        self._callbacks: List[Callable[[CapturedResponse], None]] = []
+        self._requests: Dict[str, dict] = {}
+
+    def _matches(self, url: str) -> bool:
+        return any(match(url) for match in self._matchers)
+
+    def start(self) -> "ResponseCapture":
+        self.session.on("Network.responseReceived", self._on_response_received)
+        self.session.on("Network.loadingFinished", self._on_loading_finished)
+        self.session.on("Network.loadingFailed", self._on_loading_failed)
+        self.session.send("Network.enable")
+        return self
+
+    def stop(self):
+        self.session.off("Network.responseReceived", self._on_response_received)
+        self.session.off("Network.loadingFinished", self._on_loading_finished)
+        self.session.off("Network.loadingFailed", self._on_loading_failed)
+        if self.owns_session:
+            self.session.close()
+        if self.dropped:
+            logging.warning(f"Response capture dropped {self.dropped} responses, buffer full")
+
+    def subscribe(self, callback: Callable[[CapturedResponse], None]):
+        """Call ``callback`` for every captured response, on the CDP event thread."""
+        self._callbacks.append(callback)
+
+    def _on_response_received(self, params: dict):
+        if params.get("type") not in ("XHR", "Fetch", None):
+            return
+        response = params.get("response", {})
+        url = response.get("url", "")
+        if not self._matches(url):
+            return
+        mime_type = response.get("mimeType", "")
+        if self.json_only and "json" not in mime_type and "javascript" not in mime_type:
+            return
+        self._requests[params["requestId"]] = {
+            "url": url,
+            "status": response.get("status", 0),
+            "mime_type": mime_type,
+        }
+
+    def _on_loading_failed(self, params: dict):
+        self._requests.pop(params.get("requestId"), None)
+
+    def _on_loading_finished(self, params: dict):
+        meta = self._requests.pop(params.get("requestId"), None)
+        if meta is None:
+            return
+
+        try:
+            result = self.session.send(
+                "Network.getResponseBody", {"requestId": params["requestId"]}
+            )
+        except Exception as e:
+            logging.warning(f"Get response body of {meta['url']} failed: {e}")
+            return
+
+        body = result.get("body", "")
+        if result.get("base64Encoded"):
+            body = base64.b64decode(body).decode("utf-8", errors="replace")
+
+        try:
+            data = json.loads(body)
+        except ValueError:
+            if self.json_only:
+                logging.debug(f"Response of {meta['url']} is not JSON, skip")
+                return
+            data = None
+
+        captured = CapturedResponse(body=body, data=data, timestamp=time.time(), **meta)
+        for callback in self._callbacks:
+            try:
+                callback(captured)
+            except Exception as e:
+                logging.warning(f"Response callback failed: {e}")
+
+        try:
+            self._queue.put_nowait(captured)
+        except queue.Full:
+            self.dropped += 1
+
+    def get(self, timeout: Optional[float] = None) -> Optional[CapturedResponse]:
+        """Next captured response, None if nothing arrived within ``timeout``."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def iter(self, timeout: float = 10) -> Iterator[CapturedResponse]:
+        """Yield responses until none arrives for ``timeout`` seconds."""
+        while True:
+            captured = self.get(timeout=timeout)
+            if captured is None:
+                return
+            yield captured
+
+    def drain(self) -> List[CapturedResponse]:
+        """Return every buffered response without waiting."""
+        items = []
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                return items
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def capture_responses(driver, patterns: List[UrlPattern], **kwargs) -> ResponseCapture:
+    """Start capturing responses in the current tab of a Selenium driver."""
+    session = CDPSession.for_driver(driver)
+    try:
+        return ResponseCapture(session, patterns, owns_session=True, **kwargs).start()
+    except Exception:
+        session.close()
+        raise
@@ -0,0 +1,175 @@
+import itertools
+import json
+import logging
+import queue
+import threading
+from collections import defaultdict
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+import websocket
+
+
+class CDPError(Exception):
+    pass
+
+
+def get_targets(port: int, timeout: float = 5) -> List[dict]:
+    resp = requests.get(f"http://127.0.0.1:{port}/json/list", timeout=timeout)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def get_debugger_address(driver) -> str:
+    """``host:port`` of the browser a Selenium driver or a ``Tab`` is attached to."""
+    session = getattr(driver, "session", None)
+    if isinstance(session, CDPSession):
+        # A Tab has no capabilities, its WebSocket points at the browser
+        return urlparse(session.ws_url).netloc
+
+    caps = driver.capabilities
+    for key in ("goog:chromeOptions", "ms:edgeOptions"):
+        address = caps.get(key, {}).get("debuggerAddress")
+        if address:
+            return address
+    raise CDPError("driver has no debuggerAddress capability")
+
+
+class CDPSession:
+    """Minimal Chrome DevTools Protocol client over a WebSocket.
+
+    Runs next to Selenium on the same target (Chrome accepts several DevTools
+    clients). Responses are read on a background thread; event handlers run
+    on a separate dispatcher thread so they may call ``send`` themselves.
+    """
+
+    def __init__(self, ws_url: str, timeout: float = 10):
+        self.ws_url = ws_url
+        self.timeout = timeout
+        self._ws = websocket.create_connection(
+            ws_url, timeout=timeout, suppress_origin=True, enable_multithread=True
+        )
+        # Reads block until a message arrives, timeouts only apply to send()
+        self._ws.settimeout(None)
+
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, Future] = {}
+        self._pending_lock = threading.Lock()
+        self._handlers: Dict[str, List[Callable[[dict], None]]] = defaultdict(list)
+        self._events: queue.Queue = queue.Queue()
+        self._closed = False
+
+        self._reader = threading.Thread(target=self._read_loop, name="cdp-reader", daemon=True)
+        self._dispatcher = threading.Thread(
+            target=self._dispatch_loop, name="cdp-dispatcher", daemon=True
+        )
+        self._reader.start()
+        self._dispatcher.start()
+
+    @classmethod
+    def for_target(cls, port: int, target_id: str, host: str = "127.0.0.1", **kwargs):
+        ws_url = f"ws://{host}:{port}/devtools/page/{target_id}"
+        for target in get_targets(port):
+            if target.get("id") == target_id and target.get("webSocketDebuggerUrl"):
+                ws_url = target["webSocketDebuggerUrl"]
+                break
+        return cls(ws_url, **kwargs)
+
+    @classmethod
+    def for_driver(cls, driver, **kwargs):
+        """Open a session on the tab the Selenium driver is focused on.
+
+        chromedriver uses DevTools target ids as window handles. A ``Tab``
+        is accepted too, the new session then shares its target.
+        """
+        session = getattr(driver, "session", None)
+        if isinstance(session, CDPSession):
+            return cls(session.ws_url, **kwargs)
+
+        host, port = get_debugger_address(driver).rsplit(":", 1)
+        return cls.for_target(int(port), driver.current_window_handle, host=host, **kwargs)
+
+    def send(self, method: str, params: Optional[dict] = None, timeout: Optional[float] = None):
+        if self._closed:
+            raise CDPError(f"session closed, cannot send {method}")
+
+        msg_id = next(self._ids)
+        future = Future()
+        with self._pending_lock:
+            self._pending[msg_id] = future
+
+        try:
+            self._ws.send(json.dumps({"id": msg_id, "method": method, "params": params or {}}))
+            return future.result(timeout=timeout or self.timeout)
+        finally:
+            with self._pending_lock:
+                self._pending.pop(msg_id, None)
+
+    def on(self, event: str, handler: Callable[[dict], None]):
+        self._handlers[event].append(handler)
+
+    def off(self, event: str, handler: Callable[[dict], None]):
+        if handler in self._handlers.get(event, []):
+            self._handlers[event].remove(handler)
+
+    def _read_loop(self):
+        while not self._closed:
+            try:
+                raw = self._ws.recv()
+            except Exception as e:
+                if not self._closed:
+                    logging.debug(f"CDP connection {self.ws_url} closed: {e}")
+                break
+            if not raw:
+                continue
+
+            msg = json.loads(raw)
+            if "id" in msg:
+                with self._pending_lock:
+                    future = self._pending.get(msg["id"])
+                if future is None:
+                    continue
+                if "error" in msg:
+                    future.set_exception(CDPError(f"{msg['error'].get('message')}: {msg['error']}"))
+                else:
+                    future.set_result(msg.get("result", {}))
+            elif "method" in msg:
+                self._events.put(msg)
+
+        self._fail_pending(CDPError("connection closed"))
+        self._events.put(None)
+
+    def _dispatch_loop(self):
+        while True:
+            msg = self._events.get()
+            if msg is None:
+                break
+            for handler in list(self._handlers.get(msg["method"], [])):
+                try:
+                    handler(msg.get("params", {}))
+                except Exception as e:
+                    logging.warning(f"CDP handler for {msg['method']} failed: {e}")
+
+    def _fail_pending(self, error: Exception):
+        with self._pending_lock:
+            pending = list(self._pending.values())
+        for future in pending:
+            if not future.done():
+                future.set_exception(error)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._ws.close()
+        except Exception:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -1,13 +1,23 @@
 import logging
 import os
-import re
 import subprocess
+from typing import Union
 
-from utils import is_windows
-from .base import Browser
+from utils import get_xdg_config_home, is_linux, is_windows
+from .base import Browser, _list_process_names, find_executable, read_major_version
+from .instrument import Recorder, instrument_driver
+from .service import attach_driver
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
+
+LINUX_CHROME_PATHS = (
+    "google-chrome",
+    "google-chrome-stable",
+    "chromium",
+    "chromium-browser",
+    "/opt/google/chrome/chrome",
+    "/snap/bin/chromium",
+)
+LINUX_PROCESS_NAMES = ("chrome", "chromium", "chromium-browser")
 
 
 class Chrome(Browser):
@@ -16,7 +26,7 @@ class Chrome(Browser):
     _user_data_dir = None
 
     def __init__(self, browser_path: str = None, user_data_dir: str = None):
-        super().__init__("edge")
+        super().__init__("chrome")
 
         self._browser_path = browser_path
         self._user_data_dir = user_data_dir
@@ -28,6 +38,15 @@ class Chrome(Browser):
 
         if is_windows():  # Windows
             return os.path.expandvars(r"%LOCALAPPDATA%\Google\Chrome\User Data")
+        elif is_linux():
+            # Chromium keeps its profiles apart from Google Chrome
+            name = "google-chrome"
+            try:
+                if "chromium" in os.path.basename(os.path.realpath(self.browser_path)):
+                    name = "chromium"
+            except FileNotFoundError:
+                pass
+            return os.path.join(get_xdg_config_home(), name)
         else:  # MacOS
             return os.path.expanduser("~/Library/Application Support/Google/Chrome")
 
@@ -55,6 +74,13 @@ class Chrome(Browser):
                     "Chrome executable not found. Please install Chrome or check the installation path."
                 )
 
+        elif is_linux():
+            chrome_path = find_executable(LINUX_CHROME_PATHS)
+            if not chrome_path:
+                raise FileNotFoundError(
+                    "Chrome executable not found. Please install google-chrome or chromium, or set CHROME_PATH."
+                )
+
         else:  # MacOS
             chrome_path = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
             if not os.path.exists(chrome_path):
@@ -69,44 +95,16 @@ class Chrome(Browser):
 
         return chrome_path
 
-    def start(self, profile: str, port: int = 9777, headless: bool = False):
-        cmd = [
-            self.browser_path,
-            f"--remote-debugging-port={port}",
-            f"--user-data-dir={self.user_data_dir}",
-            f"--profile-directory={profile}",
-            "--disable-extensions",  # 禁用所有扩展
-            "--disable-plugins",  # 禁用插件
-            "--disable-popup-blocking",  # 禁用弹窗拦截
-            "--no-default-browser-check",  # 不检查默认浏览器
-            "--lang=en",
-            "--start-maximized",
-        ]
-        if headless:
-            cmd.append("--headless")
-        logging.warning(cmd)
-
-        log_dir = "logs"
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir)
-
-        log_file = os.path.join(log_dir, f"chrome-{profile}-startup.log")
-
-        with open(log_file, "a") as log_file:
-            process = subprocess.Popen(cmd, stdout=log_file, stderr=log_file)
-
-        logging.info(
-            f"Started chrome with PID {process.pid}. Logs are being written to {log_file}"
-        )
-        self.pid = process.pid
-
-    def is_running(self):
+    def is_any_running(self):
         try:
             if is_windows():
                 # Windows 使用 tasklist 命令
                 cmd = 'tasklist /FI "IMAGENAME eq chrome.exe" /NH'
                 output = subprocess.run(cmd, capture_output=True, text=True, shell=True)
                 return "chrome.exe" in output.stdout
+            elif is_linux():
+                names = _list_process_names()
+                return any(name in LINUX_PROCESS_NAMES for name in names)
             else:
                 # MacOS 使用 ps 命令
                 cmd = ["ps", "-A"]
@@ -117,9 +115,7 @@ class Chrome(Browser):
             logging.error(f"Error checking if Chrome is running: {e}")
             return False
 
-    def close(self):
-        super().close()
-
+    def kill_all(self):
         try:
             if is_windows():
                 # Windows 使用 taskkill 命令强制结束所有 Chrome 进程
@@ -128,6 +124,11 @@ class Chrome(Browser):
                     capture_output=True,
                     check=False,
                 )
+            elif is_linux():
+                for name in LINUX_PROCESS_NAMES:
+                    subprocess.run(
+                        ["pkill", "-9", "-x", name], capture_output=True, check=False
+                    )
             else:
                 # MacOS 使用 pkill 命令结束所有 Chrome 进程
                 subprocess.run(
@@ -140,26 +141,11 @@ class Chrome(Browser):
 
     @property
     def version(self):
-        # Google Chrome 131.0.6778.265
-        cmd = [self.browser_path, "--version"]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        version = re.search(r"Google Chrome (\d+)", result.stdout)
-        if version:
-            return version.group(1)
-        return None
-
-    def get_driver(self, port: int):
-        download_url = "https://googlechromelabs.github.io/chrome-for-testing/#stable"
-
-        driver_path = "/usr/local/bin/chromedriver"
-        if not os.path.exists(driver_path):
-            raise FileNotFoundError(
-                f"chromedriver not found at {driver_path}, please download from {download_url}"
-            )
-
-        logging.info("starting chrome webdriver")
-        options = webdriver.ChromeOptions()
-        options.add_experimental_option("debuggerAddress", f"127.0.0.1:{port}")
-        service = Service(executable_path=driver_path)
-        driver = webdriver.Chrome(options=options, service=service)
-        return driver
+        # Google Chrome 131.0.6778.265 / Chromium 131.0.6778.85
+        return read_major_version(self.browser_path, r"(?:Google Chrome|Chromium) (\d+)")
+
+    def get_driver(self, port: int, instrument: Union[bool, Recorder, None] = None):
+        # One chromedriver per driver version, shared by all browsers of this process
+        logging.info("attaching chrome webdriver")
+        driver = attach_driver("chrome", port, major=self.version)
+        return instrument_driver(driver, instrument)
@@ -0,0 +1,124 @@
+import json
+import logging
+import os
+import subprocess
+import time
+from typing import Optional, Tuple
+
+import requests
+
+
+class BrowserStartupError(Exception):
+    pass
+
+
+def get_version_info(port: int, timeout: float = 1) -> dict:
+    """Fetch ``/json/version`` from the DevTools HTTP endpoint."""
+    resp = requests.get(f"http://127.0.0.1:{port}/json/version", timeout=timeout)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def read_devtools_active_port(user_data_dir: str) -> Optional[int]:
+    """Read the port written by a browser started with ``--remote-debugging-port=0``."""
+    try:
+        with open(os.path.join(user_data_dir, "DevToolsActivePort")) as f:
+            return int(f.readline().strip())
+    except (OSError, ValueError):
+        # Missing or still being written
+        return None
+
+
+def read_startup_log(log_file: Optional[str], offset: int = 0) -> str:
+    if not log_file:
+        return ""
+    try:
+        with open(log_file, "r", errors="replace") as f:
+            f.seek(offset)
+            return f.read()
+    except OSError as e:
+        return f"<failed to read {log_file}: {e}>"
+
+
+def wait_for_devtools(
+    port: Optional[int],
+    timeout: float = 30,
+    user_data_dir: Optional[str] = None,
+    process: Optional[subprocess.Popen] = None,
+    log_file: Optional[str] = None,
+    log_offset: int = 0,
+    initial_interval: float = 0.05,
+    max_interval: float = 0.5,
+) -> Tuple[int, dict]:
+    """Wait until the DevTools endpoint on ``port`` answers.
+
+    Args:
+        port: Remote debugging port of the browser, None to read it from
+            ``DevToolsActivePort`` in ``user_data_dir`` once the browser wrote it
+        timeout: Seconds to wait before giving up
+        user_data_dir: User data dir of the browser, required when ``port`` is None
+        process: Browser process, used to fail early if it exits during startup
+        log_file: Startup log of the browser, attached to the error message
+        log_offset: Position in ``log_file`` where this launch started writing
+        initial_interval: First polling interval, doubled up to ``max_interval``
+        max_interval: Upper bound of the polling interval
+
+    Returns:
+        tuple: The port and the ``/json/version`` payload
+
+    Raises:
+        BrowserStartupError: If the process exits or the endpoint is not ready in time
+    """
+    start_time = time.monotonic()
+    deadline = start_time + timeout
+    interval = initial_interval
+    last_error = None
+
+    while True:
+        if process is not None and process.poll() is not None:
+            raise BrowserStartupError(
+                f"browser exited with code {process.returncode} during startup, "
+                f"log {log_file}:\n{read_startup_log(log_file, log_offset)}"
+            )
+
+        if port is None:
+            port = read_devtools_active_port(user_data_dir)
+            if port is None:
+                last_error = "DevToolsActivePort not written yet"
+
+        if port is not None:
+            try:
+                info = get_version_info(port, timeout=max(interval, 0.2))
+                logging.info(
+                    f"DevTools on port {port} ready in {time.monotonic() - start_time:.2f}s: "
+                    f"{info.get('Browser')}"
+                )
+                return port, info
+            except (requests.RequestException, ValueError) as e:
+                last_error = e
+
+        if time.monotonic() >= deadline:
+            raise BrowserStartupError(
+                f"DevTools on port {port} not ready after {timeout}s: {last_error}, "
+                f"log {log_file}:\n{read_startup_log(log_file, log_offset)}"
+            )
+
+        time.sleep(min(interval, max(0, deadline - time.monotonic())))
+        interval = min(interval * 2, max_interval)
+
+
+def close_browser(port: int, timeout: float = 5):
+    """Ask the browser on ``port`` to shut down via CDP ``Browser.close``."""
+    import websocket
+
+    ws_url = get_version_info(port, timeout=timeout)["webSocketDebuggerUrl"]
+    ws = websocket.create_connection(ws_url, timeout=timeout, suppress_origin=True)
+    try:
+        ws.send(json.dumps({"id": 1, "method": "Browser.close"}))
+        try:
+            ws.recv()
+        except Exception:
+            # The browser may drop the connection before replying
+            pass
+    finally:
+        ws.close()
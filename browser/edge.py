@@ -1,13 +1,20 @@
 import logging
 import os
-import re
 import subprocess
+from typing import Union
 
-from utils import is_windows
-from .base import Browser
+from utils import get_xdg_config_home, is_linux, is_windows
+from .base import Browser, _list_process_names, find_executable, read_major_version
+from .instrument import Recorder, instrument_driver
+from .service import attach_driver
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
+
+LINUX_EDGE_PATHS = (
+    "microsoft-edge",
+    "microsoft-edge-stable",
+    "microsoft-edge-beta",
+    "/opt/microsoft/msedge/msedge",
+)
 
 
 class Edge(Browser):
@@ -28,6 +35,8 @@ class Edge(Browser):
 
         if is_windows():  # Windows
             return os.path.expandvars(r"%LOCALAPPDATA%\Microsoft\Edge\User Data")
+        elif is_linux():
+            return os.path.join(get_xdg_config_home(), "microsoft-edge")
         else:
             return os.path.expanduser("~/Library/Application Support/Microsoft Edge")
 
@@ -36,50 +45,32 @@ class Edge(Browser):
         if self._browser_path:
             return self._browser_path
 
+        edge_path_env = os.environ.get("EDGE_PATH")
+        if edge_path_env and os.path.exists(edge_path_env):
+            return edge_path_env
+
         if is_windows():
             return "C:\Program Files (x86)\Microsoft\Edge\Application\msedge.exe"
+        elif is_linux():
+            edge_path = find_executable(LINUX_EDGE_PATHS)
+            if not edge_path:
+                raise FileNotFoundError(
+                    "Edge executable not found. Please install microsoft-edge or set EDGE_PATH."
+                )
+            return edge_path
         else:
             return os.path.expandvars(
                 "/Applications/Microsoft Edge.app/Contents/MacOS/Microsoft Edge"
             )
 
-    def start(self, profile: str, port: int = 9777, headless: bool = False):
-        cmd = [
-            self.browser_path,
-            f"--remote-debugging-port={port}",
-            f"--user-data-dir={self.user_data_dir}",
-            f"--profile-directory={profile}",
-            "--disable-extensions",  # 禁用所有扩展
-            "--disable-plugins",  # 禁用插件
-            "--disable-popup-blocking",  # 禁用弹窗拦截
-            "--no-default-browser-check",  # 不检查默认浏览器
-            "--lang=en",
-            "--start-maximized",
-        ]
-        if headless:
-            cmd.append("--headless")
-        logging.warning(" ".join(cmd))
-
-        log_dir = "logs"
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir)
-
-        log_file = os.path.join(log_dir, f"edge-{profile}-startup.log")
-
-        with open(log_file, "a") as log_file:
-            process = subprocess.Popen(cmd, stdout=log_file, stderr=log_file)
-
-        logging.info(
-            f"Started Browser with PID {process.pid}. Logs are being written to {log_file}"
-        )
-        self.pid = process.pid
-
-    def is_running(self):
+    def is_any_running(self):
         try:
             if is_windows():
                 cmd = 'tasklist /FI "IMAGENAME eq msedge.exe" /NH'
                 output = subprocess.run(cmd, capture_output=True, text=True, shell=True)
                 return "edge.exe" in output.stdout
+            elif is_linux():
+                return "msedge" in _list_process_names()
             else:
                 # MacOS 使用 ps 命令
                 cmd = ["ps", "-A"]
@@ -93,9 +84,7 @@ class Edge(Browser):
             logging.error(f"Error checking if Chrome is running: {e}")
             return False
 
-    def close(self):
-        super().close()
-
+    def kill_all(self):
         try:
             if is_windows():
                 subprocess.run(
@@ -103,6 +92,10 @@ class Edge(Browser):
                     capture_output=True,
                     check=False,
                 )
+            elif is_linux():
+                subprocess.run(
+                    ["pkill", "-9", "-x", "msedge"], capture_output=True, check=False
+                )
             else:
                 subprocess.run(
                     ["pkill", "-9", "Microsoft Edge"], capture_output=True, check=False
@@ -113,25 +106,10 @@ class Edge(Browser):
     @property
     def version(self):
         # Microsoft Edge 132.0.2957.127
-        cmd = [self.browser_path, "--version"]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        version = re.search(r"Microsoft Edge (\d+)", result.stdout)
-        if version:
-            return version.group(1)
-        return None
-
-    def get_driver(self, port: int):
-        download_url = "https://developer.microsoft.com/zh-cn/microsoft-edge/tools/webdriver/?form=MA13LH"
-
-        driver_path = "./msedgedriver.exe"
-        if not os.path.exists(driver_path):
-            raise FileNotFoundError(
-                f"msedgedriver not found at {driver_path}, please download from {download_url}"
-            )
+        return read_major_version(self.browser_path, r"Microsoft Edge (\d+)")
 
-        logging.info("starting msedge webdriver")
-        options = webdriver.EdgeOptions()
-        options.add_experimental_option("debuggerAddress", f"127.0.0.1:{port}")
-        service = Service(executable_path=driver_path)
-        driver = webdriver.Edge(options=options, service=service)
-        return driver
+    def get_driver(self, port: int, instrument: Union[bool, Recorder, None] = None):
+        # One msedgedriver per driver version, shared by all browsers of this process
+        logging.info("attaching edge webdriver")
+        driver = attach_driver("edge", port, major=self.version)
+        return instrument_driver(driver, instrument)
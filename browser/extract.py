@@ -0,0 +1,92 @@
+from typing import Dict, List, Optional, Tuple, Union
+
+# name -> attr, or (sub_selector, attr), or (sub_selector, attr, many)
+FieldSpec = Union[str, Tuple[Optional[str], str], Tuple[Optional[str], str, bool]]
+
+# Read every field of every matching item in the page, in a single round-trip.
+# `attr` is "text", "html", "outer_html", "prop:<name>" or an attribute name.
+# With `stamp` only items not yet stamped with `runId` are returned, and stamped.
+EXTRACT_JS = """
+const [itemSelector, specs, rootSelector, stampAttr, runId] = arguments;
+const root = rootSelector ? document.querySelector(rootSelector) : document;
+if (!root) return [];
+const read = (el, attr) => {
+    if (!el) return null;
+    if (attr === 'text') return (el.innerText || el.textContent || '').trim();
+    if (attr === 'html') return el.innerHTML;
+    if (attr === 'outer_html') return el.outerHTML;
+    if (attr.startsWith('prop:')) {
+        const value = el[attr.slice(5)];
+        return value === undefined ? null : value;
+    }
+    return el.getAttribute(attr);
+};
+const rows = [];
+for (const item of root.querySelectorAll(itemSelector)) {
+    if (stampAttr) {
+        if (item.getAttribute(stampAttr) === runId) continue;
+        item.setAttribute(stampAttr, runId);
+    }
+    const row = {};
+    for (const [name, sub, attr, many] of specs) {
+        if (many) {
+            const els = sub ? item.querySelectorAll(sub) : [item];
+            row[name] = Array.from(els, (el) => read(el, attr));
+        } else {
+            row[name] = read(sub ? item.querySelector(sub) : item, attr);
+        }
+    }
+    rows.push(row);
+}
+return rows;
+"""
+
+
+def normalize_fields(fields: Dict[str, FieldSpec]) -> List[list]:
+    specs = []
+    for name, spec in fields.items():
+        if isinstance(spec, str):
+            sub_selector, attr, many = None, spec, False
+        elif len(spec) == 2:
+            (sub_selector, attr), many = spec, False
+        elif len(spec) == 3:
+            sub_selector, attr, many = spec
+        else:
+            raise ValueError(f"Invalid field spec for {name}: {spec}")
+        specs.append([name, sub_selector, attr, bool(many)])
+    return specs
+
+
+def extract_all(
+    driver,
+    item_selector: str,
+    fields: Dict[str, FieldSpec],
+    root_selector: Optional[str] = None,
+) -> List[dict]:
+    """Read fields of all items matching ``item_selector`` in one ``execute_script``.
+
+    Example::
+
+        extract_all(driver, "div.post", {
+            "title": ("h2", "text"),
+            "url": ("a.link", "href"),
+            "id": "data-id",
+            "tags": ("span.tag", "text", True),
+        })
+
+    Args:
+        driver: WebDriver
+        item_selector: CSS selector of the items
+        fields: Field name -> attr, ``(sub_selector, attr)`` or
+            ``(sub_selector, attr, many)``. ``attr`` is ``text``, ``html``,
+            ``outer_html``, ``prop:<property>`` or an attribute name. A
+            ``None`` sub selector reads the item itself; ``many`` returns a
+            list for all matches. Missing elements give ``None``.
+        root_selector: Only look for items under this element
+
+    Returns:
+        list: One plain dict per item
+    """
+    return driver.execute_script(
+        EXTRACT_JS, item_selector, normalize_fields(fields), root_selector, None, None
+    )
@@ -0,0 +1,220 @@
+import functools
+import logging
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Tuple
+
+from .base import Browser
+from .browser import run_in_browser
+from .snapshot import snapshot_browser
+
+
+@dataclass
+class FleetResult:
+    """Outcome of running a task against one profile."""
+
+    profile: str
+    result: Any = None
+    error: Optional[BaseException] = None
+    traceback: Optional[str] = None
+    port: Optional[int] = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def run_in_browsers(
+    browser_factory: Callable[[], Browser],
+    profiles: List[str],
+    fn: Callable,
+    max_concurrency: int = 4,
+    headless: bool = False,
+    close_after_running: bool = True,
+    **kwargs,
+) -> Dict[str, FleetResult]:
+    """Run ``fn`` against many profiles concurrently.
+
+    Each profile gets its own ``Browser`` instance from ``browser_factory``,
+    its own debugging port and its own ``logs/<type>-<profile>-startup.log``.
+    A failing profile never aborts the others: its exception is stored in
+    the returned ``FleetResult``.
+
+    The browser locks its whole user data dir, so profiles of the same dir
+    (e.g. ``Default`` and ``Profile 1`` of ``Chrome()``) run one after
+    another; only profiles in different user data dirs run concurrently.
+    To check many profiles of one dir, ``run_in_profiles`` hosts them in
+    one browser, and ``run_in_snapshots`` runs copies of one profile.
+
+    Args:
+        browser_factory: Callable returning a fresh ``Browser`` (e.g. ``Chrome``)
+        profiles: Profile directory names, e.g. ``["Default", "Profile 1"]``
+        fn: Task function, called with the WebDriver of each profile
+        max_concurrency: Maximum number of browsers running at the same time
+        headless: Start the browsers in headless mode
+        close_after_running: Terminate each browser once its task is done,
+            required when profiles share a user data dir
+        **kwargs: Extra keyword arguments passed to ``run_in_browser``
+
+    Returns:
+        dict: Profile name -> ``FleetResult``, in the order of ``profiles``
+    """
+    if not profiles:
+        return {}
+
+    if len(set(profiles)) != len(profiles):
+        raise ValueError("profiles must be unique")
+
+    browsers = {profile: browser_factory() for profile in profiles}
+    by_dir: Dict[str, List[str]] = {}
+    for profile, browser in browsers.items():
+        by_dir.setdefault(os.path.realpath(browser.user_data_dir), []).append(profile)
+    shared = {d: p for d, p in by_dir.items() if len(p) > 1}
+    if shared:
+        if not close_after_running:
+            raise ValueError(
+                f"profiles {list(shared.values())} share a user data dir and can only run one "
+                f"after another, close_after_running=False would leave the dir locked; "
+                f"use run_in_profiles to keep them open in one browser"
+            )
+        logging.info(
+            f"Profiles sharing a user data dir run one at a time: {list(shared.values())}, "
+            f"use run_in_profiles to host them in one browser"
+        )
+
+    return _run_fleet(
+        [(profile, profile, functools.partial(nullcontext, browser)) for profile, browser in browsers.items()],
+        fn,
+        max_concurrency=max_concurrency,
+        headless=headless,
+        close_after_running=close_after_running,
+        **kwargs,
+    )
+
+
+def run_in_snapshots(
+    browser_factory: Callable[..., Browser],
+    profile: str,
+    fn: Callable,
+    copies: int,
+    max_concurrency: Optional[int] = None,
+    headless: bool = False,
+    snapshot_root: Optional[str] = None,
+    **kwargs,
+) -> Dict[str, FleetResult]:
+    """Run ``fn`` in ``copies`` browsers sharing the login state of one profile.
+
+    Each worker opens its own snapshot of ``profile`` (see
+    ``ProfileSnapshot``), so the browsers do not contend for the user data
+    dir. Changes made by ``fn`` are discarded with the snapshots; use it
+    for read-only work such as scraping with a logged-in account.
+
+    Args:
+        browser_factory: Browser class taking ``user_data_dir``, e.g. ``Chrome``
+        profile: Profile directory name to snapshot
+        fn: Task function, called with the WebDriver of each copy
+        copies: Number of browsers to run
+        max_concurrency: Maximum number of browsers running at the same time, ``copies`` if None
+        headless: Start the browsers in headless mode
+        snapshot_root: Directory to create the snapshots in, see ``get_snapshot_root``
+        **kwargs: Extra keyword arguments passed to ``run_in_browser``
+
+    Returns:
+        dict: ``<profile>#<n>`` -> ``FleetResult``
+    """
+    source_dir = browser_factory().user_data_dir
+    return _run_fleet(
+        [
+            (
+                f"{profile}#{i}",
+                profile,
+                lambda: snapshot_browser(browser_factory, profile, root=snapshot_root, source_dir=source_dir),
+            )
+            for i in range(copies)
+        ],
+        fn,
+        max_concurrency=max_concurrency or copies,
+        headless=headless,
+        close_after_running=True,
+        **kwargs,
+    )
+
+
+def _run_fleet(
+    jobs: List[Tuple[str, str, Callable[[], ContextManager[Browser]]]],
+    fn: Callable,
+    max_concurrency: int,
+    headless: bool,
+    close_after_running: bool,
+    **kwargs,
+) -> Dict[str, FleetResult]:
+    """Run ``fn`` for each ``(name, profile, open_browser)`` job in a thread pool.
+
+    Jobs whose browsers use the same user data dir are serialized.
+    """
+    if not jobs:
+        return {}
+
+    dir_locks: Dict[str, threading.Lock] = {}
+    dir_locks_lock = threading.Lock()
+
+    def dir_lock(browser: Browser) -> threading.Lock:
+        key = os.path.realpath(browser.user_data_dir)
+        with dir_locks_lock:
+            return dir_locks.setdefault(key, threading.Lock())
+
+    def run_one(name: str, profile: str, open_browser) -> FleetResult:
+        threading.current_thread().name = f"fleet-{name}"
+        outcome = FleetResult(profile=name)
+        start_time = time.monotonic()
+
+        def task(driver):
+            outcome.result = fn(driver)
+
+        try:
+            with open_browser() as browser, dir_lock(browser):
+                try:
+                    run_in_browser(
+                        browser,
+                        profile,
+                        task,
+                        headless=headless,
+                        # Killing "all browsers" would take down sibling workers
+                        kill_browser_before_running=False,
+                        kill_browser_after_running=False,
+                        **kwargs,
+                    )
+                finally:
+                    outcome.port = getattr(browser, "port", None)
+                    if close_after_running:
+                        browser.terminate()
+        except Exception as e:
+            logging.error(f"Profile {name} failed: {e}")
+            outcome.error = e
+            outcome.traceback = traceback.format_exc()
+
+        finally:
+            outcome.elapsed = time.monotonic() - start_time
+
+        return outcome
+
+    results: Dict[str, FleetResult] = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        futures = [executor.submit(run_one, *job) for job in jobs]
+        for future in as_completed(futures):
+            outcome = future.result()
+            results[outcome.profile] = outcome
+            logging.info(
+                f"Profile {outcome.profile} finished in {outcome.elapsed:.1f}s, "
+                f"ok: {outcome.ok}"
+            )
+
+    failed = [r.profile for r in results.values() if not r.ok]
+    logging.info(f"Fleet finished: {len(jobs) - len(failed)} ok, {len(failed)} failed")
+    return {name: results[name] for name, _, _ in jobs}
@@ -0,0 +1,341 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from selenium.webdriver.remote.webelement import WebElement
+from selenium.webdriver.support.ui import WebDriverWait as _WebDriverWait
+
+# Upper bounds of the histogram buckets, in seconds
+HISTOGRAM_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Driver properties that are a WebDriver round-trip each
+TIMED_PROPERTIES = {
+    "current_url",
+    "current_window_handle",
+    "page_source",
+    "title",
+    "window_handles",
+}
+
+
+@dataclass
+class Span:
+    name: str
+    kind: str  # command, wait, sleep or step
+    start: float  # epoch seconds
+    duration: float
+    profile: Optional[str] = None
+    step: Optional[str] = None
+    thread: Optional[str] = None
+    error: Optional[str] = None
+    attrs: Dict[str, Any] = field(default_factory=dict)
+
+
+class Recorder:
+    """Collect timing spans of one driver, tagged with profile and task step.
+
+    Spans are appended to ``jsonl_path`` as they finish (and kept in
+    ``spans`` with ``keep_spans``), and ``close``
+    writes the aggregated histograms to ``prometheus_path`` in the
+    Prometheus text format (e.g. for the node exporter textfile collector).
+
+    Example::
+
+        recorder = Recorder(profile="Default", jsonl_path="logs/trace.jsonl")
+        driver = InstrumentedDriver(driver, recorder)
+        with recorder.step("login"):
+            driver.get("https://example.com")
+    """
+
+    def __init__(
+        self,
+        profile: Optional[str] = None,
+        jsonl_path: Optional[str] = None,
+        prometheus_path: Optional[str] = None,
+        keep_spans: bool = False,
+    ):
+        self.profile = profile
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.keep_spans = keep_spans
+        self.spans: List[Span] = []
+
+        # (kind, name, step) -> [bucket counts..., +Inf count], sum
+        self._buckets: Dict[Tuple[str, str, str], List[int]] = {}
+        self._sums: Dict[Tuple[str, str, str], float] = defaultdict(float)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._file = None
+        if jsonl_path:
+            os.makedirs(os.path.dirname(jsonl_path) or ".", exist_ok=True)
+            self._file = open(jsonl_path, "a", encoding="utf-8")
+
+    @property
+    def current_step(self) -> Optional[str]:
+        stack = getattr(self._local, "steps", None)
+        return "/".join(stack) if stack else None
+
+    @contextmanager
+    def step(self, name: str):
+        """Tag the spans recorded inside with ``name``; nested steps form a path."""
+        stack = getattr(self._local, "steps", None)
+        if stack is None:
+            stack = self._local.steps = []
+        stack.append(name)
+        try:
+            with self.span(name, kind="step"):
+                yield
+        finally:
+            stack.pop()
+
+    @contextmanager
+    def span(self, name: str, kind: str = "command", **attrs):
+        step = self.current_step
+        start = time.time()
+        started = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}".splitlines()[0][:200]
+            raise
+        finally:
+            self.record(
+                Span(
+                    name=name,
+                    kind=kind,
+                    start=start,
+                    duration=time.perf_counter() - started,
+                    profile=self.profile,
+                    step=step,
+                    thread=threading.current_thread().name,
+                    error=error,
+                    attrs=attrs,
+                )
+            )
+
+    def record(self, span: Span):
+        key = (span.kind, span.name, span.step or "")
+        with self._lock:
+            if self.keep_spans:
+                self.spans.append(span)
+
+            counts = self._buckets.get(key)
+            if counts is None:
+                counts = self._buckets[key] = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+            for i, bound in enumerate(HISTOGRAM_BUCKETS):
+                if span.duration <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            self._sums[key] += span.duration
+
+            if self._file is not None:
+                self._file.write(json.dumps(asdict(span), ensure_ascii=False, default=str) + "\n")
+                self._file.flush()
+
+    def summary(self) -> List[dict]:
+        """Count and total seconds per ``(kind, name, step)``, slowest first."""
+        with self._lock:
+            rows = [
+                {
+                    "kind": kind,
+                    "name": name,
+                    "step": step or None,
+                    "count": counts[-1],
+                    "seconds": self._sums[(kind, name, step)],
+                }
+                for (kind, name, step), counts in self._buckets.items()
+            ]
+        return sorted(rows, key=lambda row: row["seconds"], reverse=True)
+
+    def to_prometheus(self) -> str:
+        def label(value: str) -> str:
+            return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        metric = "browser_auto_span_duration_seconds"
+        lines = [
+            f"# HELP {metric} Duration of WebDriver commands, waits, sleeps and task steps.",
+            f"# TYPE {metric} histogram",
+        ]
+        with self._lock:
+            for (kind, name, step), counts in sorted(self._buckets.items()):
+                labels = (
+                    f'kind="{label(kind)}",name="{label(name)}",step="{label(step)}",'
+                    f'profile="{label(self.profile or "")}"'
+                )
+                for bound, count in zip(HISTOGRAM_BUCKETS, counts):
+                    lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {counts[-1]}')
+                lines.append(f"{metric}_sum{{{labels}}} {self._sums[(kind, name, step)]}")
+                lines.append(f"{metric}_count{{{labels}}} {counts[-1]}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # 先写临时文件再替换，避免采集到写了一半的文件
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+    def close(self):
+        if self.prometheus_path:
+            self.write_prometheus(self.prometheus_path)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        for row in self.summary()[:10]:
+            logging.info(
+                f"{row['kind']} {row['name']} [{row['step'] or '-'}]: "
+                f"{row['count']} x, {row['seconds']:.3f}s"
+            )
+
+
+def _describe(name: str, args: tuple) -> dict:
+    if name == "get" and args:
+        return {"url": args[0]}
+    if name in ("find_element", "find_elements") and len(args) >= 2:
+        return {"by": args[0], "value": args[1]}
+    if name in ("execute_script", "execute_async_script") and args:
+        return {"script": " ".join(str(args[0]).split())[:80]}
+    return {}
+
+
+class InstrumentedDriver:
+    """Proxy around a Selenium driver that times every command.
+
+    Driver methods are recorded under their own name (``get``,
+    ``find_element``, ``execute_script`` ...). Returned elements are bound
+    to the proxy, so element commands (``clickElement``,
+    ``sendKeysToElement`` ...) are recorded under their WebDriver command
+    name. The wrapped driver is available as ``driver.wrapped_driver``.
+    """
+
+    def __init__(self, driver, recorder: Recorder):
+        object.__setattr__(self, "wrapped_driver", driver)
+        object.__setattr__(self, "recorder", recorder)
+
+    def _bind(self, value):
+        if isinstance(value, WebElement):
+            element_cls = getattr(self.wrapped_driver, "_web_element_cls", WebElement)
+            if value.parent is self or type(value) is not element_cls:
+                return value
+            return type(value)(self, value.id)
+        if isinstance(value, list):
+            return [self._bind(v) for v in value]
+        if isinstance(value, dict):
+            return {k: self._bind(v) for k, v in value.items()}
+        return value
+
+    def __getattr__(self, name: str):
+        driver = self.wrapped_driver
+        if name in TIMED_PROPERTIES:
+            with self.recorder.span(name):
+                return getattr(driver, name)
+
+        value = getattr(driver, name)
+        if name == "switch_to":
+            return _InstrumentedSwitchTo(value, self.recorder)
+        if name.startswith("_") or not callable(value):
+            return value
+
+        @functools.wraps(value)
+        def timed(*args, **kwargs):
+            # Element commands arrive here as execute(<command>, params)
+            span_name = args[0] if name == "execute" and args else name
+            with self.recorder.span(span_name, **_describe(name, args)):
+                return self._bind(value(*args, **kwargs))
+
+        return timed
+
+    def __setattr__(self, name: str, value):
+        setattr(self.wrapped_driver, name, value)
+
+    def __repr__(self):
+        return f"<InstrumentedDriver {self.wrapped_driver!r}>"
+
+
+class _InstrumentedSwitchTo:
+    def __init__(self, switch_to, recorder: Recorder):
+        self._switch_to = switch_to
+        self._recorder = recorder
+
+    def __getattr__(self, name: str):
+        value = getattr(self._switch_to, name)
+        if not callable(value):
+            return value
+
+        @functools.wraps(value)
+        def timed(*args, **kwargs):
+            with self._recorder.span(f"switch_to.{name}"):
+                return value(*args, **kwargs)
+
+        return timed
+
+
+def instrument_driver(driver, instrument: Union[bool, Recorder, None] = None):
+    """Wrap ``driver`` in an ``InstrumentedDriver`` if ``instrument`` is set.
+
+    Args:
+        driver: WebDriver
+        instrument: A ``Recorder``, True for a new one, or None / False to
+            return ``driver`` unchanged
+    """
+    if not instrument:
+        return driver
+    recorder = instrument if isinstance(instrument, Recorder) else Recorder()
+    return InstrumentedDriver(driver, recorder)
+
+
+def get_recorder(driver) -> Optional[Recorder]:
+    return driver.recorder if isinstance(driver, InstrumentedDriver) else None
+
+
+def span(driver, name: str, kind: str = "command", **attrs):
+    """Record a span on ``driver`` if it is instrumented, otherwise do nothing."""
+    recorder = get_recorder(driver)
+    return recorder.span(name, kind=kind, **attrs) if recorder is not None else nullcontext()
+
+
+def step(driver, name: str):
+    """Tag the spans of ``driver`` recorded inside with the task step ``name``."""
+    recorder = get_recorder(driver)
+    return recorder.step(name) if recorder is not None else nullcontext()
+
+
+def traced(fn):
+    """Run a method of an object holding ``self.driver`` as a step named after it."""
+
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        with step(self.driver, fn.__name__):
+            return fn(self, *args, **kwargs)
+
+    return wrapper
+
+
+class WebDriverWait(_WebDriverWait):
+    """``WebDriverWait`` recording each wait as a span on instrumented drivers.
+
+    The polls inside show up as separate command spans, so the difference
+    is the time spent sleeping between polls.
+    """
+
+    def _condition(self, method) -> str:
+        return getattr(method, "__qualname__", type(method).__name__).split(".")[0]
+
+    def until(self, method, message: str = ""):
+        with span(self._driver, "until", kind="wait", condition=self._condition(method)):
+            return super().until(method, message)
+
+    def until_not(self, method, message: str = ""):
+        with span(self._driver, "until_not", kind="wait", condition=self._condition(method)):
+            return super().until_not(method, message)
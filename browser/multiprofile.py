@@ -0,0 +1,284 @@
+import logging
+import os
+import subprocess
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Union
+
+from .base import Browser
+from .cdp import CDPSession, get_targets
+from .devtools import BrowserStartupError, read_startup_log
+from .fleet import FleetResult
+from .options import LaunchOptions, get_launch_options
+from .tabs import Tab
+
+MARKER_PREFIX = "about:blank#browser-auto-profile="
+
+
+@dataclass
+class ProfileTarget:
+    """The page a profile was opened in, inside a shared browser."""
+
+    profile: str
+    target_id: str
+    browser_context_id: Optional[str] = None
+
+    @property
+    def window_handle(self) -> str:
+        # chromedriver uses the DevTools target id as window handle
+        return self.target_id
+
+
+class MultiProfileBrowser:
+    """One browser process hosting windows of several profiles.
+
+    Chromium runs every profile of a user data dir in the same process:
+    launching it again with another ``--profile-directory`` only asks the
+    running instance to open a window for that profile. The first window of
+    each profile is opened on a marker URL, so it can be told apart in the
+    DevTools target list and used as the profile's tab or window handle.
+
+    This needs a headed browser: in headless mode the second launch does
+    not reach the running instance.
+
+    Example::
+
+        with MultiProfileBrowser(Chrome(), ["Default", "Profile 1"]) as browser:
+            driver = browser.get_driver()
+            browser.switch_to(driver, "Profile 1")
+    """
+
+    def __init__(
+        self,
+        browser: Browser,
+        profiles: List[str],
+        headless: bool = False,
+        startup_timeout: float = 30,
+        open_timeout: float = 10,
+        launch_options: Union[str, LaunchOptions, None] = None,
+    ):
+        if not profiles:
+            raise ValueError("profiles must not be empty")
+        if len(set(profiles)) != len(profiles):
+            raise ValueError("profiles must be unique")
+
+        self.browser = browser
+        self.profiles = list(profiles)
+        self.headless = headless
+        self.startup_timeout = startup_timeout
+        self.open_timeout = open_timeout
+        self.launch_options = launch_options
+        self.targets: Dict[str, ProfileTarget] = {}
+
+    @property
+    def port(self) -> Optional[int]:
+        return self.browser.port
+
+    def start(self) -> "MultiProfileBrowser":
+        first = self.profiles[0]
+        marker = self._marker()
+        options = get_launch_options(self.launch_options)
+        self.browser.start(
+            first,
+            port=0,
+            headless=self.headless,
+            options=options,
+            extra_args=[*options.extra_args, marker],
+        )
+        try:
+            self.browser.wait_until_ready(timeout=self.startup_timeout)
+            self.targets[first] = self._wait_for_marker(first, marker)
+            for profile in self.profiles[1:]:
+                self.open_profile(profile)
+        except Exception:
+            self.browser.terminate()
+            raise
+        return self
+
+    def _marker(self) -> str:
+        return f"{MARKER_PREFIX}{uuid.uuid4().hex}"
+
+    def open_profile(self, profile: str) -> ProfileTarget:
+        """Open a window of ``profile`` in the running browser."""
+        marker = self._marker()
+        cmd = [
+            self.browser.browser_path,
+            f"--user-data-dir={self.browser.user_data_dir}",
+            f"--profile-directory={profile}",
+            # Same flags as the running instance, e.g. a root launcher needs --no-sandbox too
+            *self.browser._server_args(),
+            marker,
+        ]
+        log_file = self.browser.log_file
+        log_offset = os.path.getsize(log_file) if log_file and os.path.exists(log_file) else 0
+        log = open(log_file, "a") if log_file else subprocess.DEVNULL
+        try:
+            # Hands the command line to the running instance and exits
+            launcher = subprocess.Popen(cmd, stdout=log, stderr=log)
+            try:
+                launcher.wait(timeout=self.open_timeout)
+            except subprocess.TimeoutExpired:
+                # It did not find the running instance and became a browser itself
+                launcher.kill()
+                launcher.wait()
+                raise BrowserStartupError(
+                    f"launching profile {profile} did not reach the browser on port {self.port}, "
+                    f"multiple profiles need a headed browser"
+                )
+        finally:
+            if log is not subprocess.DEVNULL:
+                log.close()
+
+        if launcher.returncode != 0:
+            raise BrowserStartupError(
+                f"launching profile {profile} exited with code {launcher.returncode}, "
+                f"log {log_file}:\n{read_startup_log(log_file, log_offset)}"
+            )
+
+        target = self._wait_for_marker(profile, marker)
+        if profile not in self.profiles:
+            self.profiles.append(profile)
+        self.targets[profile] = target
+        return target
+
+    def _wait_for_marker(self, profile: str, marker: str) -> ProfileTarget:
+        deadline = time.monotonic() + self.open_timeout
+        while True:
+            for target in get_targets(self.port):
+                if target.get("type") == "page" and target.get("url", "").startswith(marker):
+                    logging.info(f"Profile {profile} opened in target {target['id']}")
+                    return ProfileTarget(
+                        profile=profile,
+                        target_id=target["id"],
+                        browser_context_id=self._browser_context_id(target["id"]),
+                    )
+            if time.monotonic() >= deadline:
+                raise BrowserStartupError(
+                    f"window of profile {profile} not found after {self.open_timeout}s, "
+                    f"multiple profiles need a headed browser"
+                )
+            time.sleep(0.1)
+
+    def _browser_context_id(self, target_id: str) -> Optional[str]:
+        try:
+            with CDPSession.for_target(self.port, target_id) as session:
+                info = session.send("Target.getTargetInfo", {"targetId": target_id})["targetInfo"]
+            return info.get("browserContextId")
+        except Exception as e:
+            logging.debug(f"Read browser context of {target_id} failed: {e}")
+            return None
+
+    def window_handle(self, profile: str) -> str:
+        if profile not in self.targets:
+            raise KeyError(f"profile {profile} is not open, opened: {list(self.targets)}")
+        return self.targets[profile].window_handle
+
+    def get_driver(self, **kwargs):
+        """One WebDriver for all profiles; use ``switch_to`` to pick a profile's window."""
+        driver = self.browser.get_driver(self.port, **kwargs)
+        self.browser.driver = driver
+        return driver
+
+    def switch_to(self, driver, profile: str):
+        driver.switch_to.window(self.window_handle(profile))
+
+    def tab(self, profile: str, **kwargs) -> Tab:
+        """A ``Tab`` on the window of ``profile``, over its own CDP session."""
+        target_id = self.window_handle(profile)
+        return Tab(CDPSession.for_target(self.port, target_id, **kwargs), target_id)
+
+    def close(self):
+        self.browser.close()
+        self.targets.clear()
+
+    def __enter__(self) -> "MultiProfileBrowser":
+        if not self.targets:
+            self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def run_in_profiles(
+    browser: Browser,
+    profiles: List[str],
+    fn: Callable,
+    client: str = "selenium",
+    max_concurrency: int = 4,
+    headless: bool = False,
+    kill_browser_after_running: bool = True,
+    **kwargs,
+) -> Dict[str, FleetResult]:
+    """Run ``fn`` for each profile in one shared browser process.
+
+    Lighter than ``run_in_browsers`` for short periodic checks: all
+    profiles share one browser process tree and at most one chromedriver.
+    A failing profile never aborts the others.
+
+    Args:
+        browser: Browser whose user data dir holds the profiles
+        profiles: Profile directory names, e.g. ``["Default", "Profile 1"]``
+        fn: Task function, called with the WebDriver focused on the profile's
+            window (``client="selenium"``, one profile at a time) or with a
+            ``Tab`` of the profile (``client="cdp"``, ``max_concurrency`` at a time)
+        client: ``selenium`` or ``cdp``
+        max_concurrency: Profiles running at the same time with ``client="cdp"``
+        headless: Must stay False, see ``MultiProfileBrowser``
+        kill_browser_after_running: Close the shared browser afterwards
+        **kwargs: Extra keyword arguments passed to ``MultiProfileBrowser``
+
+    Returns:
+        dict: Profile name -> ``FleetResult``, in the order of ``profiles``
+    """
+    if client not in ("selenium", "cdp"):
+        raise ValueError(f"Unknown client: {client}, available: ['selenium', 'cdp']")
+
+    multi = MultiProfileBrowser(browser, profiles, headless=headless, **kwargs)
+    multi.start()
+
+    def run_one(profile: str, driver=None) -> FleetResult:
+        outcome = FleetResult(profile=profile, port=multi.port)
+        start_time = time.monotonic()
+        tab = None
+        try:
+            if driver is not None:
+                multi.switch_to(driver, profile)
+                outcome.result = fn(driver)
+            else:
+                threading.current_thread().name = f"profile-{profile}"
+                tab = multi.tab(profile)
+                outcome.result = fn(tab)
+        except Exception as e:
+            logging.error(f"Profile {profile} failed: {e}")
+            outcome.error = e
+            outcome.traceback = traceback.format_exc()
+        finally:
+            if tab is not None:
+                tab.close()
+            outcome.elapsed = time.monotonic() - start_time
+        logging.info(f"Profile {profile} finished in {outcome.elapsed:.1f}s, ok: {outcome.ok}")
+        return outcome
+
+    try:
+        if client == "selenium":
+            driver = multi.get_driver()
+            try:
+                results = {profile: run_one(profile, driver) for profile in profiles}
+            finally:
+                driver.quit()
+        else:
+            with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+                outcomes = list(executor.map(run_one, profiles))
+            results = {o.profile: o for o in outcomes}
+    finally:
+        if kill_browser_after_running:
+            multi.close()
+
+    failed = [r.profile for r in results.values() if not r.ok]
+    logging.info(f"Profiles finished: {len(profiles) - len(failed)} ok, {len(failed)} failed")
+    return results
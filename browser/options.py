@@ -0,0 +1,143 @@
+from typing import Dict, List, Optional, Tuple, Union
+
+from pydantic import BaseModel, ConfigDict
+
+
+class LaunchOptions(BaseModel):
+    """Command line switches shared by Chrome and Edge.
+
+    Use a preset and override single fields per call::
+
+        LaunchOptions.preset("fast", disable_images=False)
+
+    Unknown fields are rejected, so a misspelled override fails right away.
+    """
+
+    model_config = ConfigDict(extra="forbid")
+
+    lang: str = "en"
+    start_maximized: bool = True
+    window_size: Optional[Tuple[int, int]] = None
+
+    disable_extensions: bool = True
+    disable_popup_blocking: bool = True
+    disable_images: bool = False
+    disable_background_networking: bool = False
+    disable_component_update: bool = False
+    disable_gpu: bool = False
+    disable_translate: bool = False
+    disable_sync: bool = False
+    mute_audio: bool = False
+    renderer_process_limit: Optional[int] = None
+    process_per_site: bool = False
+    js_heap_size_mb: Optional[int] = None
+
+    disable_features: List[str] = []
+    extra_args: List[str] = []
+
+    @classmethod
+    def preset(cls, name: str = "default", **overrides) -> "LaunchOptions":
+        if name not in PRESETS:
+            raise ValueError(f"Unknown launch preset: {name}, available: {list(PRESETS)}")
+        return PRESETS[name].with_overrides(**overrides)
+
+    def with_overrides(self, **overrides) -> "LaunchOptions":
+        """A validated copy with ``overrides`` applied."""
+        if not overrides:
+            return self.model_copy(deep=True)
+        return type(self).model_validate({**self.model_dump(), **overrides})
+
+    def to_args(self) -> List[str]:
+        args = []
+        if self.disable_extensions:
+            args.append("--disable-extensions")  # 禁用所有扩展
+        args.append("--disable-plugins")  # 禁用插件
+        if self.disable_popup_blocking:
+            args.append("--disable-popup-blocking")  # 禁用弹窗拦截
+        args.append("--no-default-browser-check")  # 不检查默认浏览器
+        args.append(f"--lang={self.lang}")
+
+        if self.window_size:
+            args.append(f"--window-size={self.window_size[0]},{self.window_size[1]}")
+        elif self.start_maximized:
+            args.append("--start-maximized")
+
+        if self.disable_images:
+            args.append("--blink-settings=imagesEnabled=false")
+        if self.disable_background_networking:
+            args.extend(
+                [
+                    "--disable-background-networking",
+                    "--disable-default-apps",
+                    "--disable-client-side-phishing-detection",
+                    "--metrics-recording-only",
+                    "--no-first-run",
+                ]
+            )
+        if self.disable_component_update:
+            args.append("--disable-component-update")
+        if self.disable_gpu:
+            args.append("--disable-gpu")
+        if self.disable_sync:
+            args.append("--disable-sync")
+        if self.mute_audio:
+            args.append("--mute-audio")
+        if self.renderer_process_limit:
+            args.append(f"--renderer-process-limit={self.renderer_process_limit}")
+        if self.process_per_site:
+            args.append("--process-per-site")
+        if self.js_heap_size_mb:
+            args.append(f"--js-flags=--max-old-space-size={self.js_heap_size_mb}")
+
+        features = list(self.disable_features)
+        if self.disable_translate:
+            features.append("Translate")
+        if features:
+            # Only the last --disable-features switch wins, so join them
+            args.append(f"--disable-features={','.join(dict.fromkeys(features))}")
+
+        args.extend(self.extra_args)
+        return args
+
+
+_FAST = dict(
+    start_maximized=False,
+    window_size=(1280, 800),
+    disable_images=True,
+    disable_background_networking=True,
+    disable_component_update=True,
+    disable_gpu=True,
+    disable_translate=True,
+    disable_sync=True,
+    mute_audio=True,
+    renderer_process_limit=4,
+    disable_features=["MediaRouter", "OptimizationHints", "AutofillServerCommunication"],
+)
+
+PRESETS: Dict[str, LaunchOptions] = {
+    "default": LaunchOptions(),
+    "fast": LaunchOptions(**_FAST),
+    "low-memory": LaunchOptions(
+        **{
+            **_FAST,
+            "window_size": (1024, 768),
+            "renderer_process_limit": 2,
+            "process_per_site": True,
+            "js_heap_size_mb": 512,
+            "disable_features": _FAST["disable_features"] + ["BackForwardCache"],
+        }
+    ),
+}
+
+
+def get_launch_options(
+    options: Union[str, LaunchOptions, None] = None, **overrides
+) -> LaunchOptions:
+    """Resolve a preset name or ``LaunchOptions`` and apply per-call overrides."""
+    if options is None:
+        options = "default"
+    if isinstance(options, str):
+        return LaunchOptions.preset(options, **overrides)
+    if overrides:
+        return options.with_overrides(**overrides)
+    return options
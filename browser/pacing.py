@@ -0,0 +1,199 @@
+import logging
+import random
+import threading
+from collections import defaultdict
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+from pydantic import BaseModel
+
+from utils import Clock, get_clock
+from .instrument import span
+
+
+class PacingProfile(BaseModel):
+    """How long to wait between actions.
+
+    ``scale`` multiplies the gap ranges requested at call sites (the same
+    ``min_seconds`` / ``max_seconds`` that ``sleep_random_time`` takes), and
+    ``rate`` / ``burst`` configure a token bucket per domain and profile that
+    caps the action rate regardless of the gaps.
+    """
+
+    scale: float = 1.0
+    jitter: float = 0.0  # extra random share of the gap, e.g. 0.2 for +-20%
+    rate: Optional[float] = None  # actions per second, None for no cap
+    burst: int = 1
+
+
+PACING_PRESETS: Dict[str, PacingProfile] = {
+    "human": PacingProfile(scale=1.0, jitter=0.1, rate=1.0, burst=3),
+    "aggressive": PacingProfile(scale=0.1, rate=5.0, burst=10),
+    "off": PacingProfile(scale=0.0),
+}
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = None
+
+    def reserve(self, now: float) -> float:
+        """Take a token and return how long to wait before it is valid."""
+        if self.updated is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+class Pacer:
+    """Pacing between browser actions, replacing fixed ``sleep_random_time`` calls.
+
+    The gap before an action is counted from the end of the previous pause
+    of the same key, or from the creation of the pacer for the first one,
+    so time already spent working (page loads, clicks) is credited and only
+    the remainder is slept. Keys are the ``(domain, profile)`` pair; the
+    domain is the one passed to ``pause``, else the ``domain`` attribute
+    (kept up to date by the caller), else read from ``driver`` at the cost
+    of a WebDriver round-trip per pause.
+
+    Example::
+
+        pacer = Pacer("human", profile="Default", driver=driver)
+        pacer.pause(1, 2, reason="Wait for menu")
+        logging.info(pacer.stats)
+    """
+
+    def __init__(
+        self,
+        preset: Union[str, PacingProfile] = "human",
+        profile: Optional[str] = None,
+        driver=None,
+        clock: Optional[Clock] = None,
+        domain: Optional[str] = None,
+    ):
+        if isinstance(preset, str):
+            if preset not in PACING_PRESETS:
+                raise ValueError(f"Unknown pacing preset: {preset}, available: {list(PACING_PRESETS)}")
+            preset = PACING_PRESETS[preset]
+        self.pacing = preset
+        self.profile = profile
+        self.driver = driver
+        self.clock = clock
+        self.domain = domain
+
+        self.injected = 0.0
+        self.pauses = 0
+        self.credited = 0.0
+        self._last: Dict[Tuple, float] = {}
+        self._buckets: Dict[Tuple, TokenBucket] = {}
+        self._by_reason: Dict[str, float] = defaultdict(float)
+        self._lock = threading.Lock()
+        # Work done before the first pause counts too, e.g. the first page load
+        self._created_clock = self._clock
+        self._created = self._created_clock.now()
+
+    @property
+    def enabled(self) -> bool:
+        return self.pacing.scale > 0 or self.pacing.rate is not None
+
+    def _domain(self) -> Optional[str]:
+        if self.driver is None:
+            return None
+        try:
+            return urlparse(self.driver.current_url).hostname
+        except Exception:
+            return None
+
+    @property
+    def _clock(self) -> Clock:
+        return self.clock or get_clock()
+
+    def pause(
+        self,
+        min_seconds: float = 5,
+        max_seconds: float = 10,
+        reason: Optional[str] = None,
+        domain: Optional[str] = None,
+    ) -> float:
+        """Wait out the remainder of a random gap in ``[min_seconds, max_seconds]``.
+
+        Returns:
+            float: Seconds actually slept
+        """
+        wait = self.reserve(min_seconds, max_seconds, reason=reason, domain=domain)
+        if wait > 0:
+            logging.info(f"Waiting for {wait:.2f} seconds: {reason}")
+            with span(self.driver, "pause", kind="sleep", reason=reason, seconds=round(wait, 3)):
+                self._clock.sleep(wait, reason=reason)
+        return wait
+
+    def reserve(
+        self,
+        min_seconds: float = 5,
+        max_seconds: float = 10,
+        reason: Optional[str] = None,
+        domain: Optional[str] = None,
+    ) -> float:
+        """Book the next gap like ``pause`` and return how long to wait, without sleeping.
+
+        For callers that wait themselves, e.g. with ``asyncio.sleep``.
+        """
+        if not self.enabled:
+            return 0.0
+
+        key = (domain or self.domain or self._domain(), self.profile)
+        gap = random.uniform(min_seconds, max_seconds) * self.pacing.scale
+        if self.pacing.jitter:
+            gap *= 1 + random.uniform(-self.pacing.jitter, self.pacing.jitter)
+
+        with self._lock:
+            clock = self._clock
+            now = clock.now()
+            last = self._last.get(key)
+            if last is None and clock is self._created_clock:
+                last = self._created
+            elapsed = now - last if last is not None else 0.0
+            wait = max(0.0, gap - elapsed)
+
+            if self.pacing.rate is not None:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    bucket = self._buckets[key] = TokenBucket(self.pacing.rate, self.pacing.burst)
+                wait = max(wait, bucket.reserve(now))
+
+            # Reserve the slot before sleeping so concurrent callers queue up
+            self._last[key] = now + wait
+            self.pauses += 1
+            self.injected += wait
+            self.credited += min(gap, elapsed)
+            self._by_reason[reason or "-"] += wait
+        return wait
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pauses": self.pauses,
+                "injected_seconds": round(self.injected, 3),
+                "credited_seconds": round(self.credited, 3),
+                "by_reason": {k: round(v, 3) for k, v in self._by_reason.items()},
+            }
+
+    def report(self):
+        stats = self.stats
+        logging.info(
+            f"Pacing injected {stats['injected_seconds']}s over {stats['pauses']} pauses "
+            f"({stats['credited_seconds']}s credited to work)"
+        )
+
+
+def get_pacer(pacer: Union[str, Pacer, None], **kwargs) -> Pacer:
+    if isinstance(pacer, Pacer):
+        return pacer
+    return Pacer(pacer or "human", **kwargs)
@@ -0,0 +1,288 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Union
+
+from .base import Browser, has_display
+from .browser import launch_browser
+from .multiprofile import MultiProfileBrowser
+from .options import LaunchOptions
+
+
+class _PooledBrowser:
+    """A warm browser of one user data dir and the WebDriver attached to it.
+
+    With ``multi`` the browser hosts a window per profile in ``profiles``,
+    otherwise it only runs ``profiles[0]``.
+    """
+
+    def __init__(
+        self,
+        browser: Browser,
+        driver,
+        profile: str,
+        multi: Optional[MultiProfileBrowser] = None,
+    ):
+        self.browser = browser
+        self.driver = driver
+        self.multi = multi
+        self.profiles: List[str] = [profile]
+        self.tasks = 0
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class BrowserPool:
+    """Keep one warm browser + WebDriver per user data dir across tasks.
+
+    Chromium locks the whole user data dir, so every profile of a dir shares
+    one browser. A headed browser opens a window per profile in it (see
+    ``MultiProfileBrowser``) and each lease switches the driver to the window
+    of its profile. A headless browser can only run one profile, so leasing
+    another profile of the dir restarts the browser for it. Leases of the
+    same user data dir run one at a time.
+
+    Before each lease the instance is health-checked, and it is recycled after
+    ``max_tasks`` leases or once it has been idle for longer than ``idle_ttl``
+    seconds. A background thread reaps idle instances every ``reap_interval``
+    seconds, so they do not wait for the next lease to be shut down.
+
+    Example::
+
+        pool = BrowserPool(Chrome)
+        with pool.lease("Default") as driver:
+            driver.get("https://example.com")
+        pool.close()
+    """
+
+    def __init__(
+        self,
+        browser_factory: Callable[[], Browser],
+        headless: bool = False,
+        max_tasks: Optional[int] = 100,
+        idle_ttl: Optional[float] = 600,
+        startup_timeout: float = 30,
+        launch_options: Union[str, LaunchOptions, None] = None,
+        reap_interval: Optional[float] = None,
+    ):
+        """
+        Args:
+            browser_factory: Creates an unstarted browser, e.g. ``Chrome``
+            headless: Start browsers in headless mode, one profile per user data dir
+            max_tasks: Leases before a browser is recycled, None for no limit
+            idle_ttl: Idle seconds before a browser is shut down, None to keep it
+            startup_timeout: Seconds to wait for a browser to start
+            launch_options: ``LaunchOptions`` or a preset name
+            reap_interval: Seconds between idle checks in the background,
+                ``min(idle_ttl / 2, 60)`` by default, 0 to only check on
+                ``lease`` and ``reap_idle``
+        """
+        self.browser_factory = browser_factory
+        self.headless = headless
+        self.max_tasks = max_tasks
+        self.idle_ttl = idle_ttl
+        self.startup_timeout = startup_timeout
+        self.launch_options = launch_options
+
+        self._entries: Dict[str, _PooledBrowser] = {}
+        self._dir_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+        if reap_interval is None and idle_ttl is not None:
+            reap_interval = min(idle_ttl / 2, 60)
+        self._stop_reaper = threading.Event()
+        self._reaper = None
+        if reap_interval:
+            self._reaper = threading.Thread(
+                target=self._reap_loop,
+                args=(reap_interval,),
+                name="browser-pool-reaper",
+                daemon=True,
+            )
+            self._reaper.start()
+
+    def _dir_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            if key not in self._dir_locks:
+                self._dir_locks[key] = threading.Lock()
+            return self._dir_locks[key]
+
+    def _can_host_profiles(self) -> bool:
+        # Launching another profile only reaches a running headed browser
+        return not self.headless and has_display()
+
+    def _is_healthy(self, entry: _PooledBrowser) -> bool:
+        if not entry.browser.is_running():
+            return False
+        try:
+            # Cheap command that fails fast if the session or browser is gone
+            entry.driver.current_window_handle
+            return True
+        except Exception as e:
+            logging.warning(f"Pooled browser is unhealthy: {e}")
+            return False
+
+    def _is_expired(self, entry: _PooledBrowser) -> bool:
+        if self.max_tasks is not None and entry.tasks >= self.max_tasks:
+            return True
+        if self.idle_ttl is not None and time.monotonic() - entry.last_used > self.idle_ttl:
+            return True
+        return False
+
+    def _start(self, browser: Browser, profile: str) -> _PooledBrowser:
+        if self._can_host_profiles():
+            multi = MultiProfileBrowser(
+                browser,
+                [profile],
+                startup_timeout=self.startup_timeout,
+                launch_options=self.launch_options,
+            ).start()
+            try:
+                driver = multi.get_driver()
+            except Exception:
+                multi.close()
+                raise
+            entry = _PooledBrowser(browser, driver, profile, multi)
+        else:
+            # launch_browser terminates the browser itself if it fails
+            driver = launch_browser(
+                browser,
+                profile,
+                headless=self.headless,
+                startup_timeout=self.startup_timeout,
+                launch_options=self.launch_options,
+            )
+            entry = _PooledBrowser(browser, driver, profile)
+        logging.info(f"Pool started browser for profile {profile} in {browser.user_data_dir}")
+        return entry
+
+    def _focus(self, entry: _PooledBrowser, profile: str):
+        """Open ``profile`` in the shared browser if needed and switch the driver to it."""
+        if profile not in entry.profiles:
+            entry.multi.open_profile(profile)
+            entry.profiles.append(profile)
+        try:
+            entry.multi.switch_to(entry.driver, profile)
+        except Exception as e:
+            # The window of the profile was closed, e.g. by a previous task
+            logging.warning(f"Window of profile {profile} is gone, reopening it: {e}")
+            entry.multi.open_profile(profile)
+            entry.multi.switch_to(entry.driver, profile)
+
+    def _retire(self, key: str, entry: _PooledBrowser, reason: str):
+        logging.info(
+            f"Recycling browser for {key} (profiles {entry.profiles}) "
+            f"after {entry.tasks} tasks: {reason}"
+        )
+        try:
+            entry.driver.quit()
+        except Exception as e:
+            logging.debug(f"Quit driver failed: {e}")
+        if entry.multi is not None:
+            entry.multi.close()
+        else:
+            entry.browser.terminate()
+
+    @contextmanager
+    def lease(self, profile: str):
+        """Lease a WebDriver on ``profile``, starting a browser if needed."""
+        if self._closed:
+            raise RuntimeError("BrowserPool is closed")
+
+        browser = self.browser_factory()
+        key = os.path.realpath(browser.user_data_dir)
+        with self._dir_lock(key):
+            # close() may have run while waiting for the dir lock
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("BrowserPool is closed")
+                entry = self._entries.get(key)
+
+            if entry is not None:
+                reason = None
+                if self._is_expired(entry):
+                    reason = "expired"
+                elif not self._is_healthy(entry):
+                    reason = "health check failed"
+                elif profile not in entry.profiles and entry.multi is None:
+                    # 同一个 user data dir 只能跑一个浏览器，先关掉再换 profile
+                    reason = f"profile {profile} needs the user data dir"
+                if reason is not None:
+                    self._retire(key, entry, reason)
+                    entry = None
+                    with self._lock:
+                        self._entries.pop(key, None)
+
+            if entry is None:
+                entry = self._start(browser, profile)
+                with self._lock:
+                    closed = self._closed
+                    if not closed:
+                        self._entries[key] = entry
+                if closed:
+                    self._retire(key, entry, "pool closed")
+                    raise RuntimeError("BrowserPool is closed")
+
+            if entry.multi is not None:
+                self._focus(entry, profile)
+
+            try:
+                yield entry.driver
+            finally:
+                entry.tasks += 1
+                entry.last_used = time.monotonic()
+
+    def run(self, profile: str, fn: Callable):
+        """Run ``fn(driver)`` on a leased browser and return its result."""
+        with self.lease(profile) as driver:
+            return fn(driver)
+
+    def reap_idle(self):
+        """Retire instances that passed their idle TTL or task budget."""
+        with self._lock:
+            keys = list(self._entries)
+
+        for key in keys:
+            lock = self._dir_lock(key)
+            if not lock.acquire(blocking=False):
+                continue  # leased right now
+            try:
+                with self._lock:
+                    entry = self._entries.get(key)
+                if entry is not None and self._is_expired(entry):
+                    self._retire(key, entry, "expired")
+                    with self._lock:
+                        self._entries.pop(key, None)
+            finally:
+                lock.release()
+
+    def _reap_loop(self, interval: float):
+        while not self._stop_reaper.wait(interval):
+            try:
+                self.reap_idle()
+            except Exception as e:
+                logging.error(f"Reaping idle browsers failed: {e}")
+
+    def close(self):
+        """Stop the reaper and shut down every pooled browser."""
+        self._stop_reaper.set()
+        if self._reaper is not None and self._reaper is not threading.current_thread():
+            self._reaper.join()
+
+        with self._lock:
+            self._closed = True
+            entries = list(self._entries.items())
+            self._entries.clear()
+
+        for key, entry in entries:
+            with self._dir_lock(key):
+                self._retire(key, entry, "pool closed")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
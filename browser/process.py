@@ -0,0 +1,352 @@
+import json
+import logging
+import os
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional, Tuple
+
+from utils import is_windows
+from .devtools import close_browser
+
+
+def get_runtime_dir() -> str:
+    """Directory shared by all browser-auto processes on this host."""
+    path = os.environ.get("BROWSER_AUTO_RUNTIME_DIR") or os.path.join(
+        tempfile.gettempdir(), "browser-auto"
+    )
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def pid_exists(pid: int) -> bool:
+    if not pid or pid <= 0:
+        return False
+
+    if is_windows():
+        import ctypes
+
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        STILL_ACTIVE = 259
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return False
+        try:
+            exit_code = ctypes.c_ulong()
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code)):
+                return False
+            return exit_code.value == STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists but belongs to another user
+        return True
+    return not _is_zombie(pid)
+
+
+def _is_zombie(pid: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # pid (comm) state ..., comm may contain spaces
+            return f.read().rsplit(")", 1)[1].split()[0] == "Z"
+    except (OSError, IndexError):
+        return False
+
+
+# Seconds between spawning the browser and writing its record
+START_TIME_TOLERANCE = 10
+
+
+def _command_args(pid: int) -> Optional[List[str]]:
+    """Arguments of ``pid`` from ``/proc`` (Linux), None if unreadable."""
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return f.read().decode(errors="replace").rstrip("\0").split("\0")
+    except OSError:
+        return None
+
+
+def _command_line(pid: int) -> Optional[str]:
+    """Command line of ``pid`` from ``ps`` (macOS), arguments joined by spaces."""
+    try:
+        output = subprocess.run(
+            ["ps", "-p", str(pid), "-o", "command="], capture_output=True, text=True, timeout=5
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return output.stdout.strip() or None
+
+
+def _windows_creation_time(pid: int) -> Optional[float]:
+    """Creation time of ``pid`` as a Unix timestamp, None if unreadable."""
+    import ctypes
+    from ctypes import wintypes
+
+    PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+    kernel32 = ctypes.windll.kernel32
+    handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+    if not handle:
+        return None
+    try:
+        creation, exit_, kernel, user = (wintypes.FILETIME() for _ in range(4))
+        if not kernel32.GetProcessTimes(
+            handle, ctypes.byref(creation), ctypes.byref(exit_), ctypes.byref(kernel), ctypes.byref(user)
+        ):
+            return None
+        # 100ns intervals since 1601-01-01
+        ticks = (creation.dwHighDateTime << 32) | creation.dwLowDateTime
+        return ticks / 10_000_000 - 11644473600
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+def _is_browser_process(
+    pid: int,
+    launch_port: Optional[int] = None,
+    user_data_dir: Optional[str] = None,
+    started_at: Optional[float] = None,
+) -> bool:
+    """Guard against PID reuse before killing a recorded process.
+
+    On Linux and macOS it matches the command line the browser was launched
+    with: the ``--remote-debugging-port`` switch as passed (0 when the
+    browser picked the port) and the ``--user-data-dir``. On Windows the
+    process must have been created right before the record (``started_at``).
+
+    Returns False when it cannot be checked, so the record is dropped
+    without killing anything.
+    """
+    if is_windows():
+        if started_at is None:
+            return False
+        created = _windows_creation_time(pid)
+        return created is not None and -1 <= started_at - created <= START_TIME_TOLERANCE
+
+    wanted = ["--remote-debugging-port="]
+    if launch_port is not None:
+        wanted[0] += str(launch_port)
+    if user_data_dir is not None:
+        wanted.append(f"--user-data-dir={user_data_dir}")
+
+    if os.path.exists("/proc"):
+        args = _command_args(pid)
+        if args is None:
+            return False
+        return all(
+            any(arg.startswith(w) if w.endswith("=") else arg == w for arg in args) for w in wanted
+        )
+
+    command = _command_line(pid)
+    if command is None:
+        return False
+    # ps joins the arguments with spaces and they may contain spaces too
+    # (e.g. "Application Support"), so match each switch followed by a separator
+    command += " "
+    return all(w in command if w.endswith("=") else f"{w} " in command for w in wanted)
+
+
+@dataclass
+class ProcessRecord:
+    pid: int
+    pgid: Optional[int]
+    port: Optional[int]
+    profile: str
+    browser_type: str
+    owner_pid: int = field(default_factory=os.getpid)
+    started_at: float = field(default_factory=time.time)
+    # As on the command line; ``port`` is updated once the real port is known
+    launch_port: Optional[int] = None
+    user_data_dir: Optional[str] = None
+
+
+class ProcessRegistry:
+    """Records of the browsers launched by browser-auto on this host.
+
+    One JSON file per browser PID is kept in ``<runtime dir>/processes`` so
+    that any process can find, and clean up, browsers whose owner crashed.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(get_runtime_dir(), "processes")
+        os.makedirs(self.path, exist_ok=True)
+
+        self._status = None
+        self._status_at = 0.0
+        self._status_lock = threading.Lock()
+
+    def _record_file(self, pid: int) -> str:
+        return os.path.join(self.path, f"{pid}.json")
+
+    def register(self, record: ProcessRecord):
+        tmp_file = self._record_file(record.pid) + f".{os.getpid()}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(asdict(record), f)
+        os.replace(tmp_file, self._record_file(record.pid))
+
+    def unregister(self, pid: int):
+        try:
+            os.remove(self._record_file(pid))
+        except FileNotFoundError:
+            pass
+
+    def get(self, pid: int) -> Optional[ProcessRecord]:
+        try:
+            with open(self._record_file(pid)) as f:
+                return ProcessRecord(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def records(self) -> List[ProcessRecord]:
+        records = []
+        for name in os.listdir(self.path):
+            if not name.endswith(".json"):
+                continue
+            record = self.get(int(name[: -len(".json")]))
+            if record is not None:
+                records.append(record)
+        return records
+
+    def status(self, max_age: float = 2) -> List[Tuple[ProcessRecord, bool]]:
+        """Liveness of every registered browser, cached for ``max_age`` seconds.
+
+        Uses one ``os.kill(pid, 0)`` per record instead of scanning the
+        process table, so fleet-wide dashboards can poll it cheaply.
+        """
+        with self._status_lock:
+            now = time.monotonic()
+            if self._status is None or now - self._status_at > max_age:
+                self._status = [(r, pid_exists(r.pid)) for r in self.records()]
+                self._status_at = now
+            return list(self._status)
+
+    def cleanup_orphans(self) -> List[ProcessRecord]:
+        """Kill browsers whose owning process is gone and drop stale records."""
+        cleaned = []
+        for record in self.records():
+            if pid_exists(record.owner_pid):
+                continue
+
+            if pid_exists(record.pid) and _is_browser_process(
+                record.pid, record.launch_port, record.user_data_dir, record.started_at
+            ):
+                logging.warning(
+                    f"Killing orphaned {record.browser_type} (pid {record.pid}, "
+                    f"profile {record.profile}) left by dead owner {record.owner_pid}"
+                )
+                terminate_process_tree(record.pid, pgid=record.pgid, graceful_timeout=0)
+            self.unregister(record.pid)
+            cleaned.append(record)
+        return cleaned
+
+
+_registry = None
+_registry_lock = threading.Lock()
+_orphans_cleaned = False
+
+
+def get_registry() -> ProcessRegistry:
+    """Process-wide registry; cleans up orphans from crashed runs on first use."""
+    global _registry, _orphans_cleaned
+    with _registry_lock:
+        if _registry is None:
+            _registry = ProcessRegistry()
+        if not _orphans_cleaned:
+            _orphans_cleaned = True
+            try:
+                _registry.cleanup_orphans()
+            except Exception as e:
+                logging.error(f"Cleanup orphaned browsers failed: {e}")
+        return _registry
+
+
+def _wait_exit(pid: int, process: Optional[subprocess.Popen], timeout: float) -> bool:
+    if process is not None:
+        try:
+            process.wait(timeout=timeout)
+            return True
+        except subprocess.TimeoutExpired:
+            return False
+
+    deadline = time.monotonic() + timeout
+    while True:
+        if not pid_exists(pid):
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.05)
+
+
+def _signal_tree(pid: int, pgid: Optional[int], force: bool):
+    if is_windows():
+        cmd = ["taskkill", "/T", "/PID", str(pid)]
+        if force:
+            cmd.insert(1, "/F")
+        subprocess.run(cmd, capture_output=True, check=False)
+        return
+
+    sig = signal.SIGKILL if force else signal.SIGTERM
+    try:
+        if pgid:
+            os.killpg(pgid, sig)
+        else:
+            os.kill(pid, sig)
+    except ProcessLookupError:
+        pass
+
+
+def terminate_process_tree(
+    pid: int,
+    pgid: Optional[int] = None,
+    port: Optional[int] = None,
+    process: Optional[subprocess.Popen] = None,
+    graceful_timeout: float = 5,
+    term_timeout: float = 5,
+) -> bool:
+    """Stop one browser and its children without touching other browsers.
+
+    Escalates from CDP ``Browser.close`` to SIGTERM and then SIGKILL of the
+    process group (``taskkill /T`` on Windows), waiting up to the given
+    timeouts between steps.
+
+    Returns:
+        bool: True if the process is gone
+    """
+    gone = False
+    if port and graceful_timeout > 0:
+        try:
+            close_browser(port, timeout=graceful_timeout)
+            gone = _wait_exit(pid, process, graceful_timeout)
+            if gone:
+                logging.info(f"Browser pid {pid} closed gracefully")
+        except Exception as e:
+            logging.debug(f"Browser.close on port {port} failed: {e}")
+
+    if not gone and not _wait_exit(pid, process, 0):
+        logging.warning(f"Terminating browser pid {pid}")
+        _signal_tree(pid, pgid, force=False)
+        gone = _wait_exit(pid, process, term_timeout)
+
+        if not gone:
+            logging.warning(f"Killing browser pid {pid}")
+            _signal_tree(pid, pgid, force=True)
+            gone = _wait_exit(pid, process, term_timeout)
+            if not gone:
+                logging.error(f"Browser pid {pid} is still alive after SIGKILL")
+                return False
+
+    # Leftover helpers in the group (renderers, GPU) go with the leader
+    if pgid and not is_windows():
+        try:
+            os.killpg(pgid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+    return True
@@ -0,0 +1,507 @@
+import logging
+import traceback
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+from utils import get_clock
+from .extract import EXTRACT_JS, FieldSpec, normalize_fields
+from .pacing import Pacer, get_pacer
+from .sinks import ResultSink
+from .tabs import Tab, map_in_tabs
+
+from selenium import webdriver
+from selenium.webdriver.remote.webelement import WebElement
+
+SEEN_ATTRIBUTE = "data-browser-auto-seen"
+
+# Keep the elements not stamped by this run and stamp them, in one round-trip
+CLAIM_NEW_ITEMS_JS = """
+const [items, attr, runId] = arguments;
+return items.filter((el) => {
+    if (el.getAttribute(attr) === runId) return false;
+    el.setAttribute(attr, runId);
+    return true;
+});
+"""
+
+# Virtualized lists recycle nodes, so items are read with their key instead of stamped
+QUERY_KEYED_ITEMS_JS = """
+const [selector, keyAttr] = arguments;
+return Array.from(document.querySelectorAll(selector), (el) => [el, keyAttr ? el.getAttribute(keyAttr) : null]);
+"""
+
+KEY_ITEMS_JS = """
+const [items, keyAttr] = arguments;
+return items.map((el) => [el, keyAttr ? el.getAttribute(keyAttr) : null]);
+"""
+
+QUERY_NEW_ITEMS_JS = """
+const [selector, attr, runId] = arguments;
+const items = [];
+for (const el of document.querySelectorAll(selector)) {
+    if (el.getAttribute(attr) === runId) continue;
+    el.setAttribute(attr, runId);
+    items.push(el);
+}
+return items;
+"""
+
+# Scroll the container and resolve as soon as new elements are added to it.
+# The observer is installed before scrolling so fast responses are not missed;
+# after the first mutation it waits for `settleMs` of quiet to batch a render.
+# With `stepRatio` it scrolls by that share of the viewport instead of to the
+# bottom, and with `anyMutation` recycled nodes whose content changes count too.
+SCROLL_AND_WAIT_JS = """
+const [selector, timeoutMs, settleMs, stepRatio, anyMutation, done] = arguments;
+const container = selector ? document.querySelector(selector) : document.body;
+if (!container) {
+    done({error: `scroll container not found: ${selector}`});
+    return;
+}
+const scroller = selector ? container : (document.scrollingElement || document.body);
+let added = 0;
+let settleTimer = null;
+let timeoutTimer = null;
+const finish = () => {
+    observer.disconnect();
+    clearTimeout(settleTimer);
+    clearTimeout(timeoutTimer);
+    const atBottom = scroller.scrollTop + scroller.clientHeight >= scroller.scrollHeight - 2;
+    done({added: added, height: scroller.scrollHeight, atBottom: atBottom});
+};
+const observer = new MutationObserver((mutations) => {
+    for (const m of mutations) {
+        if (anyMutation && m.type !== 'childList') {
+            added++;
+            continue;
+        }
+        for (const node of m.addedNodes) {
+            if (node.nodeType === Node.ELEMENT_NODE) added++;
+        }
+    }
+    if (added > 0) {
+        clearTimeout(settleTimer);
+        settleTimer = setTimeout(finish, settleMs);
+    }
+});
+observer.observe(container, {childList: true, subtree: true, characterData: anyMutation, attributes: anyMutation});
+timeoutTimer = setTimeout(finish, timeoutMs);
+const top = stepRatio ? scroller.scrollTop + scroller.clientHeight * stepRatio : scroller.scrollHeight;
+if (selector) {
+    scroller.scrollTo({top: top, behavior: stepRatio ? 'auto' : 'smooth'});
+} else {
+    window.scrollTo({top: top, behavior: stepRatio ? 'auto' : 'smooth'});
+}
+"""
+
+
+class SeenKeys:
+    """Set of result keys, optionally keeping only the ``max_size`` most recent.
+
+    ``resumed`` keys (e.g. those already in a sink) are always kept and
+    do not count towards ``max_size``.
+    """
+
+    def __init__(
+        self,
+        keys: Iterable[Hashable] = (),
+        max_size: Optional[int] = None,
+        resumed: Iterable[Hashable] = (),
+    ):
+        self.max_size = max_size
+        self.resumed = frozenset(resumed)
+        self._keys = OrderedDict()
+        for key in keys:
+            self.add(key)
+
+    def add(self, key: Hashable):
+        if key in self.resumed:
+            return
+        self._keys[key] = None
+        self._keys.move_to_end(key)
+        if self.max_size is not None and len(self._keys) > self.max_size:
+            self._keys.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.resumed or key in self._keys
+
+    def __len__(self) -> int:
+        return len(self.resumed) + len(self._keys)
+
+
+class ScrollProgress:
+    """Result keys, count and stop condition of one ``iter_scroll`` run.
+
+    Shared by the sync and async ``iter_scroll``, which only differ in how
+    they talk to the page.
+
+    Args:
+        target_count: Results to collect
+        sink: Where results are written, its keys are resumed with ``resume``
+        resume: Skip the keys already in ``sink``, counting them as results
+        max_seen_keys: Bound of the keys kept besides the resumed ones
+        max_scroll_attempts: Passes in a row without new content before stopping
+        virtualized: Every result needs a key, and only new keys count as new content
+    """
+
+    def __init__(
+        self,
+        target_count: int,
+        sink: Optional[ResultSink] = None,
+        resume: bool = True,
+        max_seen_keys: Optional[int] = None,
+        max_scroll_attempts: int = 3,
+        virtualized: bool = False,
+    ):
+        self.target_count = target_count
+        self.sink = sink
+        self.max_scroll_attempts = max_scroll_attempts
+        self.virtualized = virtualized
+        self.keys = SeenKeys(
+            max_size=max_seen_keys, resumed=sink.seen_keys() if sink is not None and resume else ()
+        )
+        # Every key in the sink counts, even when more than max_seen_keys
+        self.count = len(self.keys.resumed)
+        if self.count:
+            logging.info(f"Resume with {self.count} results already in sink")
+        self.new_results = 0
+        self.scroll_count = 0  # 连续没有新内容的滚动次数
+        self.last_height = 0
+
+    @property
+    def done(self) -> bool:
+        return self.count >= self.target_count
+
+    @property
+    def keep_scrolling(self) -> bool:
+        return not self.done and self.scroll_count < self.max_scroll_attempts
+
+    def seen(self, key: Optional[Hashable]) -> bool:
+        return key is not None and key in self.keys
+
+    def accept(self, key: Optional[Hashable], result: Any) -> Tuple[bool, Any]:
+        """Record a processed item and write it to the sink unless its key was seen.
+
+        ``result`` may be ``(key, result)`` as returned by ``process_item``.
+
+        Returns:
+            tuple: ``(accepted, result)`` with the key unpacked from ``result``
+        """
+        if isinstance(result, tuple):
+            key, result = result
+        elif self.virtualized and key is None:
+            raise ValueError(
+                "virtualized scrolling needs key_attribute, key_field or process_item returning (key, result)"
+            )
+
+        if key is not None:
+            if key in self.keys:
+                logging.debug(f"Result key {key} already exists, skip")
+                return False, result
+            self.keys.add(key)
+
+        if self.sink is not None:
+            self.sink.write(key, result)
+        self.count += 1
+        self.new_results += 1
+        return True, result
+
+    def end_pass(self, loaded: Optional[dict] = None):
+        """Update the stop condition after a pass, with ``scroll_and_wait``'s result if any.
+
+        Virtualized lists recycle their nodes and keep their height, so only
+        new keys count. Otherwise new results or a taller page do; any DOM
+        mutation would not, as carousels or timers would keep it going forever.
+        """
+        if self.virtualized or loaded is None:
+            progressed = self.new_results > 0
+        else:
+            progressed = self.new_results > 0 or loaded["height"] > self.last_height
+            self.last_height = max(self.last_height, loaded["height"])
+
+        if progressed:
+            self.scroll_count = 0
+            logging.info(f"{self.new_results} new results, reset scroll count")
+        else:
+            self.scroll_count += 1
+            logging.info(f"Scroll {self.scroll_count} times but no new content loaded")
+        self.new_results = 0
+
+    def flush(self):
+        if self.sink is not None:
+            self.sink.flush()
+
+
+def scroll_and_wait(
+    driver: webdriver.Chrome,
+    scroll_container: Optional[str] = None,
+    timeout: float = 10,
+    settle_time: float = 0.3,
+    step_ratio: Optional[float] = None,
+    any_mutation: bool = False,
+) -> dict:
+    """Scroll to the bottom and wait until new elements appear.
+
+    Returns as soon as the DOM under the container settles after new nodes
+    were added, or after ``timeout`` seconds.
+
+    Args:
+        driver: WebDriver
+        scroll_container: CSS selector of the scrolling element, None for the page
+        timeout: Seconds to wait for new content
+        settle_time: Seconds without further mutations before returning
+        step_ratio: Scroll by this share of the viewport instead of to the bottom
+        any_mutation: Count text and attribute changes as new content too
+
+    Returns:
+        dict: ``{"added": <mutation count>, "height": <scrollHeight>, "atBottom": <bool>}``
+    """
+    if driver.timeouts.script < timeout + 5:
+        driver.set_script_timeout(timeout + 5)
+
+    result = driver.execute_async_script(
+        SCROLL_AND_WAIT_JS,
+        scroll_container,
+        int(timeout * 1000),
+        int(settle_time * 1000),
+        step_ratio or 0,
+        any_mutation,
+    )
+    if result.get("error"):
+        raise ValueError(result["error"])
+    return result
+
+
+def iter_scroll(
+    driver: webdriver.Chrome,
+    url: str,
+    target_count: int,
+    find_items: Optional[Callable[[webdriver.Chrome], List[WebElement]]],
+    process_item: Optional[Callable[[WebElement], Any]],
+    process_item_interval: Optional[float] = None,
+    item_selector: Optional[str] = None,
+    sink: Optional[ResultSink] = None,
+    resume: bool = True,
+    fields: Optional[Dict[str, FieldSpec]] = None,
+    key_field: Optional[str] = None,
+    scroll_container: Optional[str] = None,
+    content_timeout: float = 10,
+    virtualized: bool = False,
+    key_attribute: Optional[str] = None,
+    viewport_step: float = 0.8,
+    max_seen_keys: Optional[int] = None,
+    max_scroll_attempts: int = 3,
+    pacer: Union[str, Pacer, None] = None,
+) -> Iterator[Any]:
+    """Scroll ``url`` and yield results as items are processed.
+
+    Processed elements are stamped with a ``data-browser-auto-seen``
+    attribute, so each pass after a scroll only touches newly appended
+    elements. Pass ``item_selector`` instead of ``find_items`` to let the
+    browser select and stamp the new elements in a single round-trip.
+
+    ``process_item`` may return ``(key, result)`` to drop duplicate keys.
+    Each result is also written to ``sink`` if given; with ``resume`` the
+    keys already in the sink are skipped and count towards ``target_count``.
+    Nothing is kept in memory except the seen keys, and errors other than
+    a failing ``process_item`` are raised to the caller.
+
+    After each scroll of ``scroll_container`` (the page by default) it waits
+    at most ``content_timeout`` seconds for new elements to be rendered.
+
+    With ``virtualized=True`` the list is assumed to recycle its DOM nodes:
+    it scrolls by ``viewport_step`` viewports, identifies items by key
+    (``key_attribute`` read in the browser, or the key returned by
+    ``process_item``) and stops after ``max_scroll_attempts`` steps without
+    new keys. ``max_seen_keys`` bounds the memory used for keys, which is
+    enough there because a step only overlaps the previous viewport.
+
+    With ``fields`` (see ``extract_all``) and ``item_selector``, each pass
+    reads all fields of the new items in one round-trip and ``process_item``
+    (optional) receives plain dicts; ``key_field`` names the field used as key.
+
+    Waits between items go through ``pacer`` (a ``Pacer`` or preset name,
+    ``human`` by default) unless ``process_item_interval`` is given.
+    """
+    if find_items is None and item_selector is None:
+        raise ValueError("find_items or item_selector is required")
+    if fields is not None:
+        if item_selector is None:
+            raise ValueError("fields requires item_selector")
+        specs = normalize_fields(fields)
+        if key_field is not None and key_field not in fields:
+            raise ValueError(f"key_field {key_field} is not one of the fields")
+    elif process_item is None:
+        raise ValueError("process_item is required without fields")
+
+    run_id = uuid.uuid4().hex
+    pacer = get_pacer(pacer)
+    domain = urlparse(url).hostname
+    progress = ScrollProgress(
+        target_count,
+        sink=sink,
+        resume=resume,
+        max_seen_keys=max_seen_keys,
+        max_scroll_attempts=max_scroll_attempts,
+        virtualized=virtualized,
+    )
+
+    def find_new_items() -> List[Tuple[Any, Optional[Hashable]]]:
+        if fields is not None:
+            stamp = (None, None) if virtualized else (SEEN_ATTRIBUTE, run_id)
+            rows = driver.execute_script(EXTRACT_JS, item_selector, specs, None, *stamp)
+            return [(row, row.get(key_field) if key_field else None) for row in rows]
+
+        if virtualized:
+            if item_selector is not None:
+                return driver.execute_script(QUERY_KEYED_ITEMS_JS, item_selector, key_attribute)
+            items = find_items(driver)
+            if not items or not key_attribute:
+                return [(item, None) for item in items or []]
+            return driver.execute_script(KEY_ITEMS_JS, items, key_attribute)
+
+        if item_selector is not None:
+            items = driver.execute_script(QUERY_NEW_ITEMS_JS, item_selector, SEEN_ATTRIBUTE, run_id)
+        else:
+            items = find_items(driver)
+            if items:
+                items = driver.execute_script(CLAIM_NEW_ITEMS_JS, items, SEEN_ATTRIBUTE, run_id)
+        return [(item, None) for item in items or []]
+
+    try:
+        if progress.done:
+            return
+
+        driver.get(url)
+        pacer.pause(reason=f"Open {url}", domain=domain)
+
+        while progress.keep_scrolling:
+            # 只处理上次滚动之后新出现的元素
+            items = find_new_items()
+            logging.info(f"Found {len(items)} items")
+
+            for item, result_key in items:
+                if progress.seen(result_key):
+                    continue
+
+                try:
+                    result = process_item(item) if process_item is not None else item
+                except Exception as e:
+                    logging.warning(f"Process item failed: {str(e)}")
+                    logging.warning(traceback.format_exc())
+                    continue
+
+                accepted, result = progress.accept(result_key, result)
+                if not accepted:
+                    continue
+                yield result
+
+                if progress.done:
+                    logging.info(f"Found {progress.count} items, break")
+                    break
+
+                if process_item_interval is not None:
+                    if process_item_interval > 0:
+                        logging.info(
+                            f"Sleep {process_item_interval} seconds before next item"
+                        )
+                        get_clock().sleep(process_item_interval, reason="Process next item")
+                elif fields is None:
+                    # Extracted rows are already read, there is nothing to pace
+                    pacer.pause(reason="Process next item", domain=domain)
+
+            if progress.done:
+                break
+
+            logging.info(f"Current results: {progress.count}")
+
+            if virtualized:
+                # 节点会被复用，页面高度不变，按新 key 判断是否还有新内容
+                progress.end_pass()
+                scroll_and_wait(
+                    driver,
+                    scroll_container,
+                    timeout=content_timeout,
+                    step_ratio=viewport_step,
+                    any_mutation=True,
+                )
+                continue
+
+            # 滚动到底部并等待新内容加载
+            logging.info("Scroll to load more posts")
+            loaded = scroll_and_wait(driver, scroll_container, timeout=content_timeout)
+            progress.end_pass(loaded)
+
+        logging.info(f"Total results: {progress.count}")
+        pacer.report()
+
+    finally:
+        progress.flush()
+
+
+def with_scroll(
+    driver: webdriver.Chrome,
+    url: str,
+    target_count: int,
+    find_items: Optional[Callable[[webdriver.Chrome], List[WebElement]]],
+    process_item: Optional[Callable[[WebElement], Any]],
+    process_item_interval: Optional[float] = None,
+    item_selector: Optional[str] = None,
+    sink: Optional[ResultSink] = None,
+    raise_errors: bool = False,
+    scroll_container: Optional[str] = None,
+    content_timeout: float = 10,
+    detail_fn: Optional[Callable[[Tab, Any], Any]] = None,
+    detail_tabs: int = 4,
+    **kwargs,
+) -> List[Any]:
+    """Collect the results of ``iter_scroll`` into a list.
+
+    Extra keyword arguments (e.g. ``virtualized`` or ``fields``) go to ``iter_scroll``.
+
+    With ``detail_fn`` each result is passed to ``detail_fn(tab, result)``
+    on one of ``detail_tabs`` extra tabs of the same browser (e.g. to open
+    its detail page) while scrolling continues; the detail results are
+    returned in scroll order and failed details are logged and skipped.
+    ``sink`` receives the results before the detail step.
+
+    By default a failure is logged and the partial results are returned;
+    pass ``raise_errors=True`` to propagate it instead.
+    """
+    results = []
+    try:
+        scrolled = iter_scroll(
+            driver,
+            url,
+            target_count,
+            find_items,
+            process_item,
+            process_item_interval=process_item_interval,
+            item_selector=item_selector,
+            sink=sink,
+            scroll_container=scroll_container,
+            content_timeout=content_timeout,
+            **kwargs,
+        )
+        if detail_fn is None:
+            for result in scrolled:
+                results.append(result)
+            return results
+
+        for result in map_in_tabs(
+            driver, detail_fn, scrolled, tabs=detail_tabs, return_exceptions=True
+        ):
+            if isinstance(result, Exception):
+                logging.warning(f"Process detail failed: {result}")
+                continue
+            results.append(result)
+        return results
+
+    except Exception as e:
+        if raise_errors:
+            raise
+        logging.error(f"with_scroll failed after {len(results)} results: {str(e)}")
+        logging.error(traceback.format_exc())
+        return results
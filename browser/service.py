@@ -0,0 +1,267 @@
+import atexit
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Type
+
+import requests
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service as ChromeService
+from selenium.webdriver.chromium.remote_connection import ChromiumRemoteConnection
+from selenium.webdriver.common.service import Service
+from selenium.webdriver.edge.service import Service as EdgeService
+from selenium.webdriver.remote.webdriver import WebDriver as RemoteWebDriver
+
+from utils import is_windows
+from .base import read_major_version
+
+DRIVER_NAMES = {"chrome": "chromedriver", "edge": "msedgedriver"}
+
+# Where the drivers were expected before versioned lookup, still honoured
+DEFAULT_DRIVER_PATHS = {"chrome": "/usr/local/bin/chromedriver", "edge": "./msedgedriver.exe"}
+
+DRIVER_PATH_ENVS = {"chrome": "CHROMEDRIVER_PATH", "edge": "EDGEDRIVER_PATH"}
+
+DOWNLOAD_URLS = {
+    "chrome": "https://googlechromelabs.github.io/chrome-for-testing/#stable",
+    "edge": "https://developer.microsoft.com/zh-cn/microsoft-edge/tools/webdriver/?form=MA13LH",
+}
+
+# ChromeDriver 131.0.6778.85 (...) / Microsoft Edge WebDriver 132.0.2957.127 (...)
+DRIVER_VERSION_PATTERN = r"(\d+)\.\d+\.\d+"
+
+
+def get_driver_dir() -> str:
+    return os.environ.get("BROWSER_AUTO_DRIVER_DIR") or "drivers"
+
+
+def _driver_candidates(browser_type: str, major: Optional[str]) -> List[str]:
+    name = DRIVER_NAMES[browser_type] + (".exe" if is_windows() else "")
+    candidates = []
+    if major:
+        driver_dir = get_driver_dir()
+        # drivers/131/chromedriver or drivers/chromedriver-131
+        candidates.append(os.path.join(driver_dir, major, name))
+        root, ext = os.path.splitext(name)
+        candidates.append(os.path.join(driver_dir, f"{root}-{major}{ext}"))
+    env_path = os.environ.get(DRIVER_PATH_ENVS[browser_type])
+    if env_path:
+        candidates.append(env_path)
+    candidates.append(DEFAULT_DRIVER_PATHS[browser_type])
+    on_path = shutil.which(name)
+    if on_path:
+        candidates.append(on_path)
+    return [c for c in dict.fromkeys(candidates) if os.path.isfile(c)]
+
+
+_driver_paths: Dict[Tuple[str, Optional[str]], str] = {}
+_driver_paths_lock = threading.Lock()
+
+
+def resolve_driver_path(browser_type: str, major: Optional[str] = None) -> str:
+    """Find the driver binary for a browser major version, cached per version.
+
+    Looks at ``<driver dir>/<major>/chromedriver`` and
+    ``<driver dir>/chromedriver-<major>`` (driver dir from
+    ``BROWSER_AUTO_DRIVER_DIR``, ``drivers`` by default), then
+    ``CHROMEDRIVER_PATH`` / ``EDGEDRIVER_PATH``, the default location and PATH. The first one whose own major
+    version matches wins; if none matches, the first one found is used.
+    """
+    key = (browser_type, major)
+    with _driver_paths_lock:
+        path = _driver_paths.get(key)
+    if path and os.path.isfile(path):
+        return path
+
+    candidates = _driver_candidates(browser_type, major)
+    if not candidates:
+        raise FileNotFoundError(
+            f"{DRIVER_NAMES[browser_type]} not found for {browser_type} {major or ''}, "
+            f"please download from {DOWNLOAD_URLS[browser_type]} into {get_driver_dir()}/{major or '<major>'}/"
+        )
+
+    path = candidates[0]
+    if major:
+        for candidate in candidates:
+            if read_major_version(candidate, DRIVER_VERSION_PATTERN) == major:
+                path = candidate
+                break
+        else:
+            logging.warning(
+                f"No {DRIVER_NAMES[browser_type]} for {browser_type} {major} found, "
+                f"using {path} (version {read_major_version(path, DRIVER_VERSION_PATTERN)})"
+            )
+
+    with _driver_paths_lock:
+        _driver_paths[key] = path
+    return path
+
+
+class DriverService:
+    """A driver process (chromedriver / msedgedriver) shared by many sessions.
+
+    Attaching a session to a running driver skips spawning a process and
+    waiting for its port, and keeps one driver process per version instead
+    of one per browser.
+    """
+
+    SERVICE_CLASSES: Dict[str, Type[Service]] = {"chrome": ChromeService, "edge": EdgeService}
+
+    def __init__(self, browser_type: str, driver_path: str):
+        self.browser_type = browser_type
+        self.driver_path = driver_path
+        self.service: Optional[Service] = None
+        self.sessions = 0
+        self.started_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def service_url(self) -> str:
+        return self.service.service_url
+
+    def start(self):
+        self.service = self.SERVICE_CLASSES[self.browser_type](executable_path=self.driver_path)
+        self.service.start()
+        self.started_at = time.monotonic()
+        logging.info(f"Started {self.driver_path} at {self.service_url}")
+
+    def is_healthy(self, timeout: float = 1) -> bool:
+        """Whether the process is alive and ``/status`` reports it ready."""
+        if self.service is None or self.service.process is None or self.service.process.poll() is not None:
+            return False
+        try:
+            resp = requests.get(f"{self.service_url}/status", timeout=timeout)
+            return bool(resp.json().get("value", {}).get("ready"))
+        except (requests.RequestException, ValueError):
+            return False
+
+    def acquire(self):
+        with self._lock:
+            self.sessions += 1
+
+    def release(self):
+        with self._lock:
+            self.sessions = max(0, self.sessions - 1)
+
+    def stop(self):
+        if self.service is not None:
+            logging.info(f"Stopping {self.driver_path} with {self.sessions} sessions attached")
+            self.service.stop()
+            self.service = None
+
+
+class DriverServiceManager:
+    """One ``DriverService`` per driver binary, restarted when it is unhealthy."""
+
+    def __init__(self):
+        self._services: Dict[str, DriverService] = {}
+        self._lock = threading.Lock()
+
+    def get(self, browser_type: str, driver_path: str) -> DriverService:
+        key = os.path.realpath(driver_path)
+        with self._lock:
+            service = self._services.get(key)
+            if service is not None and not service.is_healthy():
+                logging.warning(
+                    f"{driver_path} at {service.service_url if service.service else '-'} is unhealthy, "
+                    f"restarting, {service.sessions} sessions lost"
+                )
+                try:
+                    service.stop()
+                except Exception as e:
+                    logging.error(f"Stop {driver_path} failed: {e}")
+                service = None
+            if service is None:
+                service = DriverService(browser_type, driver_path)
+                service.start()
+                self._services[key] = service
+            return service
+
+    def services(self) -> List[DriverService]:
+        with self._lock:
+            return list(self._services.values())
+
+    def stop_all(self):
+        with self._lock:
+            services = list(self._services.values())
+            self._services.clear()
+        for service in services:
+            try:
+                service.stop()
+            except Exception as e:
+                logging.error(f"Stop {service.driver_path} failed: {e}")
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_service_manager() -> DriverServiceManager:
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = DriverServiceManager()
+            atexit.register(_manager.stop_all)
+        return _manager
+
+
+class _SharedServiceDriver:
+    """WebDriver session on a ``DriverService``; ``quit`` ends the session only."""
+
+    browser_name = None
+    vendor_prefix = None
+
+    def __init__(self, options, driver_service: DriverService):
+        self.service = driver_service.service
+        self.driver_service = driver_service
+        executor = ChromiumRemoteConnection(
+            remote_server_addr=driver_service.service_url,
+            browser_name=self.browser_name,
+            vendor_prefix=self.vendor_prefix,
+            keep_alive=True,
+            ignore_proxy=options._ignore_local_proxy,
+        )
+        RemoteWebDriver.__init__(self, command_executor=executor, options=options)
+        self._is_remote = False
+        driver_service.acquire()
+
+    def quit(self):
+        try:
+            # With debuggerAddress this detaches, the browser keeps running
+            RemoteWebDriver.quit(self)
+        except Exception:
+            pass
+        finally:
+            self.driver_service.release()
+
+
+class SharedChrome(_SharedServiceDriver, webdriver.Chrome):
+    browser_name = "chrome"
+    vendor_prefix = "goog"
+
+
+class SharedEdge(_SharedServiceDriver, webdriver.Edge):
+    browser_name = "MicrosoftEdge"
+    vendor_prefix = "ms"
+
+
+def attach_driver(browser_type: str, port: int, major: Optional[str] = None):
+    """Attach a WebDriver session to the browser on ``port`` through a shared driver."""
+    if browser_type == "chrome":
+        options, driver_cls = webdriver.ChromeOptions(), SharedChrome
+    elif browser_type == "edge":
+        options, driver_cls = webdriver.EdgeOptions(), SharedEdge
+    else:
+        raise ValueError(f"Unknown browser type: {browser_type}, available: {list(DRIVER_NAMES)}")
+    options.add_experimental_option("debuggerAddress", f"127.0.0.1:{port}")
+
+    start_time = time.monotonic()
+    service = get_service_manager().get(browser_type, resolve_driver_path(browser_type, major))
+    driver = driver_cls(options, service)
+    logging.info(
+        f"Attached {browser_type} on port {port} to {service.service_url} "
+        f"in {time.monotonic() - start_time:.2f}s, {service.sessions} sessions"
+    )
+    return driver
@@ -0,0 +1,132 @@
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Hashable, Optional, Set
+
+
+def _as_key(value: Any) -> Hashable:
+    # Tuple keys come back from JSON as lists
+    if isinstance(value, list):
+        return tuple(_as_key(v) for v in value)
+    return value
+
+
+class ResultSink:
+    """Destination for scroll results that is flushed while scrolling.
+
+    Keys written to a sink act as a checkpoint: ``seen_keys()`` returns them
+    so a later run can skip what was already stored.
+    """
+
+    def write(self, key: Optional[Hashable], result: Any):
+        raise NotImplementedError
+
+    def seen_keys(self) -> Set[Hashable]:
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class JsonlSink(ResultSink):
+    """Append one ``{"key": ..., "result": ...}`` JSON line per result."""
+
+    def __init__(self, path: str, flush_every: int = 1):
+        self.path = path
+        self.flush_every = max(1, flush_every)
+        self._pending = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, key: Optional[Hashable], result: Any):
+        line = json.dumps({"key": key, "result": result}, ensure_ascii=False, default=str)
+        self._file.write(line + "\n")
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        self._file.flush()
+        self._pending = 0
+
+    def seen_keys(self) -> Set[Hashable]:
+        self.flush()
+        keys = set()
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    key = json.loads(line).get("key")
+                except ValueError:
+                    # Partial last line of a crashed run
+                    continue
+                if key is not None:
+                    keys.add(_as_key(key))
+        return keys
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+class SQLiteSink(ResultSink):
+    """Store results in a SQLite table, keyed results are upserted."""
+
+    def __init__(self, path: str, table: str = "results", flush_every: int = 20):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table}")
+
+        self.path = path
+        self.table = table
+        self.flush_every = max(1, flush_every)
+        self._pending = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "key TEXT UNIQUE, "
+            "result TEXT NOT NULL, "
+            "created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def write(self, key: Optional[Hashable], result: Any):
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, result, created_at) VALUES (?, ?, ?)",
+            (
+                None if key is None else json.dumps(key, default=str),
+                json.dumps(result, ensure_ascii=False, default=str),
+                time.time(),
+            ),
+        )
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        self._conn.commit()
+        self._pending = 0
+
+    def seen_keys(self) -> Set[Hashable]:
+        self.flush()
+        rows = self._conn.execute(f"SELECT key FROM {self.table} WHERE key IS NOT NULL")
+        return {_as_key(json.loads(key)) for (key,) in rows}
+
+    def close(self):
+        self.flush()
+        self._conn.close()
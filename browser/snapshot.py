@@ -0,0 +1,367 @@
+import atexit
+import json
+import logging
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from utils import is_linux
+from .base import MIN_DEV_SHM_BYTES, Browser
+from .process import get_runtime_dir, pid_exists
+
+# Login state of a user data dir: the key cookies are encrypted with lives in
+# "Local State", the rest in the profile directory. Caches are left out.
+SNAPSHOT_ROOT_ENTRIES = ("Local State", "First Run")
+SNAPSHOT_PROFILE_ENTRIES = (
+    "Preferences",
+    "Secure Preferences",
+    "Cookies",  # before Chrome 96, later in Network/
+    "Cookies-journal",
+    "Network",
+    "Local Storage",
+    "Session Storage",
+    "IndexedDB",
+    "Login Data",
+    "Login Data-journal",
+    "Web Data",
+    "Web Data-journal",
+    "Extension Cookies",
+)
+
+# LevelDB never rewrites its table files, only adds and deletes them, so
+# these can be hardlinked. SQLite databases are written in place and must
+# never be: the clone would write through to the source profile.
+IMMUTABLE_SUFFIXES = (".ldb", ".sst")
+
+OWNER_FILE = ".browser-auto-snapshot.json"
+
+FICLONE = 0x40049409  # _IOW(0x94, 9, int)
+
+
+def _shm_fits(required_bytes: int) -> bool:
+    """Whether ``/dev/shm`` is writable, big enough and has ``required_bytes`` free."""
+    if not (os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK)):
+        return False
+    try:
+        st = os.statvfs("/dev/shm")
+    except OSError:
+        return False
+    # The browsers need shared memory too, a Docker sized 64MB mount cannot spare any
+    if st.f_frsize * st.f_blocks < MIN_DEV_SHM_BYTES:
+        return False
+    return st.f_frsize * st.f_bavail >= required_bytes
+
+
+def get_snapshot_root(required_bytes: int = 0) -> str:
+    """Where snapshots are created: ``BROWSER_AUTO_SNAPSHOT_DIR``, else tmpfs.
+
+    ``/dev/shm`` keeps the throwaway copies in memory. It is skipped for
+    the runtime dir when smaller than ``MIN_DEV_SHM_BYTES`` or without
+    ``required_bytes`` free. Point the variable at a directory on the same
+    btrfs / XFS / APFS volume as the source profile to get reflink copies
+    instead, which cost no space until written.
+    """
+    path = os.environ.get("BROWSER_AUTO_SNAPSHOT_DIR")
+    if not path:
+        if _shm_fits(required_bytes):
+            path = os.path.join("/dev/shm", "browser-auto-snapshots")
+        else:
+            path = os.path.join(get_runtime_dir(), "snapshots")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _disk_usage(path: str) -> int:
+    """Bytes of the regular files under ``path``, symlinks not followed."""
+    if os.path.isfile(path) and not os.path.islink(path):
+        return os.path.getsize(path)
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                st = os.lstat(os.path.join(dirpath, name))
+            except OSError:
+                continue
+            if stat.S_ISREG(st.st_mode):
+                total += st.st_size
+    return total
+
+
+_no_reflink = set()  # (source device, target device) pairs that refused a reflink
+
+
+def _reflink(src: str, dst: str) -> bool:
+    if is_linux():
+        import fcntl
+
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        return True
+    if sys.platform == "darwin":
+        import ctypes
+
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) != 0:
+            raise OSError(ctypes.get_errno(), "clonefile failed")
+        return True
+    return False
+
+
+def clone_file(src: str, dst: str, hardlink: bool = False) -> str:
+    """Copy ``src`` to ``dst`` as cheaply as the filesystem allows.
+
+    Tries a reflink (copy-on-write clone), then a hardlink if ``hardlink``,
+    then a plain copy.
+
+    Returns:
+        str: ``reflink``, ``hardlink`` or ``copy``
+    """
+    src_dev = os.stat(src).st_dev
+    dst_dev = os.stat(os.path.dirname(dst)).st_dev
+    if (src_dev, dst_dev) not in _no_reflink:
+        try:
+            if _reflink(src, dst):
+                shutil.copystat(src, dst)
+                return "reflink"
+        except OSError:
+            pass
+        # tmpfs and ext4 do not clone, do not try again for every file
+        _no_reflink.add((src_dev, dst_dev))
+        try:
+            os.remove(dst)
+        except FileNotFoundError:
+            pass
+
+    if hardlink and src_dev == dst_dev:
+        try:
+            os.link(src, dst)
+            return "hardlink"
+        except OSError:
+            pass
+
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+def _lock_owner(user_data_dir: str) -> Optional[int]:
+    """PID holding the ``SingletonLock`` of a user data dir, if any (Linux / macOS)."""
+    try:
+        # Symlink to "<hostname>-<pid>"
+        target = os.readlink(os.path.join(user_data_dir, "SingletonLock"))
+        return int(target.rsplit("-", 1)[1])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class ProfileSnapshot:
+    """Throwaway user data dir holding a copy of one profile's login state.
+
+    A user data dir can only be opened by one browser at a time; each
+    snapshot can be opened by its own browser, so several browsers can
+    share one logged-in account. Changes made in a snapshot (new cookies,
+    logging out) are never written back.
+
+    Example::
+
+        with ProfileSnapshot(Chrome().user_data_dir, "Default") as snapshot:
+            run_in_browser(Chrome(user_data_dir=snapshot.path), "Default", fn,
+                           kill_browser_after_running=True)
+    """
+
+    def __init__(
+        self,
+        source_dir: str,
+        profile: str = "Default",
+        root: Optional[str] = None,
+        profile_entries: Iterable[str] = SNAPSHOT_PROFILE_ENTRIES,
+    ):
+        self.source_dir = source_dir
+        self.profile = profile
+        self.root = root
+        self.profile_entries = tuple(profile_entries)
+        self.path: Optional[str] = None
+        self.stats: Dict[str, int] = {"reflink": 0, "hardlink": 0, "copy": 0, "bytes": 0}
+
+    def create(self) -> "ProfileSnapshot":
+        source_profile = os.path.join(self.source_dir, self.profile)
+        if not os.path.isdir(source_profile):
+            raise FileNotFoundError(f"profile {self.profile} not found in {self.source_dir}")
+
+        owner = _lock_owner(self.source_dir)
+        if owner is not None and pid_exists(owner):
+            logging.warning(
+                f"{self.source_dir} is in use by pid {owner}, the snapshot may miss "
+                f"recent writes; close that browser for a consistent copy"
+            )
+
+        root = self.root or get_snapshot_root(self.source_size())
+        sweep_snapshots(root)
+
+        start_time = time.monotonic()
+        self.path = os.path.join(root, f"{self.profile.replace(' ', '_')}-{uuid.uuid4().hex[:12]}")
+        os.makedirs(os.path.join(self.path, self.profile))
+        # Written first, so a sweep from another process can tell it is ours
+        with open(os.path.join(self.path, OWNER_FILE), "w") as f:
+            json.dump(
+                {
+                    "owner_pid": os.getpid(),
+                    "source_dir": self.source_dir,
+                    "profile": self.profile,
+                    "created_at": time.time(),
+                },
+                f,
+            )
+        _register(self)
+
+        try:
+            for name in SNAPSHOT_ROOT_ENTRIES:
+                self._copy(os.path.join(self.source_dir, name), os.path.join(self.path, name))
+            for name in self.profile_entries:
+                self._copy(
+                    os.path.join(source_profile, name),
+                    os.path.join(self.path, self.profile, name),
+                )
+        except Exception:
+            self.remove()
+            raise
+
+        logging.info(
+            f"Snapshot of {self.profile} at {self.path} in {time.monotonic() - start_time:.2f}s: "
+            f"{self.stats['bytes'] / 1024 / 1024:.1f} MB, {self.stats['reflink']} reflinked, "
+            f"{self.stats['hardlink']} hardlinked, {self.stats['copy']} copied"
+        )
+        return self
+
+    def source_size(self) -> int:
+        """Bytes a plain copy of the snapshot entries would take."""
+        source_profile = os.path.join(self.source_dir, self.profile)
+        return sum(
+            _disk_usage(os.path.join(self.source_dir, name)) for name in SNAPSHOT_ROOT_ENTRIES
+        ) + sum(_disk_usage(os.path.join(source_profile, name)) for name in self.profile_entries)
+
+    def _copy(self, src: str, dst: str):
+        if os.path.isdir(src):
+            os.makedirs(dst, exist_ok=True)
+            for entry in os.scandir(src):
+                # LevelDB LOCK files are held by the running source browser
+                if entry.name == "LOCK" or entry.is_symlink():
+                    continue
+                self._copy(entry.path, os.path.join(dst, entry.name))
+            return
+
+        try:
+            method = clone_file(src, dst, hardlink=src.endswith(IMMUTABLE_SUFFIXES))
+        except FileNotFoundError:
+            # Optional entries, or removed by the source browser meanwhile
+            return
+        self.stats[method] += 1
+        self.stats["bytes"] += os.path.getsize(dst)
+
+    def remove(self):
+        """Delete the snapshot; close the browser using it first."""
+        if self.path is None:
+            return
+        shutil.rmtree(self.path, ignore_errors=True)
+        logging.info(f"Removed snapshot {self.path}")
+        _unregister(self)
+        self.path = None
+
+    def __enter__(self) -> "ProfileSnapshot":
+        if self.path is None:
+            self.create()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.remove()
+
+
+def sweep_snapshots(root: Optional[str] = None) -> List[str]:
+    """Delete snapshots left behind by processes that died without cleaning up.
+
+    A snapshot is kept while its owner or the browser holding its
+    ``SingletonLock`` is alive.
+
+    Returns:
+        list: Paths removed
+    """
+    root = root or get_snapshot_root()
+    removed = []
+    for entry in os.scandir(root):
+        if not entry.is_dir(follow_symlinks=False):
+            continue
+        try:
+            with open(os.path.join(entry.path, OWNER_FILE)) as f:
+                owner_pid = json.load(f)["owner_pid"]
+        except FileNotFoundError:
+            # Being created, or not a snapshot; old enough means abandoned
+            if time.time() - entry.stat().st_mtime < 60:
+                continue
+            owner_pid = None
+        except (OSError, ValueError, KeyError):
+            owner_pid = None
+
+        if owner_pid is not None and pid_exists(owner_pid):
+            continue
+        browser_pid = _lock_owner(entry.path)
+        if browser_pid is not None and pid_exists(browser_pid):
+            continue
+
+        shutil.rmtree(entry.path, ignore_errors=True)
+        logging.warning(f"Removed stale snapshot {entry.path} of dead owner {owner_pid}")
+        removed.append(entry.path)
+    return removed
+
+
+_snapshots: Dict[int, ProfileSnapshot] = {}
+_snapshots_lock = threading.Lock()
+
+
+def _register(snapshot: ProfileSnapshot):
+    with _snapshots_lock:
+        _snapshots[id(snapshot)] = snapshot
+
+
+def _unregister(snapshot: ProfileSnapshot):
+    with _snapshots_lock:
+        _snapshots.pop(id(snapshot), None)
+
+
+@atexit.register
+def _remove_all():
+    with _snapshots_lock:
+        snapshots = list(_snapshots.values())
+    for snapshot in snapshots:
+        snapshot.remove()
+
+
+@contextmanager
+def snapshot_browser(
+    browser_factory: Callable[..., Browser],
+    profile: str = "Default",
+    root: Optional[str] = None,
+    source_dir: Optional[str] = None,
+) -> Iterator[Browser]:
+    """Yield a browser whose user data dir is a fresh snapshot of ``profile``.
+
+    On exit the browser is terminated and the snapshot removed.
+
+    Args:
+        browser_factory: Browser class taking ``user_data_dir``, e.g. ``Chrome``
+        profile: Profile directory name to snapshot
+        root: Directory to create the snapshot in, see ``get_snapshot_root``
+        source_dir: User data dir to copy from, the browser's default if None
+    """
+    source_dir = source_dir or browser_factory().user_data_dir
+    with ProfileSnapshot(source_dir, profile, root=root) as snapshot:
+        browser = browser_factory(user_data_dir=snapshot.path)
+        try:
+            yield browser
+        finally:
+            browser.terminate()
@@ -0,0 +1,404 @@
+import base64
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .cdp import CDPError, CDPSession, get_debugger_address, get_targets
+from .devtools import get_version_info
+
+# key -> (code, windowsVirtualKeyCode, text) for Input.dispatchKeyEvent
+KEY_DEFINITIONS = {
+    "Enter": ("Enter", 13, "\r"),
+    "Tab": ("Tab", 9, "\t"),
+    "Backspace": ("Backspace", 8, ""),
+    "Delete": ("Delete", 46, ""),
+    "Escape": ("Escape", 27, ""),
+    "ArrowUp": ("ArrowUp", 38, ""),
+    "ArrowDown": ("ArrowDown", 40, ""),
+    "ArrowLeft": ("ArrowLeft", 37, ""),
+    "ArrowRight": ("ArrowRight", 39, ""),
+    "PageUp": ("PageUp", 33, ""),
+    "PageDown": ("PageDown", 34, ""),
+    "Home": ("Home", 36, ""),
+    "End": ("End", 35, ""),
+}
+
+# A CSS selector, or a DOM node id from query_selector
+NodeRef = Union[str, int]
+
+
+# Helpers shared by Tab and aio.AsyncTab, which only differ in how they send
+
+def script_expression(script: str, args: Iterable[Any]) -> str:
+    """Expression running a Selenium style script body that reads ``arguments``."""
+    return f"(function() {{ {script} \n}}).apply(null, {json.dumps(list(args))})"
+
+
+def async_script_expression(script: str, args: Iterable[Any]) -> str:
+    """Promise running a Selenium style async script, whose last argument is the callback."""
+    return (
+        f"new Promise((done) => {{ (function() {{ {script} \n}})"
+        f".apply(null, {json.dumps(list(args))}.concat([done])); }})"
+    )
+
+
+def evaluate_params(expression: str) -> dict:
+    return {"expression": expression, "returnByValue": True, "awaitPromise": True}
+
+
+def evaluate_value(result: dict) -> Any:
+    """JSON value of a ``Runtime.evaluate`` response, raising ``CDPError`` for exceptions."""
+    if result.get("exceptionDetails"):
+        details = result["exceptionDetails"]
+        raise CDPError(
+            f"evaluate failed: {details.get('exception', {}).get('description') or details.get('text')}"
+        )
+    return result.get("result", {}).get("value")
+
+
+def quad_center(quad: List[float]) -> Tuple[float, float]:
+    """Center of a ``DOM.getBoxModel`` quad ``[x1, y1, ..., x4, y4]``."""
+    return sum(quad[0::2]) / 4, sum(quad[1::2]) / 4
+
+
+def key_events(key: str, modifiers: int = 0) -> Tuple[dict, dict]:
+    """``Input.dispatchKeyEvent`` params pressing and releasing ``key``.
+
+    ``key`` is a name from ``KEY_DEFINITIONS`` or a single character,
+    ``modifiers`` the CDP bit field: Alt=1, Ctrl=2, Meta=4, Shift=8.
+    """
+    if key in KEY_DEFINITIONS:
+        code, key_code, text = KEY_DEFINITIONS[key]
+    elif len(key) == 1:
+        code, key_code, text = "", ord(key.upper()), key
+    else:
+        raise ValueError(f"Unknown key: {key}")
+
+    down = {
+        "type": "keyDown" if text and not modifiers else "rawKeyDown",
+        "key": key,
+        "code": code,
+        "windowsVirtualKeyCode": key_code,
+        "modifiers": modifiers,
+    }
+    if text and not modifiers:
+        down["text"] = text
+    up = {"type": "keyUp", "key": key, "code": code, "windowsVirtualKeyCode": key_code, "modifiers": modifiers}
+    return down, up
+
+
+class Tab:
+    """A browser tab driven through its own CDP session, without Selenium.
+
+    Several tabs can load pages at the same time, while a Selenium driver
+    can only talk to one window at a time. Each call is a single WebSocket
+    message to the browser, without the extra hop through chromedriver.
+
+    Besides the CDP helpers it offers the part of the Selenium driver API
+    that ``iter_scroll`` uses with ``fields`` (``get``, ``execute_script``,
+    ``execute_async_script``, ``current_url``), so the scrolling helpers
+    run on a ``Tab`` too. Elements cannot be returned to Python, use node
+    ids from ``query_selector`` or read values in the script instead.
+    """
+
+    def __init__(self, session: CDPSession, target_id: str):
+        self.session = session
+        self.target_id = target_id
+        self.timeouts = SimpleNamespace(script=30)
+        self._root_id: Optional[int] = None
+        self._loaded = threading.Event()
+        self.session.on("Page.loadEventFired", lambda _: self._loaded.set())
+        self.session.send("Page.enable")
+
+    @classmethod
+    def for_port(cls, port: int, host: str = "127.0.0.1", **kwargs) -> "Tab":
+        """Attach to the first page of the browser on ``port``, opening one if there is none."""
+        pages = [t for t in get_targets(port) if t.get("type") == "page"]
+        if pages:
+            target_id = pages[0]["id"]
+        else:
+            with CDPSession(get_version_info(port)["webSocketDebuggerUrl"]) as browser:
+                target_id = browser.send("Target.createTarget", {"url": "about:blank"})["targetId"]
+        return cls(CDPSession.for_target(port, target_id, host=host, **kwargs), target_id)
+
+    @classmethod
+    def for_driver(cls, driver, **kwargs) -> "Tab":
+        """Attach to the window a Selenium driver is focused on, to use both side by side."""
+        return cls(CDPSession.for_driver(driver, **kwargs), driver.current_window_handle)
+
+    def navigate(self, url: str, timeout: float = 30):
+        """Open ``url`` and wait for its load event."""
+        self._loaded.clear()
+        self._root_id = None
+        result = self.session.send("Page.navigate", {"url": url}, timeout=timeout)
+        if result.get("errorText"):
+            raise CDPError(f"navigate to {url} failed: {result['errorText']}")
+        if not self._loaded.wait(timeout):
+            raise TimeoutError(f"{url} not loaded after {timeout}s")
+
+    def get(self, url: str):
+        """Selenium style alias of ``navigate``."""
+        self.navigate(url)
+
+    @property
+    def current_url(self) -> str:
+        return self.evaluate("location.href")
+
+    @property
+    def title(self) -> str:
+        return self.evaluate("document.title")
+
+    def evaluate(self, expression: str, timeout: Optional[float] = None) -> Any:
+        """Evaluate a JavaScript expression and return its JSON value."""
+        return evaluate_value(
+            self.session.send("Runtime.evaluate", evaluate_params(expression), timeout=timeout)
+        )
+
+    def execute_script(self, script: str, *args) -> Any:
+        """Run a Selenium style script body that reads ``arguments``.
+
+        Arguments and the return value must be JSON serializable.
+        """
+        return self.evaluate(script_expression(script, args))
+
+    def execute_async_script(self, script: str, *args) -> Any:
+        """Run a Selenium style async script, whose last argument is the callback."""
+        return self.evaluate(async_script_expression(script, args), timeout=self.timeouts.script)
+
+    def set_script_timeout(self, time_to_wait: float):
+        self.timeouts.script = time_to_wait
+
+    # ---- DOM
+
+    def _dom(self, method: str, params: Optional[dict] = None) -> dict:
+        """Send a DOM method relative to the document node.
+
+        The document node id is cached and fetched again once it went
+        stale, e.g. after the page navigated by itself.
+        """
+        for attempt in range(2):
+            if self._root_id is None:
+                self._root_id = self.session.send("DOM.getDocument", {"depth": 0})["root"]["nodeId"]
+            try:
+                return self.session.send(method, {"nodeId": self._root_id, **(params or {})})
+            except CDPError:
+                if attempt:
+                    raise
+                self._root_id = None
+
+    def query_selector(self, selector: str) -> Optional[int]:
+        """Node id of the first element matching ``selector``, None if there is none."""
+        return self._dom("DOM.querySelector", {"selector": selector})["nodeId"] or None
+
+    def query_selector_all(self, selector: str) -> List[int]:
+        return self._dom("DOM.querySelectorAll", {"selector": selector})["nodeIds"]
+
+    def wait_for_selector(self, selector: str, timeout: float = 10, interval: float = 0.1) -> int:
+        """Poll until an element matches ``selector`` and return its node id."""
+        deadline = time.monotonic() + timeout
+        while True:
+            node_id = self.query_selector(selector)
+            if node_id:
+                return node_id
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"{selector} not found after {timeout}s")
+            time.sleep(interval)
+
+    def _node(self, node: NodeRef) -> int:
+        if isinstance(node, int):
+            return node
+        node_id = self.query_selector(node)
+        if not node_id:
+            raise CDPError(f"no element matches {node}")
+        return node_id
+
+    def get_outer_html(self, node: NodeRef) -> str:
+        return self.session.send("DOM.getOuterHTML", {"nodeId": self._node(node)})["outerHTML"]
+
+    def get_attributes(self, node: NodeRef) -> dict:
+        flat = self.session.send("DOM.getAttributes", {"nodeId": self._node(node)})["attributes"]
+        return dict(zip(flat[::2], flat[1::2]))
+
+    def focus(self, node: NodeRef):
+        self.session.send("DOM.focus", {"nodeId": self._node(node)})
+
+    def set_files(self, node: NodeRef, files: Union[str, List[str]]):
+        """Set the files of an ``<input type=file>``, like ``send_keys(path)`` in Selenium."""
+        files = [files] if isinstance(files, str) else files
+        self.session.send(
+            "DOM.setFileInputFiles",
+            {"nodeId": self._node(node), "files": [os.path.abspath(f) for f in files]},
+        )
+
+    def center(self, node: NodeRef) -> Tuple[float, float]:
+        """Scroll the element into view and return the viewport coordinates of its center."""
+        node_id = self._node(node)
+        self.session.send("DOM.scrollIntoViewIfNeeded", {"nodeId": node_id})
+        return quad_center(self.session.send("DOM.getBoxModel", {"nodeId": node_id})["model"]["content"])
+
+    # ---- Input
+
+    def _mouse(self, type: str, x: float, y: float, **params):
+        self.session.send("Input.dispatchMouseEvent", {"type": type, "x": x, "y": y, **params})
+
+    def hover(self, node: NodeRef):
+        x, y = self.center(node)
+        self._mouse("mouseMoved", x, y)
+
+    def click(self, node: NodeRef, button: str = "left", click_count: int = 1):
+        """Click the center of the element with real mouse events."""
+        x, y = self.center(node)
+        self._mouse("mouseMoved", x, y)
+        self._mouse("mousePressed", x, y, button=button, clickCount=click_count)
+        self._mouse("mouseReleased", x, y, button=button, clickCount=click_count)
+
+    def scroll(self, delta_y: float, delta_x: float = 0, x: float = 0, y: float = 0):
+        """Scroll with a mouse wheel event at ``(x, y)``."""
+        self._mouse("mouseWheel", x, y, deltaX=delta_x, deltaY=delta_y)
+
+    def insert_text(self, text: str):
+        """Insert ``text`` into the focused element in one event, like a paste."""
+        self.session.send("Input.insertText", {"text": text})
+
+    def type(self, node: NodeRef, text: str):
+        self.focus(node)
+        self.insert_text(text)
+
+    def press(self, key: str, modifiers: int = 0):
+        """Press and release ``key``, see ``key_events``."""
+        for params in key_events(key, modifiers):
+            self.session.send("Input.dispatchKeyEvent", params)
+
+    def screenshot(self, path: Optional[str] = None) -> bytes:
+        data = base64.b64decode(self.session.send("Page.captureScreenshot", {"format": "png"})["data"])
+        if path:
+            with open(path, "wb") as f:
+                f.write(data)
+        return data
+
+    def close(self):
+        self.session.close()
+
+
+class TabPool:
+    """``size`` extra tabs in the browser on ``port``, sharing its profile.
+
+    Example::
+
+        with TabPool.for_driver(driver, size=4) as pool:
+            for detail in pool.map(fetch_detail, urls):
+                ...
+    """
+
+    def __init__(self, port: int, size: int = 4, host: str = "127.0.0.1"):
+        self.port = port
+        self.host = host
+        self.size = size
+        self.tabs: List[Tab] = []
+        self._free: queue.Queue = queue.Queue()
+        self._browser: Optional[CDPSession] = None
+
+    @classmethod
+    def for_driver(cls, driver, size: int = 4) -> "TabPool":
+        host, port = get_debugger_address(driver).rsplit(":", 1)
+        return cls(int(port), size=size, host=host)
+
+    def open(self) -> "TabPool":
+        ws_url = get_version_info(self.port)["webSocketDebuggerUrl"]
+        self._browser = CDPSession(ws_url)
+        try:
+            for _ in range(self.size):
+                target_id = self._browser.send(
+                    "Target.createTarget", {"url": "about:blank", "background": True}
+                )["targetId"]
+                tab = Tab(CDPSession.for_target(self.port, target_id, host=self.host), target_id)
+                self.tabs.append(tab)
+                self._free.put(tab)
+        except Exception:
+            self.close()
+            raise
+        logging.info(f"Opened {len(self.tabs)} worker tabs")
+        return self
+
+    def close(self):
+        for tab in self.tabs:
+            tab.close()
+            if self._browser is not None:
+                try:
+                    self._browser.send("Target.closeTarget", {"targetId": tab.target_id})
+                except Exception as e:
+                    logging.debug(f"Close tab {tab.target_id} failed: {e}")
+        self.tabs = []
+        if self._browser is not None:
+            self._browser.close()
+            self._browser = None
+
+    def _run(self, fn: Callable[[Tab, Any], Any], item: Any) -> Any:
+        tab = self._free.get()
+        try:
+            return fn(tab, item)
+        finally:
+            self._free.put(tab)
+
+    def map(
+        self,
+        fn: Callable[[Tab, Any], Any],
+        items: Iterable[Any],
+        queue_size: Optional[int] = None,
+        return_exceptions: bool = False,
+    ) -> Iterator[Any]:
+        """Run ``fn(tab, item)`` on the worker tabs and yield results in input order.
+
+        At most ``queue_size`` (default: twice the tab count) items are in
+        flight, so ``items`` may be a lazy generator such as ``iter_scroll``.
+        With ``return_exceptions`` a failing item yields its exception
+        instead of stopping the iteration.
+        """
+        queue_size = queue_size or self.size * 2
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="tab") as executor:
+
+            def pop():
+                future = pending.popleft()
+                try:
+                    return future.result()
+                except Exception as e:
+                    if not return_exceptions:
+                        raise
+                    return e
+
+            for item in items:
+                pending.append(executor.submit(self._run, fn, item))
+                if len(pending) >= queue_size:
+                    yield pop()
+            while pending:
+                yield pop()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def map_in_tabs(
+    driver,
+    fn: Callable[[Tab, Any], Any],
+    items: Iterable[Any],
+    tabs: int = 4,
+    queue_size: Optional[int] = None,
+    return_exceptions: bool = False,
+) -> Iterator[Any]:
+    """Fan ``fn(tab, item)`` out to ``tabs`` worker tabs of the driver's browser.
+
+    ``driver`` may be a Selenium driver or a ``Tab`` (``client="cdp"``).
+    """
+    with TabPool.for_driver(driver, size=tabs) as pool:
+        yield from pool.map(fn, items, queue_size=queue_size, return_exceptions=return_exceptions)
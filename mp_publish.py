@@ -5,14 +5,13 @@ from pathlib import Path
 import random
 import re
 import traceback
-from typing import Callable, List, Optional
-import time
+from typing import Callable, List, Optional, Union
+from urllib.parse import urlparse
 import uuid
 
 import requests
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
@@ -20,12 +19,11 @@ from pydantic import BaseModel
 from dotenv import load_dotenv
 
 from article_collector_common import Article as ArticleCollected
-from utils import (
-    setup_logging,
-    sleep_random_time,
-)
+from utils import get_clock, setup_logging
 from browser.edge import Edge
 from browser.browser import run_in_browser
+from browser.instrument import WebDriverWait, traced
+from browser.pacing import Pacer, get_pacer
 
 
 class Article(BaseModel):
@@ -50,6 +48,10 @@ class Article(BaseModel):
         arbitrary_types_allowed = True
 
 
+# 扫码登录的等待时间和轮询间隔（秒）
+LOGIN_TIMEOUT = 600
+LOGIN_POLL_INTERVAL = 5
+
 DEFAULT_ARTICLE_SUFFIX_TEMPLATE = """<center><strong style="color: black;">点击关注并扫码添加进交流群</strong></center>
 <center><strong style="color: black;">免费领取「{title}」学习资料</strong></center>
 
@@ -109,14 +111,25 @@ class PublishResult(BaseModel):
 class MPPublisher:
     """微信公众号文章发布器"""
 
-    def __init__(self, driver: webdriver.Chrome, profile: PublishConfig):
+    def __init__(
+        self,
+        driver: webdriver.Chrome,
+        profile: PublishConfig,
+        pacer: Union[str, Pacer, None] = None,
+    ):
         self.profile = profile
         self._profile = self.profile.profile.replace(" ", "_")
         self.driver = driver
+        self.pacer = get_pacer(pacer, profile=self.profile.profile, driver=driver)
 
         self.data_dir = Path(f"data/mp_publish/{self.profile.mp_account}")
         self.data_dir.mkdir(parents=True, exist_ok=True)
 
+    def _set_domain(self, url: str):
+        # 告诉 pacer 当前页面的域名，省去每次等待前读取 current_url 的一次 WebDriver 请求
+        self.pacer.domain = urlparse(url).hostname
+
+    @traced
     def format_content(self, content: str, window_handle: Optional[str] = None):
         if window_handle:
             logging.info(f"Switch to window: {window_handle}")
@@ -125,7 +138,8 @@ class MPPublisher:
         logging.info("format content using mdnice")
         url = "https://editor.mdnice.com/?outId=b64e0a073b6144e1b490df79738128e6"
         self.driver.get(url)
-        sleep_random_time(reason=f"Open {url}")
+        self._set_domain(url)
+        self.pacer.pause(reason=f"Open {url}")
 
         import_btn = WebDriverWait(self.driver, 10).until(
             EC.element_to_be_clickable((By.ID, "nice-menu-file"))
@@ -156,7 +170,7 @@ class MPPublisher:
             )
             import_md_btn.send_keys(tmp_file)
 
-            sleep_random_time(reason="Wait for content to be set")
+            self.pacer.pause(reason="Wait for content to be set")
 
             logging.info("Click copy button")
             copy_btn = WebDriverWait(self.driver, 10).until(
@@ -215,6 +229,7 @@ class MPPublisher:
             try_login,
         )
 
+    @traced
     def verify_login(
         self,
         name: str,
@@ -223,6 +238,7 @@ class MPPublisher:
         try_login: bool = False,
     ):
         self.driver.get(url)
+        self._set_domain(url)
 
         if find_element_fn():
             return
@@ -244,14 +260,17 @@ class MPPublisher:
                 except Exception as e:
                     logging.error(f"Remove screenshot file failed: {e}")
 
-            start_time = time.time()
-            while time.time() - start_time < 600:
+            # 轮询登录状态是真实的等待，不走 pacer（MP_PACING=off 时 pause 不推进时间）
+            clock = get_clock()
+            start_time = clock.now()
+            while clock.now() - start_time < LOGIN_TIMEOUT:
                 if find_element_fn():
                     return
-                sleep_random_time(reason=f"Wait for {name} login")
+                clock.sleep(LOGIN_POLL_INTERVAL, reason=f"Wait for {name} login")
 
         raise Exception(f"{name} not logged in")
 
+    @traced
     def add_new_post(self):
         new_post_area = WebDriverWait(self.driver, 10).until(
             EC.presence_of_element_located(
@@ -260,7 +279,7 @@ class MPPublisher:
         )
         actions = ActionChains(self.driver)
         actions.move_to_element(new_post_area).perform()
-        sleep_random_time(
+        self.pacer.pause(
             min_seconds=1,
             max_seconds=2,
             reason="Wait for new post area to be hovered",
@@ -271,10 +290,12 @@ class MPPublisher:
         )
         btn.click()
 
+    @traced
     def publish_article(self, articles: List[Article]):
         """发布文章"""
         self.driver.get("https://mp.weixin.qq.com/")
-        sleep_random_time(reason="Open mp.weixin.qq.com")
+        self._set_domain("https://mp.weixin.qq.com/")
+        self.pacer.pause(reason="Open mp.weixin.qq.com")
 
         # 点击写文章按钮
         new_post_btns = WebDriverWait(self.driver, 10).until(
@@ -286,7 +307,7 @@ class MPPublisher:
         original_window = self.driver.current_window_handle
 
         new_post_btn.click()
-        sleep_random_time(reason="Click new post button")
+        self.pacer.pause(reason="Click new post button")
 
         new_post_window = self.driver.window_handles[-1]
         self.driver.switch_to.window(new_post_window)
@@ -295,7 +316,7 @@ class MPPublisher:
             if index > 0:
                 try:
                     self.add_new_post()
-                    sleep_random_time(reason="Click add new post")
+                    self.pacer.pause(reason="Click add new post")
                 except Exception as e:
                     logging.error(f"Click add new post failed: {e}")
                     raise e
@@ -303,6 +324,7 @@ class MPPublisher:
             self.format_content(article.content, window_handle=original_window)
 
             self.driver.switch_to.window(new_post_window)
+            self._set_domain("https://mp.weixin.qq.com/")
 
             self.set_title(article.title)
             self.set_author(article.author)
@@ -323,7 +345,7 @@ class MPPublisher:
             self.driver.execute_script(
                 "window.scrollTo(0, document.body.scrollHeight, {behavior: 'smooth'});"
             )
-            sleep_random_time(
+            self.pacer.pause(
                 min_seconds=1,
                 max_seconds=2,
                 reason="Wait for content to be scrolled to bottom",
@@ -335,13 +357,15 @@ class MPPublisher:
             self.set_original(article.original_article)
             self.click_save_draft()
 
+    @traced
     def click_save_draft(self):
         save_draft_btn = WebDriverWait(self.driver, 10).until(
             EC.presence_of_element_located((By.XPATH, '//span[text()="保存为草稿"]'))
         )
         save_draft_btn.click()
-        sleep_random_time(reason="Wait for save draft")
+        self.pacer.pause(reason="Wait for save draft")
 
+    @traced
     def set_original(self, original: bool):
         if not original:
             logging.info("Not original article, skip set original")
@@ -352,7 +376,7 @@ class MPPublisher:
                 EC.element_to_be_clickable((By.XPATH, '//div[text()="未声明"]'))
             )
             original_checkbox.click()
-            sleep_random_time(
+            self.pacer.pause(
                 min_seconds=1,
                 max_seconds=2,
                 reason="Wait for original checkbox to be clicked",
@@ -362,7 +386,7 @@ class MPPublisher:
                 EC.element_to_be_clickable((By.XPATH, '//button[text()="确定"]'))
             )
             confirm_btn.click()
-            sleep_random_time(reason="Wait for confirm original checkbox")
+            self.pacer.pause(reason="Wait for confirm original checkbox")
 
             # 如果没有同意协议，原创的界面不会消失，需要先点击同意，然后点击确定
             try:
@@ -371,14 +395,14 @@ class MPPublisher:
                     '[class="original_agreement"] label [class="weui-desktop-icon-checkbox"]',
                 )
                 check_el.click()
-                sleep_random_time(
+                self.pacer.pause(
                     min_seconds=1,
                     max_seconds=2,
                     reason="Wait for check original checkbox",
                 )
 
                 confirm_btn.click()
-                sleep_random_time(reason="Wait for confirm original checkbox again")
+                self.pacer.pause(reason="Wait for confirm original checkbox again")
 
             except Exception as _:
                 pass
@@ -386,6 +410,7 @@ class MPPublisher:
         except Exception as e:
             logging.error(f"Click original checkbox failed: {e}")
 
+    @traced
     def set_content(self):
         logging.info("Set content")
         logging.info("find content body")
@@ -396,10 +421,11 @@ class MPPublisher:
         content_body.click()
         logging.info("paste content")
         content_body.send_keys(Keys.COMMAND + "v")
-        sleep_random_time(
+        self.pacer.pause(
             min_seconds=1, max_seconds=2, reason="Wait for content to be pasted"
         )
 
+    @traced
     def set_content_v2(self):
         logging.info("Set content v2")
         logging.info("find content body")
@@ -408,17 +434,18 @@ class MPPublisher:
         )
         logging.info("click content body")
         content_body.click()
-        sleep_random_time(
+        self.pacer.pause(
             min_seconds=1,
             max_seconds=2,
             reason="Wait for content body to be clicked",
         )
         logging.info("paste content")
         content_body.send_keys(Keys.COMMAND + "v")
-        sleep_random_time(
+        self.pacer.pause(
             min_seconds=1, max_seconds=2, reason="Wait for content to be pasted"
         )
 
+    @traced
     def set_author(self, author: Optional[str] = None):
         if not author:
             author = self.profile.mp_account
@@ -429,6 +456,7 @@ class MPPublisher:
         )
         author_input.send_keys(author)
 
+    @traced
     def set_title(self, title: str):
         # 移除表情符号和其他特殊字符
         title = re.sub(
@@ -446,6 +474,7 @@ class MPPublisher:
         )
         title_input.send_keys(title)
 
+    @traced
     def set_cover_image(self, cover_image: Optional[str] = None):
         try:
             cover_choose_area = WebDriverWait(self.driver, 10).until(
@@ -455,7 +484,7 @@ class MPPublisher:
             )
             actions = ActionChains(self.driver)
             actions.move_to_element(cover_choose_area).perform()
-            sleep_random_time(
+            self.pacer.pause(
                 min_seconds=1,
                 max_seconds=2,
                 reason="Wait for cover choose area to be hovered",
@@ -497,7 +526,7 @@ class MPPublisher:
                     )
                 )
                 cover_upload.send_keys(cover_image)
-                sleep_random_time(reason="Wait for cover image to be uploaded")
+                self.pacer.pause(reason="Wait for cover image to be uploaded")
             else:
                 cover_images = WebDriverWait(self.driver, 10).until(
                     EC.presence_of_all_elements_located(
@@ -506,7 +535,7 @@ class MPPublisher:
                 )
                 if len(cover_images) > 0:
                     cover_images[0].click()
-                    sleep_random_time(
+                    self.pacer.pause(
                         min_seconds=1,
                         max_seconds=2,
                         reason="Wait for cover image to be selected",
@@ -516,17 +545,18 @@ class MPPublisher:
                 EC.element_to_be_clickable((By.XPATH, '//button[text()="下一步"]'))
             )
             next_step_btn.click()
-            sleep_random_time(reason="Wait for next step")
+            self.pacer.pause(reason="Wait for next step")
 
             confirm_btn = WebDriverWait(self.driver, 10).until(
                 EC.element_to_be_clickable((By.XPATH, '//button[text()="确认"]'))
             )
             confirm_btn.click()
-            sleep_random_time(reason="Wait for confirm cover image")
+            self.pacer.pause(reason="Wait for confirm cover image")
 
         except Exception as e:
             logging.error(f"Set cover image failed: {e}")
 
+    @traced
     def set_categories(self, categories: Optional[List[str]] = None):
         if not categories or len(categories) == 0:
             logging.info("No categories to set")
@@ -541,7 +571,7 @@ class MPPublisher:
                 )
             )
             add_category_btn.click()
-            sleep_random_time(
+            self.pacer.pause(
                 min_seconds=1,
                 max_seconds=2,
                 reason="Wait for add category button to be clicked",
@@ -566,7 +596,7 @@ class MPPublisher:
             for category in categories:
                 category_input.send_keys(category)
                 category_input.send_keys(Keys.ENTER)
-                sleep_random_time(
+                self.pacer.pause(
                     min_seconds=1, max_seconds=2, reason="Wait for category to be set"
                 )
 
@@ -574,11 +604,12 @@ class MPPublisher:
                 EC.element_to_be_clickable((By.XPATH, '//button[text()="确定"]'))
             )
             confirm_btn.click()
-            sleep_random_time(reason="Wait for confirm categories")
+            self.pacer.pause(reason="Wait for confirm categories")
 
         except Exception as e:
             logging.error(f"Set categories failed: {e}")
 
+    @traced
     def set_description(self, description: Optional[str] = None):
         if not description:
             logging.info("No description to set")
@@ -609,17 +640,23 @@ def process_publish(profile: PublishConfig):
 
     logging.info(f"Profile config: {profile}")
 
+    load_dotenv()
+    headless = os.getenv("CHROME_HEADLESS", "false").lower() == "true"
+    pacing = os.getenv("MP_PACING", "human")
+    # 记录每个 WebDriver 命令、等待和步骤的耗时到 logs/trace-*.jsonl 和 logs/metrics-*.prom
+    instrument = os.getenv("MP_INSTRUMENT", "false").lower() == "true"
+
     def fn(driver):
         logging.info("Starting MP publisher")
-        publisher = MPPublisher(driver, profile)
-        publisher.verify_mp_login(try_login=True)
-        publisher.verify_mdnice_login(try_login=True)
-
-        publisher.publish_article(profile.articles)
-        feishu_alert(f"{profile.mp_account} 新增文章")
+        publisher = MPPublisher(driver, profile, pacer=pacing)
+        try:
+            publisher.verify_mp_login(try_login=True)
+            publisher.verify_mdnice_login(try_login=True)
 
-    load_dotenv()
-    headless = os.getenv("CHROME_HEADLESS", "false").lower() == "true"
+            publisher.publish_article(profile.articles)
+            feishu_alert(f"{profile.mp_account} 新增文章")
+        finally:
+            publisher.pacer.report()
 
     browser = Edge()
     run_in_browser(
@@ -629,6 +666,7 @@ def process_publish(profile: PublishConfig):
         headless=headless,
         kill_browser_before_running=True,
         kill_browser_after_running=False,
+        instrument=instrument,
     )
 
 
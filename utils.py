@@ -1,11 +1,13 @@
+from contextlib import contextmanager
 import logging
 from pathlib import Path
 import platform
 import random
 import os
 import socket
+import threading
 import time
-from typing import Optional
+from typing import List, Optional, Tuple
 
 
 
@@ -13,11 +15,19 @@ def is_windows() -> bool:
     return _get_system_platform() == "windows"
 
 
+def is_linux() -> bool:
+    return _get_system_platform() == "linux"
+
+
 def get_system_platform() -> str:
     p = _get_system_platform()
     if p == "windows":
         return "windows"
 
+    if p == "linux":
+        machine = platform.machine().lower()
+        return "linux-arm64" if machine in ("aarch64", "arm64") else "linux-x64"
+
     return "mac-arm" if platform.processor() == "arm" else "mac-x64"
 
 
@@ -25,7 +35,7 @@ def _get_system_platform() -> str:
     """Get the current operating system platform with enhanced accuracy
 
     Returns:
-        str: 'windows' for Windows, 'mac' for macOS
+        str: 'windows' for Windows, 'mac' for macOS, 'linux' for Linux
     """
     try:
         # Primary check using platform.system()
@@ -54,6 +64,8 @@ def _get_system_platform() -> str:
             return "mac"
         elif system == "windows":
             return "windows"
+        elif system == "linux":
+            return "linux"
 
         # If all checks fail, return the basic system name
         return "windows" if os_name == "nt" else "mac"
@@ -64,12 +76,92 @@ def _get_system_platform() -> str:
         return "windows" if os.name == "nt" else "mac"
 
 
+def get_xdg_config_home() -> str:
+    return os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+
+
+class Clock:
+    """Source of time for every wait in the project, see ``set_clock``."""
+
+    def now(self) -> float:
+        """Monotonic seconds, for measuring durations."""
+        return time.monotonic()
+
+    def time(self) -> float:
+        """Wall clock seconds since the epoch."""
+        return time.time()
+
+    def sleep(self, seconds: float, reason: Optional[str] = None):
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class VirtualClock(Clock):
+    """Clock whose sleeps return immediately and advance virtual time.
+
+    Every requested delay is recorded in ``sleeps`` as ``(seconds, reason)``,
+    so tests and dry runs can assert on pacing without waiting for it.
+    """
+
+    def __init__(self, start: float = 0.0, epoch: Optional[float] = None):
+        self._now = start
+        self._epoch = time.time() if epoch is None else epoch
+        self._lock = threading.Lock()
+        self.sleeps: List[Tuple[float, Optional[str]]] = []
+
+    def now(self) -> float:
+        with self._lock:
+            return self._now
+
+    def time(self) -> float:
+        with self._lock:
+            return self._epoch + self._now
+
+    def sleep(self, seconds: float, reason: Optional[str] = None):
+        with self._lock:
+            self.sleeps.append((seconds, reason))
+            self._now += max(0.0, seconds)
+
+    def advance(self, seconds: float):
+        with self._lock:
+            self._now += seconds
+
+    @property
+    def total_slept(self) -> float:
+        with self._lock:
+            return sum(max(0.0, s) for s, _ in self.sleeps)
+
+
+_clock: Clock = Clock()
+
+
+def get_clock() -> Clock:
+    return _clock
+
+
+def set_clock(clock: Clock) -> Clock:
+    """Install ``clock`` process-wide and return the previous one."""
+    global _clock
+    previous, _clock = _clock, clock
+    return previous
+
+
+@contextmanager
+def use_clock(clock: Clock):
+    """Temporarily install ``clock``, e.g. ``with use_clock(VirtualClock()) as clock:``."""
+    previous = set_clock(clock)
+    try:
+        yield clock
+    finally:
+        set_clock(previous)
+
+
 def sleep_random_time(
     min_seconds: int = 5, max_seconds: int = 10, reason: Optional[str] = None
 ):
     sleep_time = random.uniform(min_seconds, max_seconds)
     logging.info(f"Waiting for {sleep_time} seconds: {reason}")
-    time.sleep(sleep_time)
+    get_clock().sleep(sleep_time, reason=reason)
 
 
 def setup_logging(log_file="app.log", log_level=logging.INFO, formatter=None):
@@ -102,12 +194,18 @@ def setup_logging(log_file="app.log", log_level=logging.INFO, formatter=None):
     root_logger.addHandler(file_handler)
     root_logger.addHandler(console_handler)
 
-def get_free_port(start_port: int = 1024, end_port: int = 65535) -> int:
+def get_free_port(
+    start_port: int = 1024, end_port: int = 65535, max_attempts: int = 100
+) -> int:
     """Get a random free port in the given range
 
+    The port is only free at the time of the check, prefer letting the browser
+    pick one with ``--remote-debugging-port=0`` when launching concurrently.
+
     Args:
         start_port: Start of port range (default: 1024)
         end_port: End of port range (default: 65535)
+        max_attempts: Number of ports to probe before giving up (default: 100)
 
     Returns:
         int: A free port number
@@ -116,13 +214,18 @@ def get_free_port(start_port: int = 1024, end_port: int = 65535) -> int:
         RuntimeError: If no free port is found in the range
     """
     s = set()
-    while True:
+    max_attempts = min(max_attempts, end_port - start_port + 1)
+    while len(s) < max_attempts:
         port = random.randint(start_port, end_port)
         if port not in s:
             if not check_port_in_use(port):
                 return port
             s.add(port)
 
+    raise RuntimeError(
+        f"No free port found in range {start_port}-{end_port} after {max_attempts} attempts"
+    )
+
 def check_port_in_use(port: int) -> bool:
     """Check if a port is in use on both Windows and Mac/Linux systems
 